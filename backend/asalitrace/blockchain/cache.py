@@ -0,0 +1,129 @@
+"""
+Read-through cache for contract reads (getBatch, getLabTest, getCertificate).
+
+Records on the contract never change once written, so a found record is
+cached with no expiry. A "not found" answer can change as soon as the record
+is written, so it only lives for a short TTL, and eth_adapter drops it as soon
+as it sends a write for that record.
+
+Two tiers:
+    local  - bounded LRU in this process (always on)
+    shared - optional Django cache (e.g. Redis), so gunicorn workers share reads
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+# Returned by ChainReadCache.get() when nothing is cached
+MISS = object()
+
+
+class ChainReadCache:
+    """LRU cache of chain reads with permanent positive and short-lived negative entries."""
+
+    def __init__(self, max_entries=1024, negative_ttl=15, shared_alias=None, key_prefix='chainread'):
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self.shared_alias = shared_alias
+        self.key_prefix = key_prefix
+        self._entries = OrderedDict()  # key -> (value, expires_at or None)
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'shared_hits': 0,
+            'negative_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'invalidations': 0,
+        }
+
+    def _shared(self):
+        if not self.shared_alias:
+            return None
+        from django.core.cache import caches
+        return caches[self.shared_alias]
+
+    def _shared_key(self, key):
+        # Record IDs may contain characters memcached does not accept
+        return f"{self.key_prefix}:{hashlib.sha1(key.encode('utf-8')).hexdigest()}"
+
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def _store_local(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def get(self, key):
+        """Return the cached value (None for a cached "not found"), or MISS."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    if value is None:
+                        self._stats['negative_hits'] += 1
+                    return value
+                del self._entries[key]
+
+        shared = self._shared()
+        if shared is not None:
+            # Wrapped so a cached "not found" can be told apart from a miss
+            wrapped = shared.get(self._shared_key(key))
+            if wrapped is not None:
+                value = wrapped['value']
+                expires_at = None if value is not None else time.monotonic() + self.negative_ttl
+                self._store_local(key, value, expires_at)
+                self._count('shared_hits')
+                if value is None:
+                    self._count('negative_hits')
+                return value
+
+        self._count('misses')
+        return MISS
+
+    def set(self, key, value):
+        """Cache a read: records forever, None ("not found") for negative_ttl seconds."""
+        if value is None:
+            self._store_local(key, None, time.monotonic() + self.negative_ttl)
+        else:
+            self._store_local(key, value, None)
+
+        shared = self._shared()
+        if shared is not None:
+            timeout = self.negative_ttl if value is None else None
+            shared.set(self._shared_key(key), {'value': value}, timeout=timeout)
+
+    def invalidate(self, key):
+        """Drop a key from both tiers (called when the record is written)."""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._stats['invalidations'] += 1
+        shared = self._shared()
+        if shared is not None:
+            shared.delete(self._shared_key(key))
+
+    def clear(self):
+        """Empty the local tier and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            for stat in self._stats:
+                self._stats[stat] = 0
+
+    def stats(self):
+        """Hit/miss counters plus the local tier size."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        lookups = stats['hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['hits'] + stats['shared_hits']) / lookups, 4) if lookups else None
+        stats['shared_tier'] = self.shared_alias or None
+        return stats
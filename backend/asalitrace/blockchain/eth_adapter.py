@@ -1,43 +1,115 @@
 from web3 import Web3
+from web3.exceptions import ContractLogicError, TransactionNotFound
+from eth_utils.abi import function_abi_to_4byte_selector, get_abi_output_types
 import json, os
 import logging
+import threading
+import time
+import weakref
+from functools import lru_cache, wraps
 from django.conf import settings
+from .nonce import NonceManager, is_nonce_error
+from .cache import ChainReadCache, MISS
+from .provider import PooledHTTPProvider, make_async_web3, count_rpc_calls, get_rpc_call_stats
 
 logger = logging.getLogger(__name__)
 
 # --- Load environment variables ---
 RPC_URL = os.getenv("BLOCKCHAIN_RPC_URL", "http://127.0.0.1:8545")
+# Connection pool to the RPC node, shared by every thread in the process
+RPC_POOL_SIZE = int(os.getenv("RPC_POOL_SIZE", "20"))
+RPC_TIMEOUT = int(os.getenv("RPC_TIMEOUT", "30"))
+RPC_CONNECT_RETRIES = int(os.getenv("RPC_CONNECT_RETRIES", "2"))
 CONTRACT_ADDRESS = os.getenv("CONTRACT_ADDRESS")
 PRIVATE_KEY = os.getenv("PRIVATE_KEY")
 PUBLIC_ADDRESS = os.getenv("PUBLIC_ADDRESS")
 
+# Nonce allocation: "memory" (single process) or "file" (processes sharing the key on one host)
+NONCE_BACKEND = os.getenv("NONCE_BACKEND", "memory")
+NONCE_LOCK_FILE = os.getenv("NONCE_LOCK_FILE")
+NONCE_RETRY_ATTEMPTS = 3
+
+# Max eth_getTransactionReceipt calls sent in one JSON-RPC batch
+RECEIPT_BATCH_SIZE = int(os.getenv("RECEIPT_BATCH_SIZE", "100"))
+
+# Max eth_call requests sent in one JSON-RPC batch by get_batches_from_chain
+CALL_BATCH_SIZE = int(os.getenv("CALL_BATCH_SIZE", "100"))
+
+# Limits for multi-record calls (createBatches, addLabTests, issueCertificates).
+# Each call is chunked so its estimated gas and calldata stay under these.
+DEFAULT_TX_GAS = 3000000
+BULK_TX_GAS_LIMIT = int(os.getenv("BULK_TX_GAS_LIMIT", "12000000"))
+BULK_TX_MAX_BYTES = 100000  # nodes reject transactions over 128KB
+
+# Gas model used to size chunks: a fresh storage slot costs 22,100 gas
+# (20,000 SSTORE + 2,100 cold access); per-item overhead covers the mapping
+# lookup, existence checks and the event.
+_SSTORE_GAS = 22100
+_ITEM_OVERHEAD_GAS = 12000
+_TX_BASE_GAS = 40000
+
+# Gas price for new transactions. A transaction with no receipt after
+# CHAIN_RECEIPT_TIMEOUT is resent under the same nonce at GAS_PRICE_BUMP times
+# its price (nodes need at least +10% to replace it), up to MAX_GAS_PRICE_GWEI.
+GAS_PRICE_GWEI = float(os.getenv("GAS_PRICE_GWEI", "5"))
+GAS_PRICE_BUMP = float(os.getenv("GAS_PRICE_BUMP", "1.25"))
+MAX_GAS_PRICE_GWEI = float(os.getenv("MAX_GAS_PRICE_GWEI", "200"))
+_TRANSFER_GAS = 21000
+
+# Single-record writes use eth_estimateGas once per (function, argument size)
+# and reuse the result, padded by this margin, for every later call (which is
+# still checked for reverts with eth_call).
+GAS_ESTIMATE_MARGIN = float(os.getenv("GAS_ESTIMATE_MARGIN", "1.25"))
+
+# Read cache for get_*_from_chain (see cache.py). CHAIN_READ_CACHE_ALIAS names
+# a Django cache (e.g. "default") to share entries between processes.
+CHAIN_READ_CACHE_SIZE = int(os.getenv("CHAIN_READ_CACHE_SIZE", "1024"))
+CHAIN_READ_CACHE_NEGATIVE_TTL = int(os.getenv("CHAIN_READ_CACHE_NEGATIVE_TTL", "15"))
+CHAIN_READ_CACHE_ALIAS = os.getenv("CHAIN_READ_CACHE_ALIAS", "")
+
 # Lazy initialization - don't connect at module import time
 _web3 = None
 _contract = None
+_web3_lock = threading.Lock()
+_contract_lock = threading.Lock()
+_nonce_manager = None
+_nonce_manager_lock = threading.Lock()
+_async_web3 = weakref.WeakKeyDictionary()  # event loop => AsyncWeb3
+_gas_estimates = {}  # (function name, argument sizes) => gas limit
 
 
 def get_web3():
-    """Lazy initialization of Web3 connection with error handling."""
+    """
+    Lazy initialization of Web3 connection with error handling.
+
+    The instance is shared by every thread; its provider keeps a pool of
+    RPC_POOL_SIZE keep-alive connections to the node and caches eth_chainId.
+    """
     global _web3
-    if _web3 is None:
+    if _web3 is not None:
+        return _web3
+
+    with _web3_lock:
+        if _web3 is not None:
+            return _web3
         try:
             # Create provider - Web3.py v7 handles headers automatically
-            # Use minimal request_kwargs to avoid JSON-RPC parse errors
-            provider = Web3.HTTPProvider(
+            provider = PooledHTTPProvider(
                 RPC_URL,
-                request_kwargs={
-                    'timeout': 30,
-                }
+                pool_size=RPC_POOL_SIZE,
+                timeout=RPC_TIMEOUT,
+                retries=RPC_CONNECT_RETRIES,
+                # web3's validation middleware asks for the chain ID before
+                # every eth_call and eth_estimateGas; it never changes
+                cache_allowed_requests=True,
+                cacheable_requests={'eth_chainId'},
             )
-            _web3 = Web3(provider)
+            web3 = Web3(provider)
             
-            # Test connection with a simple call that doesn't require contract
+            # Test connection once (this also caches the chain ID)
             try:
-                # Use a simple RPC call to test connection
-                # This is more reliable than chain_id in some cases
-                block_number = _web3.eth.block_number
-                chain_id = _web3.eth.chain_id
-                logger.info(f"Connected to blockchain node at {RPC_URL} (Chain ID: {chain_id}, Block: {block_number})")
+                chain_id = web3.eth.chain_id
+                logger.info(f"Connected to blockchain node at {RPC_URL} (Chain ID: {chain_id})")
             except Exception as conn_error:
                 # Log the full error for debugging
                 error_details = str(conn_error)
@@ -59,7 +131,8 @@ def get_web3():
                     )
                 logger.error(error_msg)
                 raise Exception(error_msg)
-                
+
+            _web3 = web3
         except Exception as e:
             error_msg = f"Blockchain connection failed: {str(e)}"
             logger.error(error_msg)
@@ -67,24 +140,57 @@ def get_web3():
     return _web3
 
 
+@lru_cache(maxsize=1)
+def _load_abi():
+    ABI_PATH = os.path.join(settings.BASE_DIR, "../frontend/src/artifacts/contracts/AsaliTrace.sol/AsaliTrace.json")
+    if not os.path.exists(ABI_PATH):
+        raise FileNotFoundError(f"Contract ABI not found at {ABI_PATH}")
+
+    with open(ABI_PATH) as f:
+        contract_json = json.load(f)
+    return contract_json["abi"]
+
+
+def missing_abi_functions(function_names):
+    """The given contract functions that the ABI file does not have."""
+    available = {item["name"] for item in _load_abi() if item.get("type") == "function"}
+    return [name for name in function_names if name not in available]
+
+
+def missing_deployed_functions(function_names):
+    """
+    The given ABI functions that the code deployed at CONTRACT_ADDRESS does
+    not dispatch (their 4-byte selectors are not in it), e.g. because the
+    contract was deployed from an older AsaliTrace.sol than the ABI file.
+    """
+    if not CONTRACT_ADDRESS:
+        raise ValueError("CONTRACT_ADDRESS environment variable not set")
+    code = bytes(get_web3().eth.get_code(CONTRACT_ADDRESS))
+    if not code:
+        raise ValueError(f"No contract is deployed at {CONTRACT_ADDRESS}")
+    abi = {item["name"]: item for item in _load_abi() if item.get("type") == "function"}
+    # Selectors starting with zero bytes are pushed without them
+    return [
+        name for name in function_names
+        if function_abi_to_4byte_selector(abi[name]).lstrip(b"\0") not in code
+    ]
+
+
 def get_contract():
     """Lazy initialization of contract instance with error handling."""
     global _contract
-    if _contract is None:
+    if _contract is not None:
+        return _contract
+
+    with _contract_lock:
+        if _contract is not None:
+            return _contract
         if not CONTRACT_ADDRESS:
             raise ValueError("CONTRACT_ADDRESS environment variable not set")
         
         try:
-            # Load ABI
-            ABI_PATH = os.path.join(settings.BASE_DIR, "../frontend/src/artifacts/contracts/AsaliTrace.sol/AsaliTrace.json")
-            if not os.path.exists(ABI_PATH):
-                raise FileNotFoundError(f"Contract ABI not found at {ABI_PATH}")
-            
-            with open(ABI_PATH) as f:
-                contract_json = json.load(f)
-            
             web3 = get_web3()
-            _contract = web3.eth.contract(address=CONTRACT_ADDRESS, abi=contract_json["abi"])
+            _contract = web3.eth.contract(address=CONTRACT_ADDRESS, abi=_load_abi())
             logger.info(f"Contract instance created at address {CONTRACT_ADDRESS}")
         except Exception as e:
             logger.error(f"Failed to initialize contract: {str(e)}")
@@ -92,67 +198,318 @@ def get_contract():
     return _contract
 
 
+async def get_async_web3():
+    """
+    AsyncWeb3 for ASGI code, one per event loop (aiohttp sessions cannot be
+    shared between loops), each with a pool of RPC_POOL_SIZE connections.
+    """
+    import asyncio
+    loop = asyncio.get_running_loop()
+    web3 = _async_web3.get(loop)
+    if web3 is None:
+        web3 = await make_async_web3(RPC_URL, pool_size=RPC_POOL_SIZE, timeout=RPC_TIMEOUT)
+        _async_web3[loop] = web3
+    return web3
+
+
+async def get_async_contract():
+    """Async contract instance for ASGI code, e.g. `await (await get_async_contract()).functions.getBatch(id).call()`."""
+    if not CONTRACT_ADDRESS:
+        raise ValueError("CONTRACT_ADDRESS environment variable not set")
+    web3 = await get_async_web3()
+    return web3.eth.contract(address=CONTRACT_ADDRESS, abi=_load_abi())
+
+
+def _counts_rpc_calls(func):
+    """Count the RPC calls each call of `func` makes (see get_rpc_call_stats())."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with count_rpc_calls(func.__name__) as calls:
+            try:
+                return func(*args, **kwargs)
+            finally:
+                logger.debug(f"{func.__name__} made {calls.total} RPC call(s) in {calls.round_trips} round trip(s)")
+    return wrapper
+
+
+_read_cache = ChainReadCache(
+    max_entries=CHAIN_READ_CACHE_SIZE,
+    negative_ttl=CHAIN_READ_CACHE_NEGATIVE_TTL,
+    shared_alias=CHAIN_READ_CACHE_ALIAS or None,
+)
+
+# Contract writes => (record kind, index of the record ID argument)
+_WRITE_FUNCTIONS = {
+    'createBatch': ('batch', 0),
+    'createBatches': ('batch', 0),
+    'addLabTest': ('lab_test', 0),
+    'addLabTests': ('lab_test', 0),
+    'issueCertificate': ('certificate', 0),
+    'issueCertificates': ('certificate', 0),
+}
+
+
+def _read_cache_key(kind, record_id):
+    return f"{kind}:{(CONTRACT_ADDRESS or '').lower()}:{record_id}"
+
+
+def _cached_chain_read(kind, record_id, read):
+    """Return read(record_id) through the read cache. Errors raised by read() are not cached."""
+    key = _read_cache_key(kind, record_id)
+    value = _read_cache.get(key)
+    if value is MISS:
+        value = read(record_id)
+        _read_cache.set(key, value)
+    # Callers may annotate the dict, so never hand out the cached one
+    return dict(value) if value is not None else None
+
+
+def _invalidate_written_records(contract_call):
+    """Drop cached reads for the records a contract write creates."""
+    written = _WRITE_FUNCTIONS.get(contract_call.fn_name)
+    if written is None:
+        return
+    kind, index = written
+    record_ids = contract_call.args[index]
+    if isinstance(record_ids, str):
+        record_ids = [record_ids]
+    for record_id in record_ids:
+        _read_cache.invalidate(_read_cache_key(kind, record_id))
+
+
+def get_read_cache_stats():
+    """Hit/miss counters for the chain read cache."""
+    return _read_cache.stats()
+
+
+def _is_not_found_error(error):
+    """True if a contract call failed because the record does not exist."""
+    error_msg = str(error).lower()
+    return any(marker in error_msg for marker in ('not found', 'could not decode', 'value="0x"', 'bad_data'))
+
+
+def get_nonce_manager():
+    """Lazy initialization of the nonce manager for PUBLIC_ADDRESS."""
+    global _nonce_manager
+    if _nonce_manager is None:
+        with _nonce_manager_lock:
+            if _nonce_manager is None:
+                _nonce_manager = NonceManager(
+                    get_web3,
+                    PUBLIC_ADDRESS,
+                    backend=NONCE_BACKEND,
+                    lock_path=NONCE_LOCK_FILE,
+                )
+    return _nonce_manager
+
+
+def _raw_transaction(signed_tx):
+    """Return the raw bytes of a signed transaction."""
+    # eth-account v0.13.0+ uses raw_transaction (snake_case)
+    # Older versions use rawTransaction (camelCase)
+    if hasattr(signed_tx, 'raw_transaction'):
+        return signed_tx.raw_transaction
+    if hasattr(signed_tx, 'rawTransaction'):
+        return signed_tx.rawTransaction
+    raise ValueError(
+        "Cannot find raw transaction attribute. "
+        "SignedTransaction object has neither 'raw_transaction' nor 'rawTransaction'. "
+        "Please check eth-account library version."
+    )
+
+
+def _argument_sizes(args):
+    """Size of each call argument that affects gas: storage slots for strings, length for arrays."""
+    sizes = []
+    for arg in args:
+        if isinstance(arg, str):
+            sizes.append(_string_storage_slots(arg))
+        elif isinstance(arg, (list, tuple)):
+            sizes.append(len(arg))
+        else:
+            sizes.append(0)
+    return tuple(sizes)
+
+
+def is_revert_error(error):
+    """True if an eth_call/eth_estimateGas error means the call itself reverts (not a transport failure)."""
+    if isinstance(error, ContractLogicError):
+        return True
+    message = str(error).lower()
+    return 'revert' in message or 'invalid opcode' in message
+
+
+def _gas_limit(contract_call):
+    """
+    Gas limit for a contract call, estimated once per function and argument size.
+
+    Calls whose strings fill the same number of storage slots cost about the
+    same gas, so the first estimate (plus GAS_ESTIMATE_MARGIN) is reused.
+    A reused estimate says nothing about whether this call reverts, so on a
+    cache hit the call is still run with eth_call. If the estimate or the
+    call reverts (duplicate ID, batch not on chain yet) the error is raised,
+    so a known revert is never broadcast and paid for. Only when the node
+    could not be asked (timeout, connection error) is the cached gas, or
+    DEFAULT_TX_GAS, used without the check.
+    """
+    key = (contract_call.fn_name, _argument_sizes(contract_call.args))
+    gas = _gas_estimates.get(key)
+    try:
+        # Against the pending block, so a lab test sent right after its batch's transaction passes
+        if gas is None:
+            estimate = contract_call.estimate_gas({"from": PUBLIC_ADDRESS}, block_identifier="pending")
+        else:
+            contract_call.call({"from": PUBLIC_ADDRESS}, block_identifier="pending")
+            return gas
+    except Exception as e:
+        if is_revert_error(e):
+            logger.warning(f"{contract_call.fn_name} would revert, not sending it: {e}")
+            raise
+        if gas is not None:
+            logger.warning(f"Revert check for {contract_call.fn_name} failed ({e}), sending it unchecked")
+            return gas
+        logger.warning(f"Gas estimation for {contract_call.fn_name} failed ({e}), using {DEFAULT_TX_GAS}")
+        return DEFAULT_TX_GAS
+    gas = min(BULK_TX_GAS_LIMIT, int(estimate * GAS_ESTIMATE_MARGIN))
+    _gas_estimates[key] = gas
+    return gas
+
+
+def _sign_and_send(web3, contract_call, gas=None):
+    """
+    Build, sign and send a contract transaction from PUBLIC_ADDRESS.
+
+    Nonces come from the local nonce manager, the chain ID is cached and the
+    gas limit comes from _gas_limit() unless given, so apart from its
+    revert check (eth_call or eth_estimateGas) only eth_sendRawTransaction
+    is sent. If
+    the node rejects the nonce (too low, too high, already known) the manager
+    is resynced and the transaction is rebuilt with a fresh nonce.
+    Returns the transaction hash.
+    """
+    nonce_manager = get_nonce_manager()
+    chain_id = web3.eth.chain_id  # cached by the provider
+    if gas is None:
+        gas = _gas_limit(contract_call)
+    for attempt in range(1, NONCE_RETRY_ATTEMPTS + 1):
+        nonce = nonce_manager.allocate()
+        try:
+            tx = contract_call.build_transaction({
+                "from": PUBLIC_ADDRESS,
+                "chainId": chain_id,
+                "nonce": nonce,
+                "gas": gas,
+                "gasPrice": web3.to_wei(GAS_PRICE_GWEI, "gwei")
+            })
+            signed_tx = web3.eth.account.sign_transaction(tx, private_key=PRIVATE_KEY)
+        except Exception:
+            # Nothing left the process
+            nonce_manager.release(nonce)
+            raise
+
+        try:
+            tx_hash = web3.eth.send_raw_transaction(_raw_transaction(signed_tx))
+        except Exception as e:
+            if is_nonce_error(e) and attempt < NONCE_RETRY_ATTEMPTS:
+                logger.warning(f"Nonce {nonce} rejected by node ({e}), resyncing")
+                nonce_manager.resync()
+                continue
+            if _never_sent(e):
+                nonce_manager.release(nonce)
+            else:
+                # A timeout or reset can come after the node took the transaction;
+                # handing the nonce out again would replace it or fail as too low
+                logger.warning(f"Sending with nonce {nonce} failed ({e}); it may have reached the node, resyncing")
+                _resync_after_failed_send(nonce_manager)
+            raise
+        _invalidate_written_records(contract_call)
+        return tx_hash
+
+
+def _never_sent(error):
+    """True if a send error shows the transaction never reached the node's pool (an HTTP 4xx answer)."""
+    status_code = getattr(getattr(error, "response", None), "status_code", None)
+    return status_code is not None and 400 <= status_code < 500
+
+
+def _resync_after_failed_send(nonce_manager):
+    try:
+        nonce_manager.resync()
+    except Exception as e:
+        # The node is unreachable too; the next allocation asks it again
+        logger.warning(f"Could not resync nonce ({e}), re-reading it on the next transaction")
+        nonce_manager.forget()
+
+
+@_counts_rpc_calls
+def replace_transaction(tx_hash, cancel=False):
+    """
+    Resend a pending transaction under its nonce at a higher gas price (replace-by-fee).
+
+    The replacement repeats the original call, or with `cancel` is a zero-value
+    transfer to PUBLIC_ADDRESS that only frees the nonce. Returns the new tx
+    hash; `tx_hash` itself if the original has been mined in the meantime (its
+    receipt turns up on the next poll); None if the node no longer knows the
+    transaction (dropped from its pool, so the nonce is free again). Raises if
+    the bumped price would be over MAX_GAS_PRICE_GWEI.
+    """
+    _require_signing_config()
+    web3 = get_web3()
+    try:
+        tx = web3.eth.get_transaction(tx_hash)
+    except TransactionNotFound:
+        return None
+    if tx.get('blockNumber') is not None:
+        return tx_hash
+
+    gas_price = max(int(tx['gasPrice'] * GAS_PRICE_BUMP) + 1, web3.eth.gas_price)
+    if gas_price > web3.to_wei(MAX_GAS_PRICE_GWEI, "gwei"):
+        raise Exception(
+            f"Replacing {tx_hash} needs {web3.from_wei(gas_price, 'gwei')} gwei, over MAX_GAS_PRICE_GWEI ({MAX_GAS_PRICE_GWEI})"
+        )
+    replacement = {
+        "from": PUBLIC_ADDRESS,
+        "to": PUBLIC_ADDRESS if cancel else tx['to'],
+        "data": b"" if cancel else tx['input'],
+        "value": 0,
+        "nonce": tx['nonce'],
+        "gas": _TRANSFER_GAS if cancel else tx['gas'],
+        "gasPrice": gas_price,
+        "chainId": web3.eth.chain_id,
+    }
+    signed_tx = web3.eth.account.sign_transaction(replacement, private_key=PRIVATE_KEY)
+    try:
+        new_hash = web3.to_hex(web3.eth.send_raw_transaction(_raw_transaction(signed_tx)))
+    except Exception as e:
+        if 'nonce too low' in str(e).lower():
+            # The original was mined between the lookup and the resend
+            return tx_hash
+        raise
+    logger.warning(
+        f"{'Cancelled' if cancel else 'Replaced'} stuck transaction {tx_hash} (nonce {tx['nonce']}) "
+        f"at {web3.from_wei(gas_price, 'gwei')} gwei: {new_hash}"
+    )
+    return new_hash
+
+
+def resync_nonce():
+    """Reset the local nonce counter from the node (e.g. after a transaction was dropped)."""
+    return get_nonce_manager().resync()
+
+
+@_counts_rpc_calls
 def add_batch_to_chain(batch_id, description):
     """
     Send transaction to record a batch on the blockchain.
     Returns transaction hash and waits for receipt.
     """
     try:
-        # Check environment variables first
-        if not PRIVATE_KEY:
-            raise ValueError("PRIVATE_KEY environment variable is not set. Please set it in your .env file.")
-        if not PUBLIC_ADDRESS:
-            raise ValueError("PUBLIC_ADDRESS environment variable is not set. Please set it in your .env file.")
-        if not CONTRACT_ADDRESS:
-            raise ValueError("CONTRACT_ADDRESS environment variable is not set. Please deploy the contract first and set it in your .env file.")
-        
-        # Test connection first
+        _require_signing_config()
         web3 = get_web3()
-        
-        # Verify we can get block number (connection test)
-        try:
-            block_number = web3.eth.block_number
-            logger.info(f"Connection verified. Current block: {block_number}")
-        except Exception as conn_test_error:
-            raise Exception(
-                f"Cannot communicate with blockchain node at {RPC_URL}. "
-                f"Error: {str(conn_test_error)}. "
-                f"Please verify: 1) Hardhat node is running (npx hardhat node), "
-                f"2) RPC URL is correct ({RPC_URL}), 3) No firewall blocking the connection."
-            )
-        
         contract = get_contract()
         
-        # Get nonce
-        nonce = web3.eth.get_transaction_count(PUBLIC_ADDRESS)
-        
-        # Build transaction
-        tx = contract.functions.createBatch(batch_id, description).build_transaction({
-            "from": PUBLIC_ADDRESS,
-            "nonce": nonce,
-            "gas": 3000000,
-            "gasPrice": web3.to_wei("5", "gwei")
-        })
-        
-        # Sign transaction
-        signed_tx = web3.eth.account.sign_transaction(tx, private_key=PRIVATE_KEY)
-        
-        # Send transaction
-        # eth-account v0.13.0+ uses raw_transaction (snake_case)
-        # Older versions use rawTransaction (camelCase)
-        # Check for raw_transaction first (newer versions)
-        if hasattr(signed_tx, 'raw_transaction'):
-            raw_tx = signed_tx.raw_transaction
-        elif hasattr(signed_tx, 'rawTransaction'):
-            raw_tx = signed_tx.rawTransaction
-        else:
-            raise ValueError(
-                "Cannot find raw transaction attribute. "
-                "SignedTransaction object has neither 'raw_transaction' nor 'rawTransaction'. "
-                "Please check eth-account library version."
-            )
-        
-        tx_hash = web3.eth.send_raw_transaction(raw_tx)
+        # Build, sign and send with a locally allocated nonce
+        tx_hash = _sign_and_send(web3, contract.functions.createBatch(batch_id, description))
         tx_hash_hex = web3.to_hex(tx_hash)
         
         logger.info(f"Transaction sent: {tx_hash_hex}")
@@ -173,23 +530,9 @@ def add_batch_to_chain(batch_id, description):
                     pass
                 raise Exception(error_msg)
             
+            # A successful receipt means createBatch stored the batch (it
+            # reverts otherwise), so there is no need to read it back
             logger.info(f"Transaction confirmed in block {receipt.blockNumber}")
-            
-            # Verify the batch was actually created by reading it back
-            try:
-                created_batch = contract.functions.getBatch(batch_id).call()
-                if not created_batch or len(created_batch) < 4 or not created_batch[0]:
-                    logger.warning(f"Transaction succeeded but batch {batch_id} not found on blockchain after creation")
-                    raise Exception(f"Transaction succeeded but batch {batch_id} was not created. This may indicate a contract issue.")
-                logger.info(f"Verified: Batch {batch_id} exists on blockchain")
-            except Exception as verify_err:
-                error_msg = str(verify_err)
-                if 'not found' in error_msg.lower() or 'timestamp' in error_msg.lower():
-                    logger.error(f"Transaction succeeded but batch verification failed: {error_msg}")
-                    raise Exception(f"Transaction succeeded but batch {batch_id} was not created on blockchain. Error: {error_msg}")
-                # If it's a different error (like connection issue), log but don't fail
-                logger.warning(f"Could not verify batch creation: {error_msg}")
-            
             return tx_hash_hex
             
         except Exception as e:
@@ -206,59 +549,65 @@ def add_batch_to_chain(batch_id, description):
         raise
 
 
-def get_batch_from_chain(batch_id):
+def _read_batch_from_chain(batch_id):
     """
-    Read batch data from blockchain.
-    Returns batch data or None if not found.
+    Call getBatch on the contract.
+    Returns batch data, or None if the contract has no such batch; other errors raise.
     """
+    contract = get_contract()
+
+    # Try to read batch from contract
     try:
-        # First check if we can connect to blockchain
-        web3 = get_web3()
-        contract = get_contract()
-        
-        # Try to read batch from contract
-        try:
-            batch = contract.functions.getBatch(batch_id).call()
-        except Exception as call_err:
-            error_msg = str(call_err).lower()
-            # Handle connection/contract deployment errors
-            if 'could not transact' in error_msg or 'is contract deployed' in error_msg or 'chain synced' in error_msg:
-                logger.error(f"Blockchain connection/contract issue: {call_err}")
-                raise Exception(f"Cannot connect to contract. Please verify: 1) Hardhat node is running (npx hardhat node), 2) Contract is deployed, 3) CONTRACT_ADDRESS is correct. Error: {call_err}")
-            # Handle "Batch not found" revert from smart contract
-            # The contract has: require(batches[_batchId].timestamp != 0, "Batch not found");
-            if 'not found' in error_msg or 'timestamp' in error_msg or 'require' in error_msg:
-                logger.info(f"Batch {batch_id} not found on blockchain (contract revert: {call_err})")
-                return None
-            # Handle decode errors
-            if 'could not decode' in error_msg or 'value="0x"' in error_msg or 'bad_data' in error_msg:
-                logger.info(f"Batch {batch_id} not found on blockchain (decode error: {call_err})")
-                return None
-            # Re-raise other errors
-            raise
-        
-        # Check if batch exists (empty string or zero address means not found)
-        if not batch or len(batch) < 4:
-            logger.warning(f"Batch {batch_id} returned empty or invalid data from blockchain")
+        batch = contract.functions.getBatch(batch_id).call()
+    except Exception as call_err:
+        error_msg = str(call_err).lower()
+        # Handle connection/contract deployment errors
+        if 'could not transact' in error_msg or 'is contract deployed' in error_msg or 'chain synced' in error_msg:
+            logger.error(f"Blockchain connection/contract issue: {call_err}")
+            raise Exception(f"Cannot connect to contract. Please verify: 1) Hardhat node is running (npx hardhat node), 2) Contract is deployed, 3) CONTRACT_ADDRESS is correct. Error: {call_err}")
+        # Handle "Batch not found" revert from smart contract
+        # The contract has: require(batches[_batchId].timestamp != 0, "Batch not found");
+        if 'not found' in error_msg or 'timestamp' in error_msg or 'require' in error_msg:
+            logger.info(f"Batch {batch_id} not found on blockchain (contract revert: {call_err})")
             return None
-        
-        batch_id_result = batch[0]
-        # Check if batchId is empty or zero (means batch doesn't exist)
-        if not batch_id_result or batch_id_result == '':
-            logger.info(f"Batch {batch_id} not found on blockchain (empty batchId)")
+        # Handle decode errors
+        if 'could not decode' in error_msg or 'value="0x"' in error_msg or 'bad_data' in error_msg:
+            logger.info(f"Batch {batch_id} not found on blockchain (decode error: {call_err})")
             return None
-        
-        # Verify the returned batchId matches what we're looking for (case-insensitive)
-        if isinstance(batch_id_result, str) and batch_id_result.lower() != batch_id.lower():
-            logger.warning(f"Batch ID mismatch: requested {batch_id}, got {batch_id_result}")
-            # Still return it, but log the warning
-        
-        return {
-            'batchId': batch_id_result,
-            'description': batch[1] if len(batch) > 1 else '',
-            'timestamp': batch[2] if len(batch) > 2 else 0,
-            'createdBy': batch[3] if len(batch) > 3 else '',
-        }
+        # Re-raise other errors
+        raise
+
+    # Check if batch exists (empty string or zero address means not found)
+    if not batch or len(batch) < 4:
+        logger.warning(f"Batch {batch_id} returned empty or invalid data from blockchain")
+        return None
+
+    batch_id_result = batch[0]
+    # Check if batchId is empty or zero (means batch doesn't exist)
+    if not batch_id_result or batch_id_result == '':
+        logger.info(f"Batch {batch_id} not found on blockchain (empty batchId)")
+        return None
+
+    # Verify the returned batchId matches what we're looking for (case-insensitive)
+    if isinstance(batch_id_result, str) and batch_id_result.lower() != batch_id.lower():
+        logger.warning(f"Batch ID mismatch: requested {batch_id}, got {batch_id_result}")
+        # Still return it, but log the warning
+
+    return {
+        'batchId': batch_id_result,
+        'description': batch[1] if len(batch) > 1 else '',
+        'timestamp': batch[2] if len(batch) > 2 else 0,
+        'createdBy': batch[3] if len(batch) > 3 else '',
+    }
+
+
+def get_batch_from_chain(batch_id):
+    """
+    Read batch data from blockchain (through the read cache).
+    Returns batch data or None if not found.
+    """
+    try:
+        return _cached_chain_read('batch', batch_id, _read_batch_from_chain)
     except Exception as e:
         error_msg = str(e).lower()
         # Handle specific error cases
@@ -269,66 +618,19 @@ def get_batch_from_chain(batch_id):
         return None
 
 
+@_counts_rpc_calls
 def add_lab_test_to_chain(test_id, batch_id, result):
     """
     Send transaction to record a lab test on the blockchain.
     Returns transaction hash and waits for receipt.
     """
     try:
-        # Check environment variables first
-        if not PRIVATE_KEY:
-            raise ValueError("PRIVATE_KEY environment variable is not set. Please set it in your .env file.")
-        if not PUBLIC_ADDRESS:
-            raise ValueError("PUBLIC_ADDRESS environment variable is not set. Please set it in your .env file.")
-        if not CONTRACT_ADDRESS:
-            raise ValueError("CONTRACT_ADDRESS environment variable is not set. Please deploy the contract first and set it in your .env file.")
-        
-        # Test connection first
+        _require_signing_config()
         web3 = get_web3()
-        
-        # Verify we can get block number (connection test)
-        try:
-            block_number = web3.eth.block_number
-            logger.info(f"Connection verified. Current block: {block_number}")
-        except Exception as conn_test_error:
-            raise Exception(
-                f"Cannot communicate with blockchain node at {RPC_URL}. "
-                f"Error: {str(conn_test_error)}. "
-                f"Please verify: 1) Hardhat node is running (npx hardhat node), "
-                f"2) RPC URL is correct ({RPC_URL}), 3) No firewall blocking the connection."
-            )
-        
         contract = get_contract()
         
-        # Get nonce
-        nonce = web3.eth.get_transaction_count(PUBLIC_ADDRESS)
-        
-        # Build transaction
-        tx = contract.functions.addLabTest(test_id, batch_id, result).build_transaction({
-            "from": PUBLIC_ADDRESS,
-            "nonce": nonce,
-            "gas": 3000000,
-            "gasPrice": web3.to_wei("5", "gwei")
-        })
-        
-        # Sign transaction
-        signed_tx = web3.eth.account.sign_transaction(tx, private_key=PRIVATE_KEY)
-        
-        # Send transaction
-        # eth-account v0.13.0+ uses raw_transaction (snake_case)
-        # Older versions use rawTransaction (camelCase)
-        if hasattr(signed_tx, 'raw_transaction'):
-            raw_tx = signed_tx.raw_transaction
-        elif hasattr(signed_tx, 'rawTransaction'):
-            raw_tx = signed_tx.rawTransaction
-        else:
-            raise ValueError(
-                "Cannot find raw transaction attribute. "
-                "SignedTransaction object has neither 'raw_transaction' nor 'rawTransaction'. "
-                "Please check eth-account library version."
-            )
-        
-        tx_hash = web3.eth.send_raw_transaction(raw_tx)
+        # Build, sign and send with a locally allocated nonce
+        tx_hash = _sign_and_send(web3, contract.functions.addLabTest(test_id, batch_id, result))
         tx_hash_hex = web3.to_hex(tx_hash)
         
         logger.info(f"Lab test transaction sent: {tx_hash_hex}")
@@ -355,86 +657,109 @@ def add_lab_test_to_chain(test_id, batch_id, result):
         raise
 
 
+def get_batches_from_chain(batch_ids):
+    """
+    Read many batches with batched getBatch eth_calls (one JSON-RPC batch per
+    CALL_BATCH_SIZE IDs), going through the read cache like get_batch_from_chain.
+
+    Returns a dict mapping each batch ID to its data, or to None if the
+    contract has no such batch. IDs whose call failed for another reason are
+    left out.
+    """
+    results = {}
+    to_fetch = []
+    for batch_id in dict.fromkeys(batch_ids):
+        cached = _read_cache.get(_read_cache_key('batch', batch_id))
+        if cached is MISS:
+            to_fetch.append(batch_id)
+        else:
+            results[batch_id] = dict(cached) if cached is not None else None
+    if not to_fetch:
+        return results
+
+    web3 = get_web3()
+    contract = get_contract()
+    output_types = get_abi_output_types(contract.get_function_by_name('getBatch').abi)
+
+    for start in range(0, len(to_fetch), CALL_BATCH_SIZE):
+        chunk = to_fetch[start:start + CALL_BATCH_SIZE]
+        responses = web3.provider.make_batch_request([
+            ("eth_call", [{'to': contract.address, 'data': contract.encode_abi('getBatch', args=[batch_id])}, 'latest'])
+            for batch_id in chunk
+        ])
+        if not isinstance(responses, list):
+            raise Exception(f"Batched getBatch call failed: {responses.get('error', responses)}")
+
+        for batch_id, response in zip(chunk, responses):
+            error = response.get('error')
+            if error:
+                # getBatch only reverts when the batch does not exist
+                if 'revert' in str(error).lower() or _is_not_found_error(error):
+                    data = None
+                else:
+                    logger.warning(f"getBatch call for {batch_id} failed: {error}")
+                    continue
+            elif response.get('result') in (None, '0x'):
+                # Nothing deployed at CONTRACT_ADDRESS; get_batch_from_chain treats this as not found
+                logger.warning(f"getBatch call for {batch_id} returned no data")
+                continue
+            else:
+                batch = web3.codec.decode(output_types, bytes.fromhex(response['result'][2:]))[0]
+                data = {
+                    'batchId': batch[0],
+                    'description': batch[1],
+                    'timestamp': batch[2],
+                    'createdBy': batch[3],
+                }
+            _read_cache.set(_read_cache_key('batch', batch_id), data)
+            results[batch_id] = dict(data) if data is not None else None
+
+    return results
+
+
+def _read_lab_test_from_chain(test_id):
+    """Call getLabTest. Returns lab test data, or None if the contract has no such test; other errors raise."""
+    contract = get_contract()
+    try:
+        lab_test = contract.functions.getLabTest(test_id).call()
+    except Exception as call_err:
+        if _is_not_found_error(call_err):
+            return None
+        raise
+
+    return {
+        'testId': lab_test[0],
+        'batchId': lab_test[1],
+        'result': lab_test[2],
+        'timestamp': lab_test[3],
+    }
+
+
 def get_lab_test_from_chain(test_id):
     """
-    Read lab test data from blockchain.
+    Read lab test data from blockchain (through the read cache).
     Returns lab test data or None if not found.
     """
     try:
-        contract = get_contract()
-        lab_test = contract.functions.getLabTest(test_id).call()
-        
-        return {
-            'testId': lab_test[0],
-            'batchId': lab_test[1],
-            'result': lab_test[2],
-            'timestamp': lab_test[3],
-        }
+        return _cached_chain_read('lab_test', test_id, _read_lab_test_from_chain)
     except Exception as e:
         logger.error(f"Error reading lab test from blockchain: {str(e)}")
         return None
 
 
+@_counts_rpc_calls
 def issue_certificate_on_chain(cert_id, batch_id, issuer):
     """
     Send transaction to issue a certificate on the blockchain.
     Returns transaction hash and waits for receipt.
     """
     try:
-        # Check environment variables first
-        if not PRIVATE_KEY:
-            raise ValueError("PRIVATE_KEY environment variable is not set. Please set it in your .env file.")
-        if not PUBLIC_ADDRESS:
-            raise ValueError("PUBLIC_ADDRESS environment variable is not set. Please set it in your .env file.")
-        if not CONTRACT_ADDRESS:
-            raise ValueError("CONTRACT_ADDRESS environment variable is not set. Please deploy the contract first and set it in your .env file.")
-        
-        # Test connection first
+        _require_signing_config()
         web3 = get_web3()
-        
-        # Verify we can get block number (connection test)
-        try:
-            block_number = web3.eth.block_number
-            logger.info(f"Connection verified. Current block: {block_number}")
-        except Exception as conn_test_error:
-            raise Exception(
-                f"Cannot communicate with blockchain node at {RPC_URL}. "
-                f"Error: {str(conn_test_error)}. "
-                f"Please verify: 1) Hardhat node is running (npx hardhat node), "
-                f"2) RPC URL is correct ({RPC_URL}), 3) No firewall blocking the connection."
-            )
-        
         contract = get_contract()
         
-        # Get nonce
-        nonce = web3.eth.get_transaction_count(PUBLIC_ADDRESS)
-        
-        # Build transaction
-        tx = contract.functions.issueCertificate(cert_id, batch_id, issuer).build_transaction({
-            "from": PUBLIC_ADDRESS,
-            "nonce": nonce,
-            "gas": 3000000,
-            "gasPrice": web3.to_wei("5", "gwei")
-        })
-        
-        # Sign transaction
-        signed_tx = web3.eth.account.sign_transaction(tx, private_key=PRIVATE_KEY)
-        
-        # Send transaction
-        # eth-account v0.13.0+ uses raw_transaction (snake_case)
-        # Older versions use rawTransaction (camelCase)
-        if hasattr(signed_tx, 'raw_transaction'):
-            raw_tx = signed_tx.raw_transaction
-        elif hasattr(signed_tx, 'rawTransaction'):
-            raw_tx = signed_tx.rawTransaction
-        else:
-            raise ValueError(
-                "Cannot find raw transaction attribute. "
-                "SignedTransaction object has neither 'raw_transaction' nor 'rawTransaction'. "
-                "Please check eth-account library version."
-            )
-        
-        tx_hash = web3.eth.send_raw_transaction(raw_tx)
+        # Build, sign and send with a locally allocated nonce
+        tx_hash = _sign_and_send(web3, contract.functions.issueCertificate(cert_id, batch_id, issuer))
         tx_hash_hex = web3.to_hex(tx_hash)
         
         logger.info(f"Certificate transaction sent: {tx_hash_hex}")
@@ -461,26 +786,328 @@ def issue_certificate_on_chain(cert_id, batch_id, issuer):
         raise
 
 
+def _read_certificate_from_chain(cert_id):
+    """Call getCertificate. Returns certificate data, or None if the contract has no such certificate; other errors raise."""
+    contract = get_contract()
+    try:
+        certificate = contract.functions.getCertificate(cert_id).call()
+    except Exception as call_err:
+        if _is_not_found_error(call_err):
+            return None
+        raise
+
+    return {
+        'certId': certificate[0],
+        'batchId': certificate[1],
+        'issuer': certificate[2],
+        'timestamp': certificate[3],
+    }
+
+
 def get_certificate_from_chain(cert_id):
     """
-    Read certificate data from blockchain.
+    Read certificate data from blockchain (through the read cache).
     Returns certificate data or None if not found.
     """
     try:
-        contract = get_contract()
-        certificate = contract.functions.getCertificate(cert_id).call()
-        
-        return {
-            'certId': certificate[0],
-            'batchId': certificate[1],
-            'issuer': certificate[2],
-            'timestamp': certificate[3],
-        }
+        return _cached_chain_read('certificate', cert_id, _read_certificate_from_chain)
     except Exception as e:
         logger.error(f"Error reading certificate from blockchain: {str(e)}")
         return None
 
 
+def _require_signing_config():
+    """Raise if the environment is missing anything needed to sign transactions."""
+    if not PRIVATE_KEY:
+        raise ValueError("PRIVATE_KEY environment variable is not set. Please set it in your .env file.")
+    if not PUBLIC_ADDRESS:
+        raise ValueError("PUBLIC_ADDRESS environment variable is not set. Please set it in your .env file.")
+    if not CONTRACT_ADDRESS:
+        raise ValueError("CONTRACT_ADDRESS environment variable is not set. Please deploy the contract first and set it in your .env file.")
+
+
+@_counts_rpc_calls
+def submit_contract_transaction(function_name, *args):
+    """
+    Sign and send a contract transaction without waiting for it to be mined.
+
+    Nonces come from the local nonce manager, so many transactions can be sent
+    back to back from the same key. Track them with get_transaction_receipts().
+    Returns the transaction hash as a hex string.
+    """
+    _require_signing_config()
+    web3 = get_web3()
+    contract = get_contract()
+
+    tx_hash = _sign_and_send(web3, getattr(contract.functions, function_name)(*args))
+    tx_hash_hex = web3.to_hex(tx_hash)
+    logger.info(f"{function_name} transaction sent: {tx_hash_hex}")
+    return tx_hash_hex
+
+
+def submit_batch_to_chain(batch_id, description):
+    """Send a createBatch transaction. Returns the tx hash without waiting for the receipt."""
+    return submit_contract_transaction('createBatch', batch_id, description)
+
+
+def submit_lab_test_to_chain(test_id, batch_id, result):
+    """Send an addLabTest transaction. Returns the tx hash without waiting for the receipt."""
+    return submit_contract_transaction('addLabTest', test_id, batch_id, result)
+
+
+def submit_certificate_to_chain(cert_id, batch_id, issuer):
+    """Send an issueCertificate transaction. Returns the tx hash without waiting for the receipt."""
+    return submit_contract_transaction('issueCertificate', cert_id, batch_id, issuer)
+
+
+def submit_anchor_root(root, leaf_count):
+    """Send an anchorRoot transaction for a Merkle root (hex). Returns the tx hash without waiting for the receipt."""
+    return submit_contract_transaction('anchorRoot', bytes.fromhex(root[2:]), leaf_count)
+
+
+def get_root_timestamp(root, anchored_by):
+    """Block timestamp the account anchored_by anchored a Merkle root (hex) at, or 0 if it never did."""
+    contract = get_contract()
+    return contract.functions.getRootTimestamp(bytes.fromhex(root[2:]), Web3.to_checksum_address(anchored_by)).call()
+
+
+def _abi_string_bytes(value):
+    """Bytes a string takes in ABI-encoded calldata (offset + length + padded data)."""
+    length = len(value.encode('utf-8'))
+    return 64 + (length + 31) // 32 * 32
+
+
+def _string_storage_slots(value):
+    """Storage slots used by a string (short strings are packed into one slot)."""
+    length = len(value.encode('utf-8'))
+    return 1 if length < 32 else 1 + (length + 31) // 32
+
+
+def _estimate_item_gas(item, fixed_slots):
+    """Rough gas cost of storing one record made of strings plus `fixed_slots` scalar fields."""
+    calldata_bytes = sum(_abi_string_bytes(value) for value in item)
+    storage_slots = sum(_string_storage_slots(value) for value in item) + fixed_slots
+    # 16 gas per calldata byte, 8 per byte of event data
+    return _ITEM_OVERHEAD_GAS + storage_slots * _SSTORE_GAS + calldata_bytes * 24
+
+
+def _chunk_items(items, fixed_slots):
+    """
+    Split records into chunks that each fit in one transaction.
+
+    Yields (chunk, estimated_gas) pairs, keeping each chunk under
+    BULK_TX_GAS_LIMIT and BULK_TX_MAX_BYTES.
+    """
+    chunk, chunk_gas, chunk_bytes = [], _TX_BASE_GAS, 0
+    for item in items:
+        item_gas = _estimate_item_gas(item, fixed_slots)
+        item_bytes = sum(_abi_string_bytes(value) for value in item)
+        if chunk and (chunk_gas + item_gas > BULK_TX_GAS_LIMIT or chunk_bytes + item_bytes > BULK_TX_MAX_BYTES):
+            yield chunk, chunk_gas
+            chunk, chunk_gas, chunk_bytes = [], _TX_BASE_GAS, 0
+        chunk.append(item)
+        chunk_gas += item_gas
+        chunk_bytes += item_bytes
+    if chunk:
+        yield chunk, chunk_gas
+
+
+def _submit_in_chunks(function_name, items, fixed_slots):
+    """
+    Send records through a multi-record contract function, chunked by gas.
+
+    Each item is a tuple of the function's string arguments for one record.
+    Transactions are sent back to back without waiting for receipts.
+    Returns a list of {'tx_hash': str, 'items': list} in submission order.
+    """
+    _require_signing_config()
+    items = [tuple(item) for item in items]
+    if not items:
+        return []
+
+    web3 = get_web3()
+    contract = get_contract()
+    contract_function = getattr(contract.functions, function_name)
+
+    submitted = []
+    for chunk, estimated_gas in _chunk_items(items, fixed_slots):
+        columns = [list(column) for column in zip(*chunk)]
+        gas = min(BULK_TX_GAS_LIMIT, int(estimated_gas * 1.2))
+        tx_hash = _sign_and_send(web3, contract_function(*columns), gas=gas)
+        tx_hash_hex = web3.to_hex(tx_hash)
+        logger.info(f"{function_name} transaction sent with {len(chunk)} records: {tx_hash_hex}")
+        submitted.append({'tx_hash': tx_hash_hex, 'items': chunk})
+    return submitted
+
+
+@_counts_rpc_calls
+def submit_batches_to_chain(batches):
+    """
+    Send many (batch_id, description) pairs through createBatches, chunked by gas.
+    Returns [{'tx_hash', 'items'}] without waiting for receipts.
+    """
+    # Batch struct: batchId, description + timestamp, createdBy
+    return _submit_in_chunks('createBatches', batches, fixed_slots=2)
+
+
+@_counts_rpc_calls
+def submit_lab_tests_to_chain(lab_tests):
+    """
+    Send many (test_id, batch_id, result) tuples through addLabTests, chunked by gas.
+    Returns [{'tx_hash', 'items'}] without waiting for receipts.
+    """
+    return _submit_in_chunks('addLabTests', lab_tests, fixed_slots=1)
+
+
+@_counts_rpc_calls
+def submit_certificates_to_chain(certificates):
+    """
+    Send many (cert_id, batch_id, issuer) tuples through issueCertificates, chunked by gas.
+    Returns [{'tx_hash', 'items'}] without waiting for receipts.
+    """
+    return _submit_in_chunks('issueCertificates', certificates, fixed_slots=1)
+
+
+@_counts_rpc_calls
+def add_batches_to_chain(batches, timeout=120):
+    """
+    Record many (batch_id, description) pairs on the blockchain and wait for them.
+
+    Batches are grouped into as few createBatches transactions as the gas
+    limit allows, sent back to back, then confirmed together.
+    Returns [{'tx_hash', 'items', 'status', 'blockNumber'}]; status is None
+    for chunks still unconfirmed after `timeout` seconds.
+    """
+    submitted = submit_batches_to_chain(batches)
+    pending = {chunk['tx_hash']: chunk for chunk in submitted}
+    for chunk in submitted:
+        chunk['status'] = None
+        chunk['blockNumber'] = None
+
+    deadline = time.time() + timeout
+    while pending and time.time() < deadline:
+        for tx_hash, receipt in get_transaction_receipts(list(pending)).items():
+            if receipt is None:
+                continue
+            chunk = pending.pop(tx_hash)
+            chunk.update(receipt)
+            if receipt['status'] != 1:
+                logger.error(f"createBatches transaction {tx_hash} failed with status {receipt['status']}")
+        if pending:
+            time.sleep(1)
+
+    if pending:
+        logger.warning(f"{len(pending)} createBatches transaction(s) not confirmed after {timeout}s")
+    return submitted
+
+
+def get_transaction_receipts(tx_hashes):
+    """
+    Look up receipts for many transactions using batched eth_getTransactionReceipt calls.
+
+    Returns a dict mapping each tx hash to {'status': int, 'blockNumber': int},
+    or to None while the transaction is still pending. Hashes whose lookup
+    returned an error are left out.
+    """
+    web3 = get_web3()
+    tx_hashes = list(tx_hashes)
+    receipts = {}
+
+    for start in range(0, len(tx_hashes), RECEIPT_BATCH_SIZE):
+        chunk = tx_hashes[start:start + RECEIPT_BATCH_SIZE]
+        responses = web3.provider.make_batch_request(
+            [("eth_getTransactionReceipt", [tx_hash]) for tx_hash in chunk]
+        )
+        if not isinstance(responses, list):
+            # The node rejected the whole batch and returned a single error object
+            raise Exception(f"Batched receipt lookup failed: {responses.get('error', responses)}")
+
+        for tx_hash, response in zip(chunk, responses):
+            if response.get('error'):
+                logger.warning(f"Receipt lookup for {tx_hash} failed: {response['error']}")
+                continue
+            receipt = response.get('result')
+            if receipt is None:
+                receipts[tx_hash] = None
+            else:
+                receipts[tx_hash] = {
+                    'status': int(receipt['status'], 16),
+                    'blockNumber': int(receipt['blockNumber'], 16),
+                }
+
+    return receipts
+
+
+# Contract events mirrored by the indexer (batches.chain_index)
+INDEXED_EVENTS = ('BatchCreated', 'LabTestAdded', 'CertificateIssued')
+
+
+def get_contract_events(from_block, to_block, event_names=INDEXED_EVENTS):
+    """
+    Fetch and decode contract events in a block range with one eth_getLogs call.
+
+    Returns a list of dicts with 'event', 'args', 'blockNumber', 'blockHash',
+    'transactionHash' and 'logIndex', in chain order.
+    """
+    web3 = get_web3()
+    contract = get_contract()
+    events = {}
+    for name in event_names:
+        event = getattr(contract.events, name)
+        events[event.topic] = (name, event())
+
+    logs = web3.eth.get_logs({
+        'address': contract.address,
+        'fromBlock': from_block,
+        'toBlock': to_block,
+        'topics': [list(events)],
+    })
+
+    decoded = []
+    for log in logs:
+        name, event = events[web3.to_hex(log['topics'][0])]
+        data = event.process_log(log)
+        decoded.append({
+            'event': name,
+            'args': dict(data['args']),
+            'blockNumber': data['blockNumber'],
+            'blockHash': web3.to_hex(data['blockHash']),
+            'transactionHash': web3.to_hex(data['transactionHash']),
+            'logIndex': data['logIndex'],
+        })
+    return decoded
+
+
+def get_blocks(block_numbers):
+    """
+    Look up block hashes and timestamps with batched eth_getBlockByNumber calls.
+
+    Returns a dict mapping block number to {'hash': str, 'timestamp': int};
+    blocks the node does not have yet are left out.
+    """
+    web3 = get_web3()
+    block_numbers = list(block_numbers)
+    blocks = {}
+
+    for start in range(0, len(block_numbers), RECEIPT_BATCH_SIZE):
+        chunk = block_numbers[start:start + RECEIPT_BATCH_SIZE]
+        responses = web3.provider.make_batch_request(
+            [("eth_getBlockByNumber", [hex(number), False]) for number in chunk]
+        )
+        if not isinstance(responses, list):
+            raise Exception(f"Batched block lookup failed: {responses.get('error', responses)}")
+
+        for number, response in zip(chunk, responses):
+            block = response.get('result')
+            if block:
+                blocks[number] = {
+                    'hash': block['hash'],
+                    'timestamp': int(block['timestamp'], 16),
+                }
+
+    return blocks
+
+
 def test_connection():
     """
     Test blockchain connection without initializing contract.
@@ -494,7 +1121,9 @@ def test_connection():
             'connected': True,
             'chain_id': chain_id,
             'block_number': block_number,
-            'rpc_url': RPC_URL
+            'rpc_url': RPC_URL,
+            'read_cache': get_read_cache_stats(),
+            'rpc_calls': get_rpc_call_stats(),
         }
     except Exception as e:
         return {
@@ -0,0 +1,81 @@
+"""
+Merkle trees for anchoring many records under one on-chain root.
+
+Leaves are keccak256 hashes of a canonical JSON encoding of each record.
+Interior nodes hash the two children in sorted order, so a proof is just the
+list of sibling hashes from leaf to root (no left/right flags). Leaves and
+nodes use different prefixes so a leaf can never be passed off as a node.
+"""
+import json
+from eth_utils import keccak
+
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+
+def _to_bytes(value):
+    if isinstance(value, bytes):
+        return value
+    return bytes.fromhex(value[2:] if value.startswith('0x') else value)
+
+
+def _to_hex(value):
+    return '0x' + value.hex()
+
+
+def encode_leaf(data):
+    """Canonical bytes for a record dict (sorted keys, no whitespace)."""
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def leaf_hash(data):
+    """Hash of one record dict, as a 0x-prefixed hex string."""
+    return _to_hex(keccak(LEAF_PREFIX + encode_leaf(data)))
+
+
+def _hash_pair(a, b):
+    return keccak(NODE_PREFIX + min(a, b) + max(a, b))
+
+
+def build_tree(leaf_hashes):
+    """
+    Build the tree bottom-up from leaf hashes.
+
+    Returns a list of levels (bytes), leaves first and root last. An odd node
+    at the end of a level is carried up unchanged.
+    """
+    if not leaf_hashes:
+        raise ValueError("Cannot build a Merkle tree with no leaves")
+
+    levels = [[_to_bytes(h) for h in leaf_hashes]]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [_hash_pair(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+
+def tree_root(levels):
+    """Root of a tree from build_tree(), as hex."""
+    return _to_hex(levels[-1][0])
+
+
+def merkle_proof(levels, index):
+    """Sibling hashes (hex) proving the leaf at `index` is in the tree."""
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append(_to_hex(level[sibling]))
+        index //= 2
+    return proof
+
+
+def verify_proof(leaf, proof, root):
+    """Return True if `leaf` (hex) hashes up to `root` (hex) through `proof`."""
+    node = _to_bytes(leaf)
+    for sibling in proof:
+        node = _hash_pair(node, _to_bytes(sibling))
+    return node == _to_bytes(root)
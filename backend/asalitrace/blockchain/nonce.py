@@ -0,0 +1,135 @@
+"""
+Nonce allocation for the shared signing account.
+
+Nonces are handed out from a local counter instead of asking the node with
+get_transaction_count() before every transaction, so concurrent writers never
+sign with the same nonce and many transactions can be in flight at once.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Error fragments returned by Hardhat/Geth when a nonce is reused or skipped
+NONCE_ERROR_MARKERS = (
+    'nonce too low',
+    'nonce too high',
+    'invalid nonce',
+    'nonce has already been used',
+    'already known',
+    'known transaction',
+    'replacement transaction underpriced',
+)
+
+
+def is_nonce_error(error):
+    """Return True if a send error means our local nonce is out of sync with the node."""
+    message = str(error).lower()
+    return any(marker in message for marker in NONCE_ERROR_MARKERS)
+
+
+class NonceManager:
+    """
+    Hands out nonces for one account from a local counter.
+
+    The counter is seeded from the node's pending transaction count and only
+    goes back to the node when resync() is called (after a nonce error, or a
+    send that failed after it may have reached the node).
+
+    Backends:
+        memory - counter held in this process, guarded by a thread lock
+        file   - counter held in a lock file (fcntl), shared by every process
+                 on the host that signs with the same key (e.g. gunicorn workers)
+    """
+
+    def __init__(self, web3_getter, address, backend='memory', lock_path=None):
+        if backend not in ('memory', 'file'):
+            raise ValueError(f"Unknown nonce backend '{backend}'. Use 'memory' or 'file'.")
+        if backend == 'file' and fcntl is None:
+            raise RuntimeError("NONCE_BACKEND=file needs fcntl, which is not available on this platform. Use NONCE_BACKEND=memory.")
+
+        self._get_web3 = web3_getter
+        self.address = address
+        self.backend = backend
+        self.lock_path = lock_path or os.path.join(
+            tempfile.gettempdir(), f"asalitrace-nonce-{address.lower()}.json"
+        )
+        self._lock = threading.Lock()
+        self._next_nonce = None
+
+    def _node_nonce(self):
+        """Next nonce according to the node, including transactions still in the mempool."""
+        return self._get_web3().eth.get_transaction_count(self.address, 'pending')
+
+    @contextmanager
+    def _counter(self):
+        """
+        Lock the counter and yield a dict holding it.
+
+        Changes to the dict are persisted when the block exits normally.
+        """
+        with self._lock:
+            if self.backend == 'memory':
+                state = {'next_nonce': self._next_nonce}
+                yield state
+                self._next_nonce = state['next_nonce']
+                return
+
+            with open(self.lock_path, 'a+') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    content = f.read()
+                    state = json.loads(content) if content.strip() else {'next_nonce': None}
+                    yield state
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(state))
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def allocate(self):
+        """Reserve and return the next nonce."""
+        with self._counter() as state:
+            if state['next_nonce'] is None:
+                state['next_nonce'] = self._node_nonce()
+            nonce = state['next_nonce']
+            state['next_nonce'] = nonce + 1
+        return nonce
+
+    def release(self, nonce):
+        """
+        Give back a nonce whose transaction was never broadcast.
+
+        If it was the most recent allocation the counter simply steps back;
+        otherwise later nonces are already out and the gap can only be closed
+        by resyncing, so the next allocation reads the count from the node.
+        """
+        with self._counter() as state:
+            if state['next_nonce'] == nonce + 1:
+                state['next_nonce'] = nonce
+            else:
+                state['next_nonce'] = None
+
+    def forget(self):
+        """Drop the counter, so the next allocation reads it from the node."""
+        with self._counter() as state:
+            state['next_nonce'] = None
+
+    def resync(self):
+        """Reset the counter from the node (after a nonce-too-low or gap error)."""
+        with self._counter() as state:
+            state['next_nonce'] = self._node_nonce()
+            nonce = state['next_nonce']
+        logger.warning(f"Nonce counter for {self.address} resynced with node at {nonce}")
+        return nonce
@@ -0,0 +1,172 @@
+"""
+Web3 providers with pooled keep-alive connections to the RPC node.
+
+Web3's HTTPProvider opens one requests.Session per thread, each with its own
+small connection pool, so a busy gunicorn worker keeps setting up new TCP/TLS
+connections to the node. PooledHTTPProvider sends every request, from any
+thread, through a single keep-alive session with a sized connection pool.
+
+For ASGI deployments, make_async_web3() builds an AsyncWeb3 whose aiohttp
+session is pooled the same way.
+
+PooledHTTPProvider also counts the requests it sends, so callers can see how
+many RPC calls a logical operation makes (see count_rpc_calls()).
+"""
+import threading
+from collections import Counter
+from contextlib import contextmanager
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from web3 import AsyncWeb3, AsyncHTTPProvider, Web3
+from web3._utils.http_session_manager import HTTPSessionManager
+
+
+def build_session(pool_size, retries=0):
+    """
+    requests.Session with a keep-alive pool of `pool_size` connections.
+
+    When all connections are busy, callers wait for one instead of opening
+    throwaway connections past the pool size. `retries` re-sends requests
+    that fail to connect (the request never reached the node, so this is safe
+    for transactions too).
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,  # one RPC host
+        pool_maxsize=pool_size,
+        pool_block=True,
+        max_retries=Retry(total=retries, connect=retries, read=0, status=0, other=0, backoff_factor=0.2),
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+# --- RPC call counting ---
+
+class RPCCallLog:
+    """RPC requests sent by one thread during a count_rpc_calls() block."""
+
+    def __init__(self):
+        self.methods = Counter()  # method => requests, batch entries counted one by one
+        self.round_trips = 0      # HTTP requests (a JSON-RPC batch is one)
+
+    @property
+    def total(self):
+        return sum(self.methods.values())
+
+    def record(self, methods):
+        self.methods.update(methods)
+        self.round_trips += 1
+
+    def as_dict(self):
+        return {'total': self.total, 'round_trips': self.round_trips, 'methods': dict(self.methods)}
+
+
+_active_logs = threading.local()
+_operation_stats = {}
+_operation_stats_lock = threading.Lock()
+
+
+@contextmanager
+def count_rpc_calls(operation=None):
+    """
+    Count the RPC requests this thread sends inside the block.
+
+    Yields an RPCCallLog. Blocks can be nested; every open log sees the calls.
+    With `operation`, the counts are also added to the process-wide totals
+    returned by get_rpc_call_stats().
+    """
+    log = RPCCallLog()
+    logs = getattr(_active_logs, 'logs', None)
+    if logs is None:
+        logs = _active_logs.logs = []
+    logs.append(log)
+    try:
+        yield log
+    finally:
+        logs.remove(log)
+        if operation:
+            with _operation_stats_lock:
+                stats = _operation_stats.setdefault(operation, {'operations': 0, 'calls': 0, 'round_trips': 0})
+                stats['operations'] += 1
+                stats['calls'] += log.total
+                stats['round_trips'] += log.round_trips
+
+
+def get_rpc_call_stats():
+    """Per-operation totals, with the average RPC calls per operation."""
+    with _operation_stats_lock:
+        stats = {operation: dict(totals) for operation, totals in _operation_stats.items()}
+    for totals in stats.values():
+        totals['calls_per_operation'] = round(totals['calls'] / totals['operations'], 2)
+    return stats
+
+
+def _record_rpc_calls(methods):
+    for log in getattr(_active_logs, 'logs', None) or ():
+        log.record(methods)
+
+
+class SharedSessionManager(HTTPSessionManager):
+    """Session manager that hands every thread the same pooled session."""
+
+    def __init__(self, session):
+        super().__init__()
+        self.session = session
+
+    def cache_and_return_session(self, endpoint_uri, session=None, request_timeout=None):
+        # requests.Session is safe to share for this use: urllib3's pool is
+        # thread-safe and RPC calls do not rely on cookies or auth state.
+        return self.session
+
+
+class PooledHTTPProvider(Web3.HTTPProvider):
+    """
+    HTTPProvider backed by one keep-alive connection pool shared across threads.
+    Requests sent inside count_rpc_calls() blocks are counted.
+    """
+
+    def __init__(self, endpoint_uri, pool_size=20, timeout=30, retries=0, **kwargs):
+        super().__init__(endpoint_uri, request_kwargs={'timeout': timeout}, **kwargs)
+        self.pool_size = pool_size
+        self._request_session_manager = SharedSessionManager(build_session(pool_size, retries))
+
+    def _make_request(self, method, request_data):
+        _record_rpc_calls([method])
+        return super()._make_request(method, request_data)
+
+    def make_batch_request(self, batch_requests):
+        _record_rpc_calls([method for method, _params in batch_requests])
+        return super().make_batch_request(batch_requests)
+
+    @property
+    def session(self):
+        return self._request_session_manager.session
+
+    def close(self):
+        """Close every pooled connection."""
+        self.session.close()
+
+
+async def make_async_web3(endpoint_uri, pool_size=20, timeout=30):
+    """
+    AsyncWeb3 for the running event loop, with a pooled aiohttp session.
+
+    aiohttp sessions are bound to the loop they were created on, so create
+    one instance per loop (see eth_adapter.get_async_web3).
+    """
+    provider = AsyncHTTPProvider(
+        endpoint_uri,
+        request_kwargs={'timeout': aiohttp.ClientTimeout(total=timeout)},
+        cache_allowed_requests=True,
+        cacheable_requests={'eth_chainId'},
+    )
+    session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=pool_size, keepalive_timeout=60),
+        timeout=aiohttp.ClientTimeout(total=timeout),
+    )
+    await provider.cache_async_session(session)
+    return AsyncWeb3(provider)
@@ -75,7 +75,8 @@ MIDDLEWARE = [
     "django_otp.middleware.OTPMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    'allauth.account.middleware.AccountMiddleware'
+    'allauth.account.middleware.AccountMiddleware',
+    "batches.audit.AuditFlushMiddleware",
 ]
 
 CORS_ALLOWED_ORIGINS = [
@@ -99,6 +100,14 @@ REST_FRAMEWORK = {
     ),
 }
 
+# Encode JSON responses with orjson (batches.renderers; needs `pip install orjson`)
+ORJSON_RENDERER = os.environ.get("ORJSON_RENDERER", "false").lower() == "true"
+if ORJSON_RENDERER:
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] = (
+        "batches.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    )
+
 # JWT Settings
 from datetime import timedelta
 SIMPLE_JWT = {
@@ -182,4 +191,106 @@ SOCIALACCOUNT_PROVIDERS = {
 # Static files
 STATIC_URL = "/static/"
 
-DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
\ No newline at end of file
+DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Cache: set REDIS_URL (e.g. redis://127.0.0.1:6379/1) to share it between
+# gunicorn workers and the chain worker; without it each process keeps its own
+# LocMem cache, which is only fit for a single development process
+REDIS_URL = os.environ.get("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# On-chain write queue (batches.chain_queue / manage.py chain_worker)
+CHAIN_WRITE_MAX_ATTEMPTS = int(os.environ.get("CHAIN_WRITE_MAX_ATTEMPTS", "5"))
+CHAIN_WRITE_RETRY_DELAY = int(os.environ.get("CHAIN_WRITE_RETRY_DELAY", "10"))  # seconds, doubled per attempt
+CHAIN_WRITE_LEASE_SECONDS = int(os.environ.get("CHAIN_WRITE_LEASE_SECONDS", "300"))
+CHAIN_RECEIPT_TIMEOUT = int(os.environ.get("CHAIN_RECEIPT_TIMEOUT", "600"))  # seconds before a submitted tx is replaced at a higher gas price
+# Group first attempts of the same kind into one createBatches/addLabTests/issueCertificates call
+CHAIN_WRITE_BATCH_CALLS = os.environ.get("CHAIN_WRITE_BATCH_CALLS", "false").lower() == "true"
+
+# Merkle anchoring (batches.anchoring): commit one root per window instead of every record
+CHAIN_ANCHOR_MODE = os.environ.get("CHAIN_ANCHOR_MODE", "false").lower() == "true"
+CHAIN_ANCHOR_WINDOW = int(os.environ.get("CHAIN_ANCHOR_WINDOW", "60"))  # seconds of records per root
+CHAIN_ANCHOR_MAX_LEAVES = int(os.environ.get("CHAIN_ANCHOR_MAX_LEAVES", "1000"))
+
+# Chain event indexer (batches.chain_index / manage.py index_chain_events)
+CHAIN_INDEXER_CONFIRMATIONS = int(os.environ.get("CHAIN_INDEXER_CONFIRMATIONS", "6"))  # blocks behind head
+CHAIN_INDEXER_BLOCK_CHUNK = int(os.environ.get("CHAIN_INDEXER_BLOCK_CHUNK", "2000"))  # blocks per eth_getLogs
+CHAIN_INDEXER_START_BLOCK = int(os.environ.get("CHAIN_INDEXER_START_BLOCK", "0"))  # contract deployment block
+CHAIN_INDEXER_REORG_DEPTH = int(os.environ.get("CHAIN_INDEXER_REORG_DEPTH", "64"))  # blocks re-indexed after a reorg
+
+# Max batch IDs accepted by POST /api/batches/verify-bulk/
+VERIFY_BULK_MAX_IDS = int(os.environ.get("VERIFY_BULK_MAX_IDS", "500"))
+
+# Denormalized journey timeline (batches.timeline): keep a BatchTimeline row
+# per batch up to date on every write so the journey endpoint is one read
+BATCH_TIMELINE_ENABLED = os.environ.get("BATCH_TIMELINE_ENABLED", "false").lower() == "true"
+
+# Page size for the batch, lab test and certificate lists (batches.pagination)
+API_PAGE_SIZE = int(os.environ.get("API_PAGE_SIZE", "50"))
+API_MAX_PAGE_SIZE = int(os.environ.get("API_MAX_PAGE_SIZE", "500"))
+
+# Seconds the public statistics response is cached (batches.statistics)
+STATISTICS_CACHE_SECONDS = int(os.environ.get("STATISTICS_CACHE_SECONDS", "30"))
+# Rows each statistics counter is split over, so concurrent writes update different rows
+STATISTICS_COUNTER_SHARDS = int(os.environ.get("STATISTICS_COUNTER_SHARDS", "16"))
+
+# Audit log writes (batches.audit): "sync" saves each entry in the request's
+# transaction; "buffered" bulk-writes committed entries at request end or every
+# AUDIT_LOG_BUFFER_SIZE entries; "async" hands them to a background writer
+# thread (best effort: entries not yet written are lost if the process dies)
+AUDIT_LOG_MODE = os.environ.get("AUDIT_LOG_MODE", "sync").lower()
+AUDIT_LOG_BUFFER_SIZE = int(os.environ.get("AUDIT_LOG_BUFFER_SIZE", "100"))
+AUDIT_LOG_QUEUE_SIZE = int(os.environ.get("AUDIT_LOG_QUEUE_SIZE", "10000"))
+
+# Audit log archival (batches.audit_storage / manage.py archive_audit_logs):
+# months older than AUDIT_LOG_HOT_MONTHS move to AUDIT_ARCHIVE_FORMAT files
+# ("ndjson" = gzipped NDJSON, "parquet" needs pyarrow) in AUDIT_ARCHIVE_DIR
+AUDIT_LOG_HOT_MONTHS = int(os.environ.get("AUDIT_LOG_HOT_MONTHS", "12"))
+AUDIT_ARCHIVE_DIR = os.environ.get("AUDIT_ARCHIVE_DIR", str(BASE_DIR / "audit_archive"))
+AUDIT_ARCHIVE_FORMAT = os.environ.get("AUDIT_ARCHIVE_FORMAT", "ndjson").lower()
+
+# Bulk batch import (batches.bulk_import): rows per transaction, and the most
+# rows POST /api/batches/bulk/ reads (manage.py import_batches has no limit)
+BULK_IMPORT_CHUNK_SIZE = int(os.environ.get("BULK_IMPORT_CHUNK_SIZE", "500"))
+BULK_IMPORT_MAX_ROWS = int(os.environ.get("BULK_IMPORT_MAX_ROWS", "50000"))
+
+# Rows fetched per database round trip and sent per chunk by the streaming
+# exports (batches.export)
+EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", "2000"))
+
+# Batch search index (batches.search): "auto" uses the tsvector + pg_trgm
+# index on PostgreSQL and FTS5 on SQLite; "basic" matches without an index
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "auto").lower()
+
+# Background admin actions (batches.admin_tasks, run by manage.py admin_tasks):
+# where exports are written, and when a task stuck in "running" is retried
+ADMIN_EXPORT_DIR = os.environ.get("ADMIN_EXPORT_DIR", str(BASE_DIR / "admin_exports"))
+ADMIN_TASK_LEASE_SECONDS = int(os.environ.get("ADMIN_TASK_LEASE_SECONDS", "3600"))
+
+# Unfiltered admin changelists above this many rows show the planner's
+# estimated row count instead of running COUNT(*) (batches.admin)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(os.environ.get("ADMIN_ESTIMATED_COUNT_THRESHOLD", "100000"))
+
+# Seconds the lab quality analytics response is cached (batches.analytics)
+LAB_ANALYTICS_CACHE_SECONDS = int(os.environ.get("LAB_ANALYTICS_CACHE_SECONDS", "300"))
+
+# Public verification records for QR scans (batches.public_verification):
+# max-age and stale-while-revalidate sent to browsers and shared caches, and
+# how long the server-side rendered record counts as fresh (shorter while any
+# part of it is not on chain yet)
+PUBLIC_VERIFICATION_MAX_AGE = int(os.environ.get("PUBLIC_VERIFICATION_MAX_AGE", "60"))
+PUBLIC_VERIFICATION_STALE_SECONDS = int(os.environ.get("PUBLIC_VERIFICATION_STALE_SECONDS", "600"))
+PUBLIC_VERIFICATION_CACHE_SECONDS = int(os.environ.get("PUBLIC_VERIFICATION_CACHE_SECONDS", "3600"))
+PUBLIC_VERIFICATION_UNVERIFIED_SECONDS = int(os.environ.get("PUBLIC_VERIFICATION_UNVERIFIED_SECONDS", "60"))
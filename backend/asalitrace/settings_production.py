@@ -8,6 +8,7 @@ or copy relevant settings to your main settings.py
 import os
 from pathlib import Path
 from datetime import timedelta
+from django.core.exceptions import ImproperlyConfigured
 from .settings import *  # Import base settings
 
 # Override base settings for production
@@ -118,13 +119,11 @@ EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', EMAIL_HOST_USER)
 
-# Cache configuration (optional - for performance)
-# CACHES = {
-#     'default': {
-#         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
-#         'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
-#     }
-# }
+# Cache configuration: CACHES is built from REDIS_URL in settings.py. The
+# public verification records, statistics and chain read cache must be shared
+# between gunicorn workers and the chain worker, so production needs Redis
+if not REDIS_URL:
+    raise ImproperlyConfigured("REDIS_URL must be set in production (e.g. redis://127.0.0.1:6379/1)")
 
 # Session configuration
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'
@@ -0,0 +1,51 @@
+"""
+Who can see which batch.
+
+BatchAccess holds one row per (user, batch) for the batch's creator and its
+current owner. "Batches this user can access" is then a single indexed join
+on BatchAccess(user, batch) instead of `created_by = user OR owner = user`,
+which Postgres cannot answer from one index.
+
+batches.signals calls sync_batch_access() whenever a batch is created or its
+creator or owner changes. Code that writes batches without signals
+(bulk_create, queryset.update) must call sync_batch_access() itself.
+"""
+from django.db.models import Q
+from .models import Batch, BatchAccess
+
+
+def batch_access_users(batch):
+    """IDs of the users a batch grants access to."""
+    return {batch.created_by_id, batch.owner_id} - {None}
+
+
+def sync_batch_access(batches):
+    """Make the BatchAccess rows of the given batches match their creator and owner."""
+    batches = list(batches)
+    if not batches:
+        return
+    wanted = {(user_id, batch.pk) for batch in batches for user_id in batch_access_users(batch)}
+    existing = set(
+        BatchAccess.objects.filter(batch__in=[batch.pk for batch in batches]).values_list('user_id', 'batch_id')
+    )
+
+    stale = existing - wanted
+    if stale:
+        stale_filter = Q()
+        for user_id, batch_id in stale:
+            stale_filter |= Q(user_id=user_id, batch_id=batch_id)
+        BatchAccess.objects.filter(stale_filter).delete()
+    BatchAccess.objects.bulk_create(
+        [BatchAccess(user_id=user_id, batch_id=batch_id) for user_id, batch_id in wanted - existing],
+        ignore_conflicts=True,
+    )
+
+
+def accessible_batches(user):
+    """Batches a (non-admin) user created or owns, as one indexed join."""
+    return Batch.objects.filter(access__user=user)
+
+
+def accessible_batch_ids(user):
+    """Subquery of accessible batch IDs, for filtering records that belong to batches."""
+    return BatchAccess.objects.filter(user=user).values('batch_id')
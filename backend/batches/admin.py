@@ -1,34 +1,185 @@
-from django.contrib import admin
-from .models import Batch, LabTest, Certificate, AuditLog
+import os
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import connection
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html
+from .admin_tasks import enqueue_admin_task
+from .models import Batch, LabTest, Certificate, AuditLog, AdminTask
+from .search import search_batches
+
+# Best matches the admin search box shows
+ADMIN_SEARCH_LIMIT = 1000
+
+
+# --- Counting ---
+
+def estimated_row_count(model):
+    """The planner's row estimate for a model's table (summed over partitions), or None if there is none."""
+    if connection.vendor != 'postgresql':
+        return None
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT SUM(GREATEST(c.reltuples, 0))::bigint FROM pg_class c
+            WHERE c.oid = %s::regclass
+               OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass)
+            """,
+            [table, table],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Reads the planner's estimate instead of running COUNT(*) when the
+    changelist is unfiltered and the table has more than
+    ADMIN_ESTIMATED_COUNT_THRESHOLD rows. Filtered lists are counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model)
+            if estimate is not None and estimate > settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+# --- Background actions (batches.admin_tasks) ---
+
+def _queue(modeladmin, request, queryset, kind):
+    task = enqueue_admin_task(kind, queryset, request.user)
+    url = reverse('admin:batches_admintask_change', args=[task.pk])
+    modeladmin.message_user(request, format_html(
+        '{} of the selected records queued as <a href="{}">task {}</a>; the admin task worker will run it.',
+        task.get_kind_display(), url, task.pk,
+    ), messages.SUCCESS)
+
+
+@admin.action(description="Export selected as CSV (in the background)")
+def export_csv(modeladmin, request, queryset):
+    _queue(modeladmin, request, queryset, 'export')
+
+
+@admin.action(description="Re-verify selected on chain (in the background)")
+def reverify_on_chain(modeladmin, request, queryset):
+    _queue(modeladmin, request, queryset, 'reverify')
+
 
 @admin.register(Batch)
 class BatchAdmin(admin.ModelAdmin):
     list_display = ['batch_id', 'producer_name', 'honey_type', 'status', 'created_by', 'owner', 'created_at']
+    list_select_related = ['created_by', 'owner']
+    # Newest first on the (created_at, id) index; autocomplete pages need a stable order
+    ordering = ['-created_at', '-id']
     list_filter = ['status', 'honey_type', 'created_at']
     search_fields = ['batch_id', 'producer_name', 'created_by__email', 'owner__email']
+    autocomplete_fields = ['created_by', 'owner']
     readonly_fields = ['created_at', 'updated_at']
+    actions = [reverify_on_chain, export_csv]
+
+    def get_search_results(self, request, queryset, search_term):
+        """Search through the batch search index (batches.search) instead of icontains over joins."""
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(pk__in=search_batches(search_term, limit=ADMIN_SEARCH_LIMIT)), False
 
 @admin.register(LabTest)
 class LabTestAdmin(admin.ModelAdmin):
     list_display = ['batch', 'test_type', 'tested_by', 'test_date', 'created_by', 'created_at']
+    list_select_related = ['batch', 'created_by']
+    ordering = ['-created_at', '-id']
     list_filter = ['test_type', 'test_date', 'created_at']
     search_fields = ['batch__batch_id', 'tested_by', 'created_by__email']
+    autocomplete_fields = ['batch', 'created_by']
     readonly_fields = ['created_at', 'updated_at']
+    actions = [export_csv]
 
 @admin.register(Certificate)
 class CertificateAdmin(admin.ModelAdmin):
     list_display = ['certificate_id', 'batch', 'issued_by', 'issue_date', 'created_by', 'created_at']
+    list_select_related = ['batch', 'created_by']
+    ordering = ['-created_at', '-id']
     list_filter = ['issue_date', 'created_at']
     search_fields = ['certificate_id', 'issued_by', 'batch__batch_id', 'created_by__email']
+    autocomplete_fields = ['batch', 'created_by']
     readonly_fields = ['created_at', 'updated_at']
+    actions = [export_csv]
 
 @admin.register(AuditLog)
 class AuditLogAdmin(admin.ModelAdmin):
     list_display = ['action', 'user_email', 'batch', 'lab_test', 'certificate', 'timestamp', 'blockchain_tx_hash']
+    # LabTest.__str__ shows its batch
+    list_select_related = ['batch', 'lab_test__batch', 'certificate']
     list_filter = ['action', 'timestamp']
     search_fields = ['user_email', 'action_description', 'batch__batch_id']
+    autocomplete_fields = ['user', 'batch', 'lab_test', 'certificate']
     readonly_fields = ['timestamp', 'old_values', 'new_values']
-    date_hierarchy = 'timestamp'
+    # No date_hierarchy: its drill-down reads the distinct dates of the whole table
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = [export_csv]
     
     def has_add_permission(self, request):
         return False  # Audit logs should only be created programmatically
+
+@admin.register(AdminTask)
+class AdminTaskAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'model', 'status', 'requested_by', 'created_at', 'finished_at']
+    list_select_related = ['requested_by']
+    list_filter = ['kind', 'status']
+    readonly_fields = [
+        'kind', 'model', 'status', 'requested_by', 'created_at', 'started_at', 'finished_at',
+        'download', 'result', 'error',
+    ]
+    exclude = ['query', 'result_file']
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        # The list needs neither the stored query nor the result
+        if request.resolver_match and request.resolver_match.url_name == 'batches_admintask_changelist':
+            queryset = queryset.defer('query', 'result')
+        return queryset
+
+    def has_add_permission(self, request):
+        return False  # Tasks are queued by admin actions
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Export file")
+    def download(self, obj):
+        if obj.kind != 'export' or obj.status != 'done' or not obj.result_file:
+            return "-"
+        url = reverse('admin:batches_admintask_download', args=[obj.pk])
+        return format_html('<a href="{}">{}</a>', url, os.path.basename(obj.result_file))
+
+    def get_urls(self):
+        return [
+            path(
+                '<int:task_id>/download/',
+                self.admin_site.admin_view(self.download_view),
+                name='batches_admintask_download',
+            ),
+        ] + super().get_urls()
+
+    def download_view(self, request, task_id):
+        task = get_object_or_404(AdminTask, pk=task_id, kind='export', status='done')
+        if not self.has_view_permission(request, task):
+            raise Http404
+        if not task.result_file or not os.path.exists(task.result_file):
+            raise Http404("The export file is no longer there")
+        return FileResponse(
+            open(task.result_file, 'rb'),
+            as_attachment=True,
+            filename=os.path.basename(task.result_file),
+            content_type='text/csv',
+        )
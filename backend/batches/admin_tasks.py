@@ -0,0 +1,173 @@
+"""
+Bulk admin actions run outside the request.
+
+Re-verifying thousands of batches against the chain, or exporting a large
+selection, would hold an admin request open until a proxy times it out. The
+admin actions only record an AdminTask with the query of the selection
+(the changelist's filters, or the ticked rows); `manage.py admin_tasks` (a
+long-running worker, like chain_worker) claims pending tasks and runs them,
+reading the selected rows in primary key order, CHUNK_SIZE at a time:
+
+    reverify  verify_batches() in chunks of VERIFY_BULK_MAX_IDS. The task
+              result holds a count per status and the batches that did not
+              verify.
+    export    The selected rows as CSV, with the API export's columns,
+              written to ADMIN_EXPORT_DIR and downloaded from the task's
+              admin page.
+
+The query is stored pickled (QuerySet.query, as Django documents for
+re-running a query later), so it has to be run by the same Django version
+that queued it. It is capped at the table's highest primary key when the
+task was queued: records created afterwards are left out, records deleted
+since are skipped.
+"""
+import logging
+import os
+import pickle
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+from .export import (
+    AUDIT_LOG_EXPORT_FIELDS,
+    BATCH_EXPORT_FIELDS,
+    CERTIFICATE_EXPORT_FIELDS,
+    LAB_TEST_EXPORT_FIELDS,
+    encode_csv,
+)
+from .models import AdminTask, AuditLog, Batch, Certificate, LabTest
+from .verification import verify_batches
+
+logger = logging.getLogger(__name__)
+
+# Model label => (model, export columns)
+TASK_MODELS = {
+    'batches.batch': (Batch, BATCH_EXPORT_FIELDS),
+    'batches.labtest': (LabTest, LAB_TEST_EXPORT_FIELDS),
+    'batches.certificate': (Certificate, CERTIFICATE_EXPORT_FIELDS),
+    'batches.auditlog': (AuditLog, AUDIT_LOG_EXPORT_FIELDS),
+}
+
+# Rows read per query
+CHUNK_SIZE = 1000
+
+# Unverified batches listed in a re-verify result (the summary counts all of them)
+MAX_LISTED_PROBLEMS = 500
+
+
+def enqueue_admin_task(kind, queryset, user=None):
+    """
+    Queue `kind` for every record in `queryset`; returns the AdminTask.
+
+    Only the query is stored, so selecting all of a large changelist costs
+    the request one MAX(pk) lookup instead of loading every primary key.
+    """
+    last_pk = queryset.model._default_manager.aggregate(last_pk=Max('pk'))['last_pk']
+    selection = queryset.filter(pk__lte=last_pk) if last_pk is not None else queryset.none()
+    return AdminTask.objects.create(
+        kind=kind,
+        model=queryset.model._meta.label_lower,
+        query=pickle.dumps(selection.query),
+        requested_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+def selected_rows(task, fields, size=CHUNK_SIZE):
+    """The task's selected records as values_list(*fields) rows, in pk order, a list of `size` at a time."""
+    model, _ = TASK_MODELS[task.model]
+    queryset = model._default_manager.all()
+    queryset.query = pickle.loads(bytes(task.query))
+    queryset = queryset.order_by('pk').values_list('pk', *fields)
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(chunk[:size])
+        if not rows:
+            return
+        yield [row[1:] for row in rows]
+        last_pk = rows[-1][0]
+
+
+def run_reverify(task):
+    """Compare the task's batches with the chain; returns the task result."""
+    summary = Counter()
+    problems = []
+    for rows in selected_rows(task, ('batch_id',), settings.VERIFY_BULK_MAX_IDS):
+        for result in verify_batches([batch_id for batch_id, in rows]):
+            summary[result['status']] += 1
+            if result['status'] != 'verified' and len(problems) < MAX_LISTED_PROBLEMS:
+                problems.append({
+                    key: result.get(key) for key in ('batch_id', 'status', 'mismatches', 'message', 'blockchain_tx_hash')
+                    if result.get(key) is not None
+                })
+    return {'summary': dict(summary), 'checked': sum(summary.values()), 'problems': problems}
+
+
+def export_path(task):
+    model_name = task.model.split('.')[-1]
+    return os.path.join(settings.ADMIN_EXPORT_DIR, f"admin-export-{task.pk}-{model_name}.csv")
+
+
+def run_export(task):
+    """Write the task's records to a CSV file; returns the task result."""
+    _, fields = TASK_MODELS[task.model]
+    path = export_path(task)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rows = 0
+    partial = f"{path}.partial"
+    with open(partial, 'w', encoding='utf-8', newline='') as output:
+        records = (row for chunk in selected_rows(task, fields) for row in chunk)
+        for line in encode_csv(records, fields):
+            output.write(line)
+            rows += 1
+    os.replace(partial, path)
+    task.result_file = path
+    # Minus the header line
+    return {'rows': rows - 1}
+
+
+TASK_RUNNERS = {
+    'reverify': run_reverify,
+    'export': run_export,
+}
+
+
+def claim_tasks(limit=1):
+    """
+    Claim up to `limit` pending tasks for this worker. Tasks left 'running'
+    for longer than ADMIN_TASK_LEASE_SECONDS (the worker died) are retried.
+    """
+    now = timezone.now()
+    lease_expired = now - timedelta(seconds=settings.ADMIN_TASK_LEASE_SECONDS)
+    with transaction.atomic():
+        queryset = AdminTask.objects.filter(
+            Q(status='pending') | Q(status='running', started_at__lt=lease_expired)
+        ).order_by('created_at', 'id')
+        if transaction.get_connection().features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        task_ids = list(queryset.values_list('pk', flat=True)[:limit])
+        AdminTask.objects.filter(pk__in=task_ids).update(status='running', started_at=now)
+    return list(AdminTask.objects.filter(pk__in=task_ids).order_by('created_at', 'id'))
+
+
+def run_task(task):
+    try:
+        task.result = TASK_RUNNERS[task.kind](task)
+        task.status = 'done'
+        task.error = ''
+    except Exception as e:
+        logger.error(f"Admin task {task.pk} ({task.kind}) failed: {str(e)}")
+        task.status = 'failed'
+        task.error = str(e)
+    task.finished_at = timezone.now()
+    task.save(update_fields=['status', 'result', 'result_file', 'error', 'finished_at'])
+
+
+def run_pending_tasks(limit=1):
+    """Run up to `limit` pending tasks; returns how many ran."""
+    tasks = claim_tasks(limit)
+    for task in tasks:
+        run_task(task)
+    return len(tasks)
@@ -0,0 +1,205 @@
+"""
+Quality analytics over every lab measurement, computed with NumPy.
+
+All LabMeasurement rows in their analyte's canonical unit are read with one
+values_list() query into flat arrays, and every statistic is computed on the
+whole table at once, grouped by (honey type, analyte):
+
+    percentiles  p5/p25/p50/p75/p95 from one lexsort, with the same linear
+                 interpolation as numpy.percentile
+    outliers     measurements more than OUTLIER_Z standard deviations from
+                 their group's mean (groups of MIN_GROUP_SIZE or more)
+    flags        measurements outside the QUALITY_LIMITS (Codex Alimentarius
+                 honey standard); high sucrose, low fructose + glucose and
+                 high HMF are the usual signs of adulteration or overheating
+
+The endpoint caches the result for LAB_ANALYTICS_CACHE_SECONDS.
+"""
+import hashlib
+import json
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+import numpy as np
+from .measurements import CANONICAL_UNITS
+from .models import LabMeasurement
+
+PERCENTILES = (5, 25, 50, 75, 95)
+OUTLIER_Z = 3.0
+MIN_GROUP_SIZE = 5
+
+# Most outliers and flags listed in the response (the counts cover all of them)
+MAX_LISTED = 100
+
+# Analyte => (minimum, maximum), in the canonical unit
+QUALITY_LIMITS = {
+    'moisture': (None, 20.0),
+    'hmf': (None, 40.0),
+    'diastase': (8.0, None),
+    'free_acidity': (None, 50.0),
+    'conductivity': (None, 0.8),
+    'sucrose': (None, 5.0),
+    'fructose_glucose': (60.0, None),
+    'insoluble_solids': (None, 0.1),
+}
+
+CACHE_KEY = 'batches:lab_analytics'
+
+
+def load_measurements():
+    """Flat arrays of every measurement in its canonical unit, or None if there are none."""
+    canonical = Q()
+    for analyte, unit in CANONICAL_UNITS.items():
+        canonical |= Q(analyte=analyte, unit=unit)
+    rows = list(
+        LabMeasurement.objects.filter(canonical).values_list(
+            'lab_test_id', 'lab_test__batch__batch_id', 'lab_test__batch__honey_type', 'analyte', 'value',
+        )
+    )
+    if not rows:
+        return None
+    lab_tests, batch_ids, honey_types, analytes, values = zip(*rows)
+    return {
+        'lab_test': np.array(lab_tests, dtype=np.int64),
+        'batch_id': np.array(batch_ids, dtype=object),
+        'honey_type': np.array(honey_types, dtype=str),
+        'analyte': np.array(analytes, dtype=str),
+        'value': np.array(values, dtype=np.float64),
+    }
+
+
+def _group_percentiles(values, group, counts):
+    """PERCENTILES of each group's values, shape (groups, len(PERCENTILES))."""
+    ordered = values[np.lexsort((values, group))]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    positions = starts[:, None] + (np.array(PERCENTILES) / 100.0)[None, :] * (counts - 1)[:, None]
+    low = np.floor(positions).astype(np.int64)
+    high = np.ceil(positions).astype(np.int64)
+    return ordered[low] + (ordered[high] - ordered[low]) * (positions - low)
+
+
+def _limits(analyte_names):
+    """Per-analyte (minimum, maximum) arrays, -inf/inf where there is no limit."""
+    minimum = np.full(len(analyte_names), -np.inf)
+    maximum = np.full(len(analyte_names), np.inf)
+    for code, analyte in enumerate(analyte_names):
+        low, high = QUALITY_LIMITS.get(analyte, (None, None))
+        if low is not None:
+            minimum[code] = low
+        if high is not None:
+            maximum[code] = high
+    return minimum, maximum
+
+
+def _number(value):
+    return round(float(value), 4)
+
+
+def _listed(data, rows, **columns):
+    return [
+        {
+            'lab_test': int(data['lab_test'][row]),
+            'batch_id': data['batch_id'][row],
+            'honey_type': str(data['honey_type'][row]),
+            'analyte': str(data['analyte'][row]),
+            'value': _number(data['value'][row]),
+            **{name: column[i] for name, column in columns.items()},
+        }
+        for i, row in enumerate(rows[:MAX_LISTED])
+    ]
+
+
+def compute_lab_analytics(data):
+    """The analytics payload for arrays from load_measurements()."""
+    payload = {
+        'generated_at': timezone.now().isoformat(),
+        'limits': {analyte: {'min': low, 'max': high} for analyte, (low, high) in QUALITY_LIMITS.items()},
+        'outlier_z': OUTLIER_Z,
+        'total_measurements': 0,
+        'total_lab_tests': 0,
+        'honey_types': {},
+        'outlier_count': 0,
+        'outliers': [],
+        'flag_count': 0,
+        'flagged_batches': 0,
+        'flags': [],
+    }
+    if data is None:
+        return payload
+
+    values = data['value']
+    honey_names, honey_codes = np.unique(data['honey_type'], return_inverse=True)
+    analyte_names, analyte_codes = np.unique(data['analyte'], return_inverse=True)
+    groups, group = np.unique(honey_codes * len(analyte_names) + analyte_codes, return_inverse=True)
+
+    # Per-group moments
+    counts = np.bincount(group)
+    means = np.bincount(group, weights=values) / counts
+    deviations = values - means[group]
+    stds = np.sqrt(np.bincount(group, weights=deviations ** 2) / counts)
+    percentiles = _group_percentiles(values, group, counts)
+    minimums = np.full(len(groups), np.inf)
+    maximums = np.full(len(groups), -np.inf)
+    np.minimum.at(minimums, group, values)
+    np.maximum.at(maximums, group, values)
+
+    # z-score outliers, only where the group is big enough for a spread to mean anything
+    row_std = stds[group]
+    z = np.divide(deviations, row_std, out=np.zeros_like(values), where=row_std > 0)
+    outlier = (np.abs(z) > OUTLIER_Z) & (counts[group] >= MIN_GROUP_SIZE)
+
+    # Quality limit breaches
+    minimum, maximum = _limits(analyte_names)
+    below = values < minimum[analyte_codes]
+    above = values > maximum[analyte_codes]
+    flagged = below | above
+
+    outlier_counts = np.bincount(group, weights=outlier, minlength=len(groups))
+    flag_counts = np.bincount(group, weights=flagged, minlength=len(groups))
+    for i, key in enumerate(groups):
+        honey_type = str(honey_names[key // len(analyte_names)])
+        analyte = str(analyte_names[key % len(analyte_names)])
+        summary = {
+            'count': int(counts[i]),
+            'mean': _number(means[i]),
+            'std': _number(stds[i]),
+            'min': _number(minimums[i]),
+            'max': _number(maximums[i]),
+            **{f'p{p}': _number(percentiles[i, j]) for j, p in enumerate(PERCENTILES)},
+            'outliers': int(outlier_counts[i]),
+            'flagged': int(flag_counts[i]),
+        }
+        payload['honey_types'].setdefault(honey_type, {})[analyte] = summary
+
+    # Most extreme first
+    outlier_rows = np.flatnonzero(outlier)
+    outlier_rows = outlier_rows[np.argsort(-np.abs(z[outlier_rows]), kind='stable')]
+    flag_rows = np.flatnonzero(flagged)
+    flag_limits = np.where(below, minimum[analyte_codes], maximum[analyte_codes])
+
+    payload.update({
+        'total_measurements': int(len(values)),
+        'total_lab_tests': int(len(np.unique(data['lab_test']))),
+        'outlier_count': int(len(outlier_rows)),
+        'outliers': _listed(data, outlier_rows, z=[_number(z[row]) for row in outlier_rows[:MAX_LISTED]]),
+        'flag_count': int(len(flag_rows)),
+        'flagged_batches': int(len(set(data['batch_id'][flag_rows]))),
+        'flags': _listed(
+            data, flag_rows,
+            limit=[_number(flag_limits[row]) for row in flag_rows[:MAX_LISTED]],
+            reason=['below_min' if below[row] else 'above_max' for row in flag_rows[:MAX_LISTED]],
+        ),
+    })
+    return payload
+
+
+def get_lab_analytics():
+    """(payload, etag) from the cache, computed from the measurements on a miss."""
+    cached = cache.get(CACHE_KEY)
+    if cached is None:
+        payload = compute_lab_analytics(load_measurements())
+        digest = hashlib.md5(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+        cached = (payload, f'"{digest}"')
+        cache.set(CACHE_KEY, cached, timeout=settings.LAB_ANALYTICS_CACHE_SECONDS)
+    return cached
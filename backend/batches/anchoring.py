@@ -0,0 +1,180 @@
+"""
+Merkle-root anchoring of batch, lab test and certificate records.
+
+With CHAIN_ANCHOR_MODE on, the chain worker hashes the records queued during a
+window into a Merkle tree and commits only the root on-chain (one anchorRoot
+transaction) instead of storing every record in contract storage. Each record
+keeps its inclusion proof in AnchorLeaf, so verification recomputes the leaf
+from the database and checks the proof locally.
+"""
+import logging
+from django.db import transaction
+from asalitrace.blockchain import eth_adapter
+from asalitrace.blockchain.merkle import leaf_hash, build_tree, tree_root, merkle_proof, verify_proof
+from .models import MerkleAnchor, AnchorLeaf
+from .chain_queue import (
+    batch_chain_description,
+    lab_test_chain_id,
+    lab_test_chain_result,
+    certificate_chain_issuer,
+)
+
+logger = logging.getLogger(__name__)
+
+# (root, anchoring account) already seen on-chain => anchor timestamp. Anchored roots never change.
+_anchored_roots = {}
+
+
+def record_leaf_data(kind, record, batch):
+    """
+    Fields hashed into a record's leaf.
+
+    These are the same strings the single-record contract functions store, so
+    an anchored record carries the same information as one written directly.
+    """
+    if kind == 'lab_test':
+        return {
+            'kind': kind,
+            'testId': lab_test_chain_id(record),
+            'batchId': batch.batch_id,
+            'result': lab_test_chain_result(record),
+        }
+    if kind == 'certificate':
+        return {
+            'kind': kind,
+            'certId': record.certificate_id,
+            'batchId': batch.batch_id,
+            'issuer': certificate_chain_issuer(record),
+        }
+    return {
+        'kind': 'batch',
+        'batchId': record.batch_id,
+        'description': batch_chain_description(record),
+    }
+
+
+def create_anchor(jobs):
+    """
+    Build a Merkle tree over the records of the given chain jobs.
+
+    Saves the MerkleAnchor (status 'pending') and one AnchorLeaf with its
+    proof per record. The caller submits the root on-chain.
+    """
+    # Job kinds are named after the record field they point at
+    records = [(job, getattr(job, job.kind)) for job in jobs]
+    hashes = [leaf_hash(record_leaf_data(job.kind, record, job.batch)) for job, record in records]
+    levels = build_tree(hashes)
+    root = tree_root(levels)
+
+    with transaction.atomic():
+        # Same records re-anchored after a failed attempt give the same root
+        MerkleAnchor.objects.filter(root=root).exclude(status='confirmed').delete()
+        anchor = MerkleAnchor.objects.create(
+            root=root,
+            leaf_count=len(hashes),
+            anchored_by=eth_adapter.PUBLIC_ADDRESS or '',
+        )
+        AnchorLeaf.objects.bulk_create([
+            AnchorLeaf(
+                anchor=anchor,
+                kind=job.kind,
+                batch=job.batch,
+                lab_test=job.lab_test,
+                certificate=job.certificate,
+                leaf_index=index,
+                leaf_hash=hashes[index],
+                proof=merkle_proof(levels, index),
+            )
+            for index, (job, record) in enumerate(records)
+        ])
+    logger.info(f"Built Merkle anchor {root} over {len(hashes)} records")
+    return anchor
+
+
+def _root_timestamp(root):
+    """
+    When our account (PUBLIC_ADDRESS) anchored a root on-chain, 0 if it never
+    did, cached once seen. Anyone can call anchorRoot, so a root anchored by
+    another account does not count.
+    """
+    if not eth_adapter.PUBLIC_ADDRESS:
+        raise ValueError("PUBLIC_ADDRESS environment variable not set")
+    key = (root, eth_adapter.PUBLIC_ADDRESS.lower())
+    if key not in _anchored_roots:
+        timestamp = eth_adapter.get_root_timestamp(root, eth_adapter.PUBLIC_ADDRESS)
+        if not timestamp:
+            return 0
+        _anchored_roots[key] = timestamp
+    return _anchored_roots[key]
+
+
+def verify_anchored_record(kind, record):
+    """
+    Check a record against the Merkle root it was anchored under.
+
+    Returns None if the record has no confirmed anchor, otherwise a dict with
+    'valid' plus the root, proof and anchor transaction details. The leaf is
+    recomputed from the current database row, so any change made after
+    anchoring makes the proof fail. The root must have been anchored on-chain
+    by PUBLIC_ADDRESS; that is looked up once and cached. If the node is
+    unreachable, 'root_on_chain' and 'valid' are None (unverified).
+    """
+    leaf = _confirmed_leaves(kind, **{kind: record}).first()
+    if leaf is None:
+        return None
+    return _check_leaf(kind, record, leaf)
+
+
+def verify_anchored_records(kind, records):
+    """
+    verify_anchored_record() for many records of one kind, with one query.
+    Returns a dict mapping record pk to its result; unanchored records are left out.
+    """
+    by_pk = {record.pk: record for record in records}
+    results = {}
+    for leaf in _confirmed_leaves(kind, **{f'{kind}__in': list(by_pk)}):
+        record_pk = getattr(leaf, f'{kind}_id')
+        if record_pk not in results:  # newest leaf first
+            results[record_pk] = _check_leaf(kind, by_pk[record_pk], leaf)
+    return results
+
+
+def _confirmed_leaves(kind, **filters):
+    return (
+        AnchorLeaf.objects.filter(kind=kind, anchor__status='confirmed', **filters)
+        .select_related('anchor', 'batch')
+        .order_by('-created_at')
+    )
+
+
+def _check_leaf(kind, record, leaf):
+    """Recompute a record's leaf and check it against the anchored root."""
+    anchor = leaf.anchor
+    data = record_leaf_data(kind, record, leaf.batch)
+    expected_hash = leaf_hash(data)
+    proof_valid = expected_hash == leaf.leaf_hash and verify_proof(expected_hash, leaf.proof, anchor.root)
+
+    try:
+        anchored_at = _root_timestamp(anchor.root)
+        root_on_chain = bool(anchored_at)
+    except Exception as e:
+        logger.warning(f"Could not check Merkle root {anchor.root} on-chain: {str(e)}")
+        anchored_at = None
+        root_on_chain = None
+
+    data.pop('kind')
+    data['timestamp'] = anchored_at or 0
+    return {
+        # False if the proof fails, None (unverified) if the root could not be checked
+        'valid': proof_valid and root_on_chain,
+        'proof_valid': proof_valid,
+        'root_on_chain': root_on_chain,
+        'root': anchor.root,
+        'leaf_hash': leaf.leaf_hash,
+        'leaf_index': leaf.leaf_index,
+        'proof': leaf.proof,
+        'tx_hash': anchor.blockchain_tx_hash,
+        'block_number': anchor.block_number,
+        'anchored_by': anchor.anchored_by,
+        'data': data,
+    }
@@ -2,4 +2,9 @@ from django.apps import AppConfig
 
 class BatchesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'batches'
\ No newline at end of file
+    name = 'batches'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .public_verification import check_shared_cache
+        check_shared_cache()
@@ -0,0 +1,218 @@
+"""
+Where audit log entries are written.
+
+log_audit_action() builds an AuditLog and hands it to the sink picked by
+AUDIT_LOG_MODE. The modes trade durability for write load:
+
+    sync      Saved with AuditLog.objects.create() on the caller's connection,
+              inside its transaction (the default). An entry commits or rolls
+              back with the change it records.
+    buffered  Held in process memory once the caller's transaction commits,
+              then written with one bulk_create() when the request ends
+              (AuditFlushMiddleware) or AUDIT_LOG_BUFFER_SIZE entries are
+              waiting. Entries still buffered when the process dies are lost.
+    async     Put on an in-process queue once the caller's transaction
+              commits; a consumer thread writes them in bulk_create() batches
+              of up to AUDIT_LOG_BUFFER_SIZE. Best effort: the request never
+              waits on the audit write, and entries still queued when the
+              process dies are lost.
+
+Only committed changes are audited in the buffered and async modes, as in
+sync mode. bulk_create() skips post_save, so the batch timeline is updated
+for written entries here instead (see batches.signals.audit_log_saved).
+
+Processes that run outside a request (the chain worker, management commands)
+call flush_audit_log() when they finish a unit of work; every sink is also
+flushed at interpreter exit.
+"""
+import atexit
+import logging
+import queue
+import threading
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from .models import AuditLog
+from . import timeline
+
+logger = logging.getLogger(__name__)
+
+AUDIT_LOG_MODES = ('sync', 'buffered', 'async')
+
+
+def write_audit_logs(entries):
+    """Insert entries with one bulk_create() (row by row if that fails) and update their timelines."""
+    if not entries:
+        return 0
+    try:
+        with transaction.atomic():
+            AuditLog.objects.bulk_create(entries, batch_size=500)
+        written = entries
+    except Exception as e:
+        # One bad row (e.g. a record deleted before the flush) must not lose the rest
+        logger.warning(f"Bulk audit log write failed, retrying row by row: {str(e)}")
+        written = []
+        for entry in entries:
+            try:
+                entry.pk = None
+                entry.save(force_insert=True)
+                written.append(entry)
+            except Exception as row_error:
+                logger.error(f"Failed to write audit log ({entry.action}): {str(row_error)}")
+
+    if settings.BATCH_TIMELINE_ENABLED:
+        for entry in written:
+            if entry.batch_id and entry.pk:
+                try:
+                    timeline.append_timeline_audit_log(entry)
+                except Exception as e:
+                    logger.error(f"Failed to update batch timeline (append_timeline_audit_log): {str(e)}")
+    return len(written)
+
+
+class SyncAuditSink:
+    """Save each entry immediately, in the caller's transaction."""
+    mode = 'sync'
+
+    def write(self, entry):
+        entry.save(force_insert=True)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class BufferedAuditSink:
+    """Collect committed entries in memory and write them with bulk_create()."""
+    mode = 'buffered'
+
+    def __init__(self, buffer_size=100):
+        self.buffer_size = buffer_size
+        self._entries = []
+        self._lock = threading.Lock()
+
+    def write(self, entry):
+        transaction.on_commit(lambda: self._add(entry))
+
+    def _add(self, entry):
+        with self._lock:
+            self._entries.append(entry)
+            full = len(self._entries) >= self.buffer_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            entries, self._entries = self._entries, []
+        return write_audit_logs(entries)
+
+    def close(self):
+        self.flush()
+
+
+class QueuedAuditSink:
+    """Queue committed entries for a consumer thread that writes them in batches."""
+    mode = 'async'
+
+    def __init__(self, buffer_size=100, queue_size=10000):
+        self.buffer_size = buffer_size
+        # Bounded, so a stalled database slows requests down instead of filling memory
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def write(self, entry):
+        transaction.on_commit(lambda: self._put(entry))
+
+    def _put(self, entry):
+        self._start()
+        self._queue.put(entry)
+
+    def _start(self):
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._consume, name='audit-log-writer', daemon=True)
+                self._thread.start()
+
+    def _consume(self):
+        while True:
+            entries = [self._queue.get()]
+            while len(entries) < self.buffer_size:
+                try:
+                    entries.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in entries
+            try:
+                close_old_connections()
+                write_audit_logs([entry for entry in entries if entry is not None])
+            except Exception as e:
+                logger.error(f"Audit log writer failed to write {len(entries)} entries: {str(e)}")
+            finally:
+                for _ in entries:
+                    self._queue.task_done()
+            if stop:
+                close_old_connections()
+                return
+
+    def flush(self):
+        """Wait until every queued entry has been written."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self, timeout=10):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+
+def build_audit_sink(mode, buffer_size=None):
+    buffer_size = buffer_size or settings.AUDIT_LOG_BUFFER_SIZE
+    if mode == 'sync':
+        return SyncAuditSink()
+    if mode == 'buffered':
+        return BufferedAuditSink(buffer_size)
+    if mode == 'async':
+        return QueuedAuditSink(buffer_size, settings.AUDIT_LOG_QUEUE_SIZE)
+    raise ValueError(f"Unknown AUDIT_LOG_MODE {mode!r} (expected one of {', '.join(AUDIT_LOG_MODES)})")
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_audit_sink():
+    """The process-wide sink for AUDIT_LOG_MODE."""
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                _sink = build_audit_sink(settings.AUDIT_LOG_MODE)
+                atexit.register(_sink.close)
+    return _sink
+
+
+def flush_audit_log():
+    """Write out buffered or queued entries (a no-op in sync mode)."""
+    if _sink is not None:
+        _sink.flush()
+
+
+class AuditFlushMiddleware:
+    """Flush the buffered audit sink once the response is ready."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            # The async consumer drains on its own; only the buffer waits for request end
+            if _sink is not None and _sink.mode == 'buffered':
+                try:
+                    _sink.flush()
+                except Exception as e:
+                    logger.error(f"Failed to flush audit log buffer: {str(e)}")
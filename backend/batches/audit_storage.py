@@ -0,0 +1,347 @@
+"""
+Time-partitioned audit log storage, archival and archived reads.
+
+On PostgreSQL, migration 0012 turns batches_auditlog into a table
+range-partitioned by month on timestamp, so recent-activity queries (the
+admin's date_hierarchy, journeys of new batches) only touch recent
+partitions, and a whole month can be dropped at once. Other databases
+(SQLite in development) keep the plain table; everything here works on both.
+
+`manage.py archive_audit_logs` moves months older than AUDIT_LOG_HOT_MONTHS
+into compressed files under AUDIT_ARCHIVE_DIR (gzipped NDJSON, or Parquet
+with pyarrow installed) and removes them from the table. Every archive is
+recorded in an AuditArchive row whose chain_hash covers the file's SHA-256
+and the previous archive's chain_hash; verify_audit_archives() recomputes the
+chain from the files.
+
+merged_audit_logs() is the journey's read path: a batch's live audit logs,
+plus any archived ones, oldest first. It only looks in archives for batches
+created before the newest archived entry, and only opens the files that hold
+the batch's entries (AuditArchiveBatch).
+"""
+import datetime
+import gzip
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import AuditArchive, AuditArchiveBatch, AuditLog
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FIELDS = (
+    'id', 'batch_id', 'lab_test_id', 'certificate_id', 'user_id', 'user_email', 'action',
+    'action_description', 'old_values', 'new_values', 'blockchain_tx_hash', 'timestamp',
+    'ip_address', 'user_agent',
+)
+JSON_FIELDS = ('old_values', 'new_values')
+GENESIS_HASH = '0' * 64
+ARCHIVED_THROUGH_CACHE_KEY = 'batches:audit_archived_through'
+ARCHIVED_THROUGH_CACHE_SECONDS = 300
+DELETE_CHUNK_SIZE = 1000
+
+
+# --- Months ---
+
+def month_start(value):
+    """First day of the month `value` (a date or datetime) falls in."""
+    return datetime.date(value.year, value.month, 1)
+
+
+def next_month(month):
+    return datetime.date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def month_bounds(month):
+    """[start, end) of a month as UTC datetimes (partition bounds use UTC months too)."""
+    start = datetime.datetime.combine(month, datetime.time.min, tzinfo=datetime.timezone.utc)
+    end = datetime.datetime.combine(next_month(month), datetime.time.min, tzinfo=datetime.timezone.utc)
+    return start, end
+
+
+def previous_month(month):
+    return datetime.date(month.year - (month.month == 1), (month.month - 2) % 12 + 1, 1)
+
+
+def cold_months(hot_months=None, now=None):
+    """Months with audit logs older than the last `hot_months` months (this one included), oldest first."""
+    hot_months = settings.AUDIT_LOG_HOT_MONTHS if hot_months is None else hot_months
+    cutoff = month_start(now or timezone.now())
+    for _ in range(hot_months - 1):
+        cutoff = previous_month(cutoff)
+    start, _ = month_bounds(cutoff)
+    months = AuditLog.objects.filter(timestamp__lt=start).datetimes('timestamp', 'month', tzinfo=datetime.timezone.utc)
+    return [month_start(value) for value in months]
+
+
+# --- PostgreSQL partitions ---
+
+def partition_name(month):
+    return f"{AuditLog._meta.db_table}_p{month:%Y_%m}"
+
+
+def is_partitioned():
+    """Whether the audit log table is a partitioned PostgreSQL table."""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+            [AuditLog._meta.db_table],
+        )
+        return cursor.fetchone() is not None
+
+
+def ensure_audit_partitions(months_ahead=2):
+    """
+    Create the monthly partitions for this month and the next `months_ahead`.
+
+    Rows outside every monthly partition land in the default partition, so
+    this must run before a month starts (archive_audit_logs does it on every
+    run). Returns the partitions created.
+    """
+    if not is_partitioned():
+        return []
+    table = AuditLog._meta.db_table
+    created = []
+    month = month_start(timezone.now())
+    for _ in range(months_ahead + 1):
+        name = partition_name(month)
+        start, end = month_bounds(month)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s)", [name])
+            if cursor.fetchone()[0] is None:
+                try:
+                    with transaction.atomic():
+                        cursor.execute(
+                            f'CREATE TABLE "{name}" PARTITION OF "{table}" FOR VALUES FROM (%s) TO (%s)',
+                            [start, end],
+                        )
+                    created.append(name)
+                except Exception as e:
+                    # Fails if the default partition already holds rows for the month
+                    logger.error(f"Could not create audit log partition {name}: {str(e)}")
+        month = next_month(month)
+    return created
+
+
+def _drop_partition(month, rows):
+    """Detach and drop a month's partition if it holds exactly the archived rows."""
+    if not is_partitioned():
+        return False
+    name = partition_name(month)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [name])
+        if cursor.fetchone()[0] is None:
+            return False
+        cursor.execute(f'LOCK TABLE "{name}" IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(f'SELECT COUNT(*) FROM "{name}"')
+        if cursor.fetchone()[0] != rows:
+            return False
+        cursor.execute(f'ALTER TABLE "{AuditLog._meta.db_table}" DETACH PARTITION "{name}"')
+        cursor.execute(f'DROP TABLE "{name}"')
+    return True
+
+
+# --- Archive files ---
+
+def archive_dir():
+    return Path(settings.AUDIT_ARCHIVE_DIR)
+
+
+def _archive_row(row):
+    row = dict(row)
+    row['timestamp'] = row['timestamp'].isoformat()
+    row['ip_address'] = str(row['ip_address']) if row['ip_address'] else None
+    return row
+
+
+def _write_ndjson(path, rows):
+    # mtime=0 keeps the file (and its hash) a function of the rows alone
+    with open(path, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as out:
+            for row in rows:
+                out.write(json.dumps(row, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8'))
+                out.write(b'\n')
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def _write_parquet(path, rows):
+    try:
+        import pyarrow
+        import pyarrow.parquet as parquet
+    except ImportError:
+        raise RuntimeError("Parquet archives need pyarrow (pip install pyarrow)")
+    for row in rows:
+        for field in JSON_FIELDS:
+            row[field] = json.dumps(row[field], sort_keys=True, default=str) if row[field] is not None else None
+    parquet.write_table(pyarrow.Table.from_pylist(rows), path, compression='zstd')
+    with open(path, 'rb') as written:
+        os.fsync(written.fileno())
+
+
+def read_archive_rows(archive, batch_pk=None):
+    """An archive's rows as dicts (only `batch_pk`'s with that set)."""
+    path = archive_dir() / archive.path
+    if archive.format == 'parquet':
+        import pyarrow.parquet as parquet
+        filters = [('batch_id', '=', batch_pk)] if batch_pk is not None else None
+        rows = parquet.read_table(path, filters=filters).to_pylist()
+        for row in rows:
+            for field in JSON_FIELDS:
+                row[field] = json.loads(row[field]) if row[field] is not None else None
+        return rows
+
+    rows = []
+    with gzip.open(path, 'rb') as archived:
+        for line in archived:
+            row = json.loads(line)
+            if batch_pk is None or row['batch_id'] == batch_pk:
+                rows.append(row)
+    return rows
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as archived:
+        for chunk in iter(lambda: archived.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def chain_hash(prev_hash, sha256, month, rows):
+    return hashlib.sha256(f"{prev_hash}:{sha256}:{month:%Y-%m}:{rows}".encode('ascii')).hexdigest()
+
+
+# --- Archiving ---
+
+def archive_month(month, fmt=None):
+    """
+    Move a month of audit logs into an archive file; returns the AuditArchive, or None if it was empty.
+
+    The file is written and fsynced before anything is deleted, and the
+    archive row, its batch index and the deletion commit together.
+    """
+    fmt = fmt or settings.AUDIT_ARCHIVE_FORMAT
+    start, end = month_bounds(month)
+    logs = AuditLog.objects.filter(timestamp__gte=start, timestamp__lt=end)
+    rows = [_archive_row(row) for row in logs.order_by('timestamp', 'id').values(*ARCHIVE_FIELDS).iterator(chunk_size=2000)]
+    if not rows:
+        return None
+
+    directory = archive_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    extension = 'parquet' if fmt == 'parquet' else 'ndjson.gz'
+    name = f"auditlog-{month:%Y-%m}-{rows[0]['id']}-{rows[-1]['id']}.{extension}"
+    partial = directory / f"{name}.partial"
+    ids = [row['id'] for row in rows]
+    batch_pks = {row['batch_id'] for row in rows if row['batch_id'] is not None}
+
+    if fmt == 'parquet':
+        _write_parquet(partial, rows)
+    else:
+        _write_ndjson(partial, rows)
+    sha256 = file_sha256(partial)
+    os.replace(partial, directory / name)
+
+    with transaction.atomic():
+        last = AuditArchive.objects.select_for_update().order_by('-id').first()
+        prev_hash = last.chain_hash if last else GENESIS_HASH
+        archive = AuditArchive.objects.create(
+            month=month,
+            path=name,
+            format=fmt,
+            rows=len(rows),
+            first_timestamp=parse_datetime(rows[0]['timestamp']),
+            last_timestamp=parse_datetime(rows[-1]['timestamp']),
+            sha256=sha256,
+            prev_hash=prev_hash,
+            chain_hash=chain_hash(prev_hash, sha256, month, len(rows)),
+        )
+        AuditArchiveBatch.objects.bulk_create(
+            [AuditArchiveBatch(archive=archive, batch_id=batch_pk) for batch_pk in sorted(batch_pks)],
+            batch_size=1000,
+        )
+        # Only the rows that were written out; anything added since stays for the next run
+        if not _drop_partition(month, len(rows)):
+            for i in range(0, len(ids), DELETE_CHUNK_SIZE):
+                AuditLog.objects.filter(pk__in=ids[i:i + DELETE_CHUNK_SIZE]).delete()
+
+    cache.delete(ARCHIVED_THROUGH_CACHE_KEY)
+    logger.info(f"Archived {len(rows)} audit logs for {month:%Y-%m} to {name}")
+    return archive
+
+
+def verify_audit_archives():
+    """
+    Recompute the archive hash chain from the files.
+
+    Returns a list of problems (empty if every file is present, unchanged and
+    in chain order).
+    """
+    problems = []
+    prev_hash = GENESIS_HASH
+    for archive in AuditArchive.objects.order_by('id'):
+        label = f"{archive.month:%Y-%m} ({archive.path})"
+        if archive.prev_hash != prev_hash:
+            problems.append(f"{label}: does not follow the previous archive")
+        path = archive_dir() / archive.path
+        if not path.exists():
+            problems.append(f"{label}: file is missing")
+        else:
+            sha256 = file_sha256(path)
+            if sha256 != archive.sha256:
+                problems.append(f"{label}: file hash {sha256} does not match {archive.sha256}")
+        if chain_hash(archive.prev_hash, archive.sha256, archive.month, archive.rows) != archive.chain_hash:
+            problems.append(f"{label}: chain hash does not match its contents")
+        prev_hash = archive.chain_hash
+    return problems
+
+
+# --- Reads ---
+
+def archived_through():
+    """Timestamp of the newest archived audit log, or None (cached)."""
+    value = cache.get(ARCHIVED_THROUGH_CACHE_KEY)
+    if value is None:
+        newest = AuditArchive.objects.aggregate(newest=Max('last_timestamp'))['newest']
+        # False marks "no archives" so it is cached too
+        value = newest or False
+        cache.set(ARCHIVED_THROUGH_CACHE_KEY, value, timeout=ARCHIVED_THROUGH_CACHE_SECONDS)
+    return value or None
+
+
+def _audit_log(row):
+    row = dict(row)
+    row['timestamp'] = parse_datetime(row['timestamp'])
+    return AuditLog(**row)
+
+
+def archived_audit_logs(batch_pk):
+    """A batch's archived audit logs as unsaved AuditLog instances, oldest first."""
+    logs = []
+    for archive in AuditArchive.objects.filter(batches__batch_id=batch_pk).order_by('id'):
+        try:
+            logs.extend(_audit_log(row) for row in read_archive_rows(archive, batch_pk))
+        except Exception as e:
+            logger.error(f"Could not read audit archive {archive.path}: {str(e)}")
+    return logs
+
+
+def merged_audit_logs(batch, live_logs):
+    """`live_logs` (the batch's logs still in the table) with its archived logs merged in, oldest first."""
+    live_logs = list(live_logs)
+    newest_archived = archived_through()
+    if newest_archived is None or (batch.created_at and batch.created_at > newest_archived):
+        return live_logs
+    logs = archived_audit_logs(batch.pk) + live_logs
+    logs.sort(key=lambda log: (log.timestamp, log.id))
+    return logs
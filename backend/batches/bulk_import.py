@@ -0,0 +1,260 @@
+"""
+Bulk batch import (POST /api/batches/bulk/ and manage.py import_batches).
+
+Rows are read one at a time from CSV or NDJSON (or a JSON list) and handled
+in chunks of BULK_IMPORT_CHUNK_SIZE. Each chunk is validated row by row,
+checked for existing batch IDs in one query, and written in one transaction:
+a bulk_create() for the batches, their BatchAccess rows, search documents,
+counter and rollup updates, their audit entries and their chain write jobs.
+Only the current chunk is held in memory, so files of any size can be
+imported.
+
+Rows that fail are reported one by one ({'row', 'batch_id', 'errors'}) and
+do not stop the import; every valid row is created.
+
+bulk_create() skips model signals, so the BatchAccess rows, statistics
+counters, rollups and search documents that batches.signals would maintain
+are updated here.
+"""
+import codecs
+import csv
+import io
+import json
+import logging
+from collections import Counter
+from itertools import islice
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from . import public_verification, rollups, search, statistics
+from .access import sync_batch_access
+from .chain_queue import enqueue_batches
+from .models import AuditLog, Batch
+from .serializers import BatchImportSerializer
+from .utils import build_audit_log
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+
+# --- Reading ---
+
+def detect_format(name='', content_type=''):
+    """'csv' or 'ndjson' from a file name or content type (NDJSON if unclear)."""
+    name, content_type = (name or '').lower(), (content_type or '').lower()
+    if name.endswith('.csv') or 'csv' in content_type:
+        return 'csv'
+    return 'ndjson'
+
+
+def read_csv(text):
+    """(row number, row, None) for each CSV row; the first line holds the column names."""
+    for number, row in enumerate(csv.DictReader(text), start=1):
+        yield number, row, None
+
+
+def read_ndjson(text):
+    """(row number, row, None) for each JSON object line, or (row number, None, error)."""
+    number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, None, f"Invalid JSON: {str(e)}"
+            continue
+        if isinstance(row, dict):
+            yield number, row, None
+        else:
+            yield number, None, "Expected a JSON object"
+
+
+def read_list(rows):
+    """(row number, row, error) for each item of an already parsed JSON list."""
+    for number, row in enumerate(rows, start=1):
+        if isinstance(row, dict):
+            yield number, row, None
+        else:
+            yield number, None, "Expected a JSON object"
+
+
+def read_rows(stream, fmt):
+    """Rows of a binary or text stream in `fmt` ('csv' or 'ndjson')."""
+    if not isinstance(stream, io.TextIOBase):
+        # Uploads and request bodies are line-iterable bytes
+        stream = codecs.iterdecode(stream, 'utf-8-sig')
+    return read_csv(stream) if fmt == 'csv' else read_ndjson(stream)
+
+
+# --- Importing ---
+
+class ImportReport:
+    """
+    Counts and per-row errors of an import.
+
+    With `on_error`, errors are passed on as they happen instead of kept, so
+    reporting stays constant-memory too.
+    """
+
+    def __init__(self, on_error=None):
+        self.on_error = on_error
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+        self.stopped = None
+
+    def error(self, row, batch_id, errors):
+        self.failed += 1
+        entry = {'row': row, 'batch_id': batch_id, 'errors': errors}
+        if self.on_error:
+            self.on_error(entry)
+        else:
+            self.errors.append(entry)
+
+    def as_dict(self):
+        report = {'created': self.created, 'failed': self.failed, 'errors': self.errors}
+        if self.stopped:
+            report['stopped'] = self.stopped
+        return report
+
+
+def _clean(row):
+    """Row values with surrounding whitespace removed and empty CSV cells dropped."""
+    cleaned = {}
+    for key, value in row.items():
+        if key is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if not value:
+                continue
+        if value is not None:
+            cleaned[key.strip()] = value
+    return cleaned
+
+
+def _created_values(batch):
+    return {
+        'batch_id': batch.batch_id,
+        'producer_name': batch.producer_name,
+        'honey_type': batch.honey_type,
+        'quantity': str(batch.quantity),
+        'status': batch.status,
+    }
+
+
+def _validate_chunk(chunk, report):
+    """[(row number, validated data)] for the rows of a chunk that pass the serializer."""
+    valid = []
+    seen = set()
+    for number, row, error in chunk:
+        if error:
+            report.error(number, None, [error])
+            continue
+        serializer = BatchImportSerializer(data=_clean(row))
+        if not serializer.is_valid():
+            report.error(number, row.get('batch_id'), serializer.errors)
+            continue
+        batch_id = serializer.validated_data['batch_id']
+        if batch_id in seen:
+            report.error(number, batch_id, {'batch_id': ['Duplicate batch_id in this import.']})
+            continue
+        seen.add(batch_id)
+        valid.append((number, serializer.validated_data))
+    return valid
+
+
+def _without_existing(valid, report):
+    """Drop (and report) rows whose batch_id is already taken, with one query."""
+    existing = set(
+        Batch.objects.filter(batch_id__in=[data['batch_id'] for _, data in valid]).values_list('batch_id', flat=True)
+    )
+    remaining = []
+    for number, data in valid:
+        if data['batch_id'] in existing:
+            report.error(number, data['batch_id'], {'batch_id': ['batch with this batch id already exists.']})
+        else:
+            remaining.append((number, data))
+    return remaining
+
+
+def _refresh_public_records(batch_ids):
+    try:
+        public_verification.refresh_public_records(batch_ids=batch_ids)
+    except Exception as e:
+        logger.error(f"Failed to refresh public verification records: {str(e)}")
+
+
+def _insert_chunk(valid, user, request):
+    """Create a chunk's batches with everything a single create would add; returns the batches."""
+    with transaction.atomic():
+        batches = Batch.objects.bulk_create([Batch(created_by=user, owner=user, **data) for _, data in valid])
+        sync_batch_access(batches)
+        statistics.record_changes(
+            {'total_batches': len(batches)},
+            Counter(batch.producer_name for batch in batches),
+        )
+        rollups.record_batches(batches)
+        search.index_batches([batch.pk for batch in batches])
+        AuditLog.objects.bulk_create([
+            build_audit_log(
+                action='create',
+                user=user,
+                batch=batch,
+                action_description=f"Imported batch {batch.batch_id}",
+                new_values=_created_values(batch),
+                request=request,
+            )
+            for batch in batches
+        ])
+        enqueue_batches(batches, user)
+        # Scans of these batch IDs before the import may have cached "not found"
+        transaction.on_commit(lambda: _refresh_public_records([batch.batch_id for batch in batches]))
+    return batches
+
+
+def import_chunk(chunk, user, report, request=None):
+    """Validate and insert one chunk of (row number, row, error) tuples."""
+    valid = _without_existing(_validate_chunk(chunk, report), report)
+    if not valid:
+        return
+    try:
+        batches = _insert_chunk(valid, user, request)
+    except IntegrityError:
+        # A batch_id was taken by a concurrent write since the check
+        valid = _without_existing(valid, report)
+        try:
+            batches = _insert_chunk(valid, user, request) if valid else []
+        except IntegrityError as e:
+            for number, data in valid:
+                report.error(number, data['batch_id'], [f"Could not be saved: {str(e)}"])
+            return
+    report.created += len(batches)
+
+
+def import_batches(rows, user=None, request=None, chunk_size=None, max_rows=None, on_error=None):
+    """
+    Import (row number, row, error) tuples from read_rows()/read_list(); returns an ImportReport.
+
+    Each chunk commits on its own, so rows before a failure stay imported.
+    `max_rows` stops the import (with report.stopped set) once that many
+    rows have been read.
+    """
+    chunk_size = chunk_size or settings.BULK_IMPORT_CHUNK_SIZE
+    report = ImportReport(on_error)
+    rows = iter(rows)
+    read = 0
+    while True:
+        limit = chunk_size if max_rows is None else min(chunk_size, max_rows - read)
+        chunk = list(islice(rows, limit)) if limit > 0 else []
+        if not chunk:
+            break
+        read += len(chunk)
+        import_chunk(chunk, user, report, request)
+
+    if max_rows is not None and read >= max_rows and next(rows, None) is not None:
+        report.stopped = f"Stopped after {max_rows} rows (BULK_IMPORT_MAX_ROWS); import the rest separately"
+    logger.info(f"Bulk import: {report.created} batches created, {report.failed} rows failed")
+    return report
@@ -0,0 +1,231 @@
+"""
+Local mirror of contract state, built from contract events.
+
+index_chain_events() (manage.py index_chain_events) follows BatchCreated,
+LabTestAdded and CertificateIssued logs with eth_getLogs in block-range
+chunks and writes them to the Indexed* tables. Only blocks at least
+CHAIN_INDEXER_CONFIRMATIONS deep are indexed. The checkpoint keeps the hash of
+the last indexed block; if the node reports a different hash on the next run
+(a reorg deeper than the confirmation depth), the mirror is rewound by
+CHAIN_INDEXER_REORG_DEPTH blocks and re-indexed.
+
+The find_*_on_chain() lookups read the mirror first and only call the node
+when a record is missing from it (the mirror is behind, or was never run).
+They return the same dicts as the eth_adapter get_*_from_chain() readers.
+"""
+import logging
+from django.conf import settings
+from django.db import transaction
+from asalitrace.blockchain import eth_adapter
+from .models import IndexedBatch, IndexedLabTest, IndexedCertificate, IndexerCheckpoint
+
+logger = logging.getLogger(__name__)
+
+MIRROR_MODELS = (IndexedBatch, IndexedLabTest, IndexedCertificate)
+
+
+def checkpoint_name():
+    """Checkpoint key for the configured contract, so a redeploy starts a fresh index."""
+    if not eth_adapter.CONTRACT_ADDRESS:
+        raise ValueError("CONTRACT_ADDRESS environment variable not set")
+    return f"AsaliTrace:{eth_adapter.CONTRACT_ADDRESS.lower()}"
+
+
+# --- Indexing ---
+
+def _event_row(event, block):
+    """Mirror row for a decoded event."""
+    args = event['args']
+    location = {
+        'block_number': event['blockNumber'],
+        'block_hash': event['blockHash'],
+        'tx_hash': event['transactionHash'],
+        'log_index': event['logIndex'],
+        'timestamp': block['timestamp'],
+    }
+    if event['event'] == 'LabTestAdded':
+        return IndexedLabTest(test_id=args['testId'], batch_id=args['batchId'], result=args['result'], **location)
+    if event['event'] == 'CertificateIssued':
+        return IndexedCertificate(cert_id=args['certId'], batch_id=args['batchId'], issuer=args['issuer'], **location)
+    return IndexedBatch(batch_id=args['batchId'], description=args['description'], created_by=args['creator'], **location)
+
+
+def _save_events(events, blocks):
+    """Upsert mirror rows for a chunk of events (a re-indexed block replaces its rows)."""
+    rows = {model: [] for model in MIRROR_MODELS}
+    for event in events:
+        row = _event_row(event, blocks[event['blockNumber']])
+        rows[type(row)].append(row)
+
+    for model, model_rows in rows.items():
+        if not model_rows:
+            continue
+        unique_field = next(f.name for f in model._meta.fields if f.unique and not f.primary_key)
+        model.objects.bulk_create(
+            model_rows,
+            update_conflicts=True,
+            unique_fields=[unique_field],
+            update_fields=[
+                f.name for f in model._meta.concrete_fields
+                if not f.primary_key and f.name != unique_field
+            ],
+        )
+
+
+def _rewind(checkpoint, to_block):
+    """Drop mirrored events above `to_block` and move the checkpoint back to it."""
+    with transaction.atomic():
+        for model in MIRROR_MODELS:
+            model.objects.filter(block_number__gt=to_block).delete()
+        checkpoint.last_block = to_block
+        checkpoint.last_block_hash = ''
+        checkpoint.save(update_fields=['last_block', 'last_block_hash', 'updated_at'])
+
+
+def index_chain_events(max_blocks=None):
+    """
+    Index confirmed contract events from the checkpoint up to the safe head.
+
+    `max_blocks` caps how far one call advances. A chunk whose blocks the node
+    cannot return is left for the next call, with the checkpoint before it.
+    Returns a summary dict with 'from_block', 'to_block', 'events', 'head'
+    and 'rewound'.
+    """
+    web3 = eth_adapter.get_web3()
+    head = web3.eth.block_number
+    safe_head = head - settings.CHAIN_INDEXER_CONFIRMATIONS
+    start_block = settings.CHAIN_INDEXER_START_BLOCK
+
+    checkpoint, _ = IndexerCheckpoint.objects.get_or_create(
+        name=checkpoint_name(), defaults={'last_block': start_block - 1}
+    )
+
+    # Make sure the last indexed block is still on the canonical chain
+    rewound = False
+    if checkpoint.last_block_hash:
+        current = eth_adapter.get_blocks([checkpoint.last_block]).get(checkpoint.last_block)
+        if current is None or current['hash'] != checkpoint.last_block_hash:
+            rewind_to = max(start_block - 1, checkpoint.last_block - settings.CHAIN_INDEXER_REORG_DEPTH)
+            logger.warning(
+                f"Block {checkpoint.last_block} changed since it was indexed (reorg); "
+                f"rewinding chain index to block {rewind_to}"
+            )
+            _rewind(checkpoint, rewind_to)
+            rewound = True
+
+    from_block = checkpoint.last_block + 1
+    if max_blocks:
+        safe_head = min(safe_head, from_block + max_blocks - 1)
+
+    summary = {'from_block': from_block, 'to_block': checkpoint.last_block, 'events': 0, 'head': head, 'rewound': rewound}
+    while from_block <= safe_head:
+        to_block = min(from_block + settings.CHAIN_INDEXER_BLOCK_CHUNK - 1, safe_head)
+        events = eth_adapter.get_contract_events(from_block, to_block)
+        block_numbers = sorted({event['blockNumber'] for event in events} | {to_block})
+        blocks = eth_adapter.get_blocks(block_numbers)
+
+        # A node behind a load balancer can lack a block another one served the logs from
+        missing = [number for number in block_numbers if number not in blocks]
+        if missing:
+            logger.warning(
+                f"Node did not return block {missing[0]}; stopping at block {checkpoint.last_block}, "
+                f"blocks {from_block}-{to_block} are retried on the next run"
+            )
+            break
+
+        with transaction.atomic():
+            _save_events(events, blocks)
+            checkpoint.last_block = to_block
+            checkpoint.last_block_hash = blocks[to_block]['hash']
+            checkpoint.save(update_fields=['last_block', 'last_block_hash', 'updated_at'])
+
+        logger.info(f"Indexed blocks {from_block}-{to_block}: {len(events)} event(s)")
+        summary['events'] += len(events)
+        summary['to_block'] = to_block
+        from_block = to_block + 1
+
+    return summary
+
+
+# --- Lookups ---
+
+def _indexed_batch_data(row):
+    return {
+        'batchId': row.batch_id,
+        'description': row.description,
+        'timestamp': row.timestamp,
+        'createdBy': row.created_by,
+        'source': 'index',
+        'txHash': row.tx_hash,
+        'blockNumber': row.block_number,
+    }
+
+
+def find_batch_on_chain(batch_id):
+    """Batch as recorded on-chain: from the mirror, or from the node if it is not indexed yet."""
+    row = IndexedBatch.objects.filter(batch_id=batch_id).first()
+    if row is None:
+        data = eth_adapter.get_batch_from_chain(batch_id)
+        if data:
+            data['source'] = 'node'
+        return data
+    return _indexed_batch_data(row)
+
+
+def find_batches_on_chain(batch_ids):
+    """
+    find_batch_on_chain() for many IDs: one mirror query, then one batched
+    node read for the IDs not indexed yet.
+
+    Returns a dict mapping batch ID to its data or None. IDs whose node read
+    failed are left out.
+    """
+    results = {}
+    for row in IndexedBatch.objects.filter(batch_id__in=list(batch_ids)):
+        results[row.batch_id] = _indexed_batch_data(row)
+
+    missing = [batch_id for batch_id in batch_ids if batch_id not in results]
+    if missing:
+        for batch_id, data in eth_adapter.get_batches_from_chain(missing).items():
+            if data:
+                data['source'] = 'node'
+            results[batch_id] = data
+    return results
+
+
+def find_lab_test_on_chain(test_id):
+    """Lab test as recorded on-chain: from the mirror, or from the node if it is not indexed yet."""
+    row = IndexedLabTest.objects.filter(test_id=test_id).first()
+    if row is None:
+        data = eth_adapter.get_lab_test_from_chain(test_id)
+        if data:
+            data['source'] = 'node'
+        return data
+    return {
+        'testId': row.test_id,
+        'batchId': row.batch_id,
+        'result': row.result,
+        'timestamp': row.timestamp,
+        'source': 'index',
+        'txHash': row.tx_hash,
+        'blockNumber': row.block_number,
+    }
+
+
+def find_certificate_on_chain(cert_id):
+    """Certificate as recorded on-chain: from the mirror, or from the node if it is not indexed yet."""
+    row = IndexedCertificate.objects.filter(cert_id=cert_id).first()
+    if row is None:
+        data = eth_adapter.get_certificate_from_chain(cert_id)
+        if data:
+            data['source'] = 'node'
+        return data
+    return {
+        'certId': row.cert_id,
+        'batchId': row.batch_id,
+        'issuer': row.issuer,
+        'timestamp': row.timestamp,
+        'source': 'index',
+        'txHash': row.tx_hash,
+        'blockNumber': row.block_number,
+    }
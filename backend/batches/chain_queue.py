@@ -0,0 +1,610 @@
+"""
+Outbox for on-chain writes.
+
+Create endpoints store a ChainWriteJob in the same transaction as the record
+and return immediately. The chain worker (manage.py chain_worker) runs two
+phases per round:
+
+1. submit_jobs() sends the transactions for all runnable jobs back to back,
+   without waiting for any of them to be mined. With CHAIN_WRITE_BATCH_CALLS
+   on, first attempts of the same kind share one multi-record transaction.
+2. poll_receipts() looks up every submitted transaction with one batched
+   receipt request, back-fills blockchain_tx_hash on confirmed records and
+   writes the record_blockchain audit entry.
+
+A transaction with no receipt after CHAIN_RECEIPT_TIMEOUT is not given up
+on: its nonce would block every later one. Records that are on chain already
+(an earlier transaction for them was mined) are confirmed, and the
+transaction is resent under the same nonce at a higher gas price
+(replace-by-fee). Every hash sent for a job is polled until one is mined.
+
+With CHAIN_ANCHOR_MODE on, phase 1 is anchor_jobs() instead: the records
+queued over a window are hashed into a Merkle tree and only its root is sent
+(see batches.anchoring). The jobs then confirm through poll_receipts() like
+any other write.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from asalitrace.blockchain.eth_adapter import (
+    submit_batch_to_chain,
+    submit_lab_test_to_chain,
+    submit_certificate_to_chain,
+    submit_batches_to_chain,
+    submit_lab_tests_to_chain,
+    submit_certificates_to_chain,
+    submit_anchor_root,
+    get_transaction_receipts,
+    missing_abi_functions,
+    missing_deployed_functions,
+    replace_transaction,
+    resync_nonce,
+)
+from .chain_index import find_batch_on_chain, find_certificate_on_chain, find_lab_test_on_chain
+from .models import Batch, ChainWriteJob, MerkleAnchor
+from .utils import log_audit_action
+
+logger = logging.getLogger(__name__)
+
+
+# --- Chain payloads ---
+# The smart contract only stores strings, so these combine the record fields.
+
+def batch_chain_description(batch):
+    """Description string stored on-chain for a batch."""
+    return f"{batch.honey_type} - {batch.producer_name} - Qty: {batch.quantity}kg"
+
+
+def lab_test_chain_id(lab_test):
+    """On-chain test ID for a lab test (uses the database ID)."""
+    return f"TEST-{lab_test.id}"
+
+
+def lab_test_chain_result(lab_test):
+    """Result string stored on-chain for a lab test."""
+    return f"Type: {lab_test.test_type} | Result: {lab_test.result} | Tested by: {lab_test.tested_by} | Date: {lab_test.test_date}"
+
+
+def certificate_chain_issuer(certificate):
+    """Issuer string stored on-chain for a certificate."""
+    return f"{certificate.issued_by} - Issued: {certificate.issue_date} - Expires: {certificate.expiry_date}"
+
+
+# --- Enqueueing ---
+
+def batch_job(batch, user=None, description=None):
+    """Unsaved job recording a batch on the blockchain."""
+    return ChainWriteJob(
+        kind='batch',
+        batch=batch,
+        payload={
+            'batch_id': batch.batch_id,
+            'description': description or batch_chain_description(batch),
+        },
+        requested_by=user,
+    )
+
+
+def enqueue_batch(batch, user=None, description=None):
+    """Queue a batch for recording on the blockchain."""
+    job = batch_job(batch, user, description)
+    job.save(force_insert=True)
+    return job
+
+
+def enqueue_batches(batches, user=None):
+    """Queue many saved batches for recording on the blockchain with one insert."""
+    return ChainWriteJob.objects.bulk_create([batch_job(batch, user) for batch in batches], batch_size=1000)
+
+
+def enqueue_lab_test(lab_test, user=None):
+    """Queue a lab test for recording on the blockchain."""
+    return ChainWriteJob.objects.create(
+        kind='lab_test',
+        batch=lab_test.batch,
+        lab_test=lab_test,
+        payload={
+            'test_id': lab_test_chain_id(lab_test),
+            'batch_id': lab_test.batch.batch_id,
+            'result': lab_test_chain_result(lab_test),
+        },
+        requested_by=user,
+    )
+
+
+def enqueue_certificate(certificate, user=None):
+    """Queue a certificate for issuing on the blockchain."""
+    return ChainWriteJob.objects.create(
+        kind='certificate',
+        batch=certificate.batch,
+        certificate=certificate,
+        payload={
+            'cert_id': certificate.certificate_id,
+            'batch_id': certificate.batch.batch_id,
+            'issuer': certificate_chain_issuer(certificate),
+        },
+        requested_by=user,
+    )
+
+
+def get_open_job(**record):
+    """Return a job still on its way to the chain for a record, e.g. get_open_job(lab_test=test)."""
+    return ChainWriteJob.objects.filter(
+        status__in=['pending', 'processing', 'submitted'], **record
+    ).first()
+
+
+# --- Worker ---
+
+SUBMITTERS = {
+    'batch': submit_batch_to_chain,
+    'lab_test': submit_lab_test_to_chain,
+    'certificate': submit_certificate_to_chain,
+}
+
+
+# Multi-record submitters and the payload fields they take, in argument order
+BULK_SUBMITTERS = {
+    'batch': (submit_batches_to_chain, ('batch_id', 'description')),
+    'lab_test': (submit_lab_tests_to_chain, ('test_id', 'batch_id', 'result')),
+    'certificate': (submit_certificates_to_chain, ('cert_id', 'batch_id', 'issuer')),
+}
+
+# Batches must exist on-chain before their lab tests and certificates
+KIND_ORDER = ('batch', 'lab_test', 'certificate')
+
+
+def _job_record(job):
+    """Return the model instance a job writes to."""
+    if job.kind == 'lab_test':
+        return job.lab_test
+    if job.kind == 'certificate':
+        return job.certificate
+    return job.batch
+
+
+def claim_jobs(limit=10):
+    """
+    Claim up to `limit` runnable jobs for this worker.
+
+    Jobs stuck in 'processing' longer than CHAIN_WRITE_LEASE_SECONDS (e.g. the
+    worker crashed mid-submit) are picked up again.
+
+    A lab test or certificate job is only claimed once its batch can be on
+    chain before it: the batch has a tx hash, its batch job is already
+    submitted (an earlier nonce from the same account), or its batch job is
+    claimed in this round. Otherwise the contract reverts with "Batch does
+    not exist" and the job would spend its attempts while the batch is still
+    queued or backing off.
+    """
+    now = timezone.now()
+    lease_expired = now - timedelta(seconds=settings.CHAIN_WRITE_LEASE_SECONDS)
+    runnable = Q(status='pending', available_at__lte=now) | Q(status='processing', updated_at__lt=lease_expired)
+    batch_jobs = ChainWriteJob.objects.filter(kind='batch', batch_id=OuterRef('batch_id'))
+
+    with transaction.atomic():
+        queryset = ChainWriteJob.objects.filter(runnable).annotate(
+            batch_on_chain=Exists(Batch.objects.filter(pk=OuterRef('batch_id'), blockchain_tx_hash__isnull=False)),
+            batch_submitted=Exists(batch_jobs.filter(status='submitted')),
+            batch_runnable=Exists(batch_jobs.filter(runnable)),
+        ).filter(
+            Q(kind='batch') | Q(batch_on_chain=True) | Q(batch_submitted=True) | Q(batch_runnable=True)
+        ).order_by('available_at', 'id')
+        if transaction.get_connection().features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+
+        rows = list(queryset.values_list('pk', 'kind', 'batch_id', 'batch_on_chain', 'batch_submitted')[:limit])
+        claimed_batches = {batch_id for _, kind, batch_id, _, _ in rows if kind == 'batch'}
+        job_ids = [
+            pk for pk, kind, batch_id, on_chain, submitted in rows
+            if kind == 'batch' or on_chain or submitted or batch_id in claimed_batches
+        ]
+        ChainWriteJob.objects.filter(pk__in=job_ids).update(
+            status='processing', updated_at=now
+        )
+
+    return list(
+        ChainWriteJob.objects.filter(pk__in=job_ids)
+        .select_related('batch', 'lab_test', 'certificate', 'requested_by')
+        .order_by('available_at', 'id')
+    )
+
+
+def _mark_failed_attempt(job, error):
+    job.attempts += 1
+    job.last_error = str(error)
+    if job.attempts >= settings.CHAIN_WRITE_MAX_ATTEMPTS:
+        job.status = 'failed'
+        logger.error(f"Chain job {job.pk} failed permanently after {job.attempts} attempts: {error}")
+    else:
+        # Exponential backoff between retries
+        delay = settings.CHAIN_WRITE_RETRY_DELAY * (2 ** (job.attempts - 1))
+        job.status = 'pending'
+        job.available_at = timezone.now() + timedelta(seconds=delay)
+        logger.warning(f"Chain job {job.pk} attempt {job.attempts} failed, retrying in {delay}s: {error}")
+    job.save(update_fields=['attempts', 'last_error', 'status', 'available_at', 'updated_at'])
+
+
+# Contract functions the worker calls, by mode
+WRITE_FUNCTIONS = ('createBatch', 'addLabTest', 'issueCertificate', 'getBatch', 'getLabTest', 'getCertificate')
+BATCH_CALL_FUNCTIONS = ('createBatches', 'addLabTests', 'issueCertificates')
+ANCHOR_FUNCTIONS = ('anchorRoot', 'getRootTimestamp')
+
+
+def required_contract_functions():
+    """Contract functions the enabled mode (CHAIN_WRITE_BATCH_CALLS, CHAIN_ANCHOR_MODE) calls."""
+    required = WRITE_FUNCTIONS
+    if settings.CHAIN_WRITE_BATCH_CALLS:
+        required += BATCH_CALL_FUNCTIONS
+    if settings.CHAIN_ANCHOR_MODE:
+        required += ANCHOR_FUNCTIONS
+    return required
+
+
+def missing_contract_functions():
+    """
+    Required functions the ABI file lacks, e.g. because it was compiled from
+    an older AsaliTrace.sol.
+    """
+    return missing_abi_functions(required_contract_functions())
+
+
+def undeployed_contract_functions():
+    """
+    Required functions the contract deployed at CONTRACT_ADDRESS does not
+    have, although the ABI file lists them. Raises ValueError if there is no
+    contract there; other errors mean the node could not be asked.
+    """
+    return missing_deployed_functions(required_contract_functions())
+
+
+# Seconds before a job whose record is on chain but not yet mirrored is looked up again
+INDEX_WAIT_SECONDS = 60
+
+# Record lookups on chain (the mirror first, then the node), by kind
+CHAIN_FINDERS = {
+    'batch': (find_batch_on_chain, 'batch_id'),
+    'lab_test': (find_lab_test_on_chain, 'test_id'),
+    'certificate': (find_certificate_on_chain, 'cert_id'),
+}
+
+
+def _confirm_if_recorded(job):
+    """
+    Resolve a job whose record is already on chain, e.g. written by an
+    earlier transaction that was mined after it was given up on, or sent
+    just before the worker crashed. Returns True if it was on chain.
+
+    The job is completed with the hash of the transaction that wrote the
+    record, which only the event mirror (Indexed*.tx_hash) knows: the job's
+    own hash may be a reverted or replaced one. A record the node has but the
+    mirror does not yet goes back to pending, without using up an attempt,
+    until index_chain_events catches up. Anchored records are never found
+    this way (they have no getBatch entry), so their jobs are left alone.
+    """
+    finder, field = CHAIN_FINDERS[job.kind]
+    try:
+        record = finder(job.payload[field])
+    except Exception as e:
+        logger.warning(f"Could not look up chain job {job.pk}'s record on chain: {str(e)}")
+        return False
+    if not record:
+        return False
+
+    # 'txHash' is only set when the record came from the mirror
+    if not record.get('txHash'):
+        _await_index(job)
+        return True
+    complete_job(job, record['txHash'])
+    logger.info(f"Chain job {job.pk}: {_record_label(job)} was already on chain, confirmed")
+    return True
+
+
+def _await_index(job):
+    job.status = 'pending'
+    job.available_at = timezone.now() + timedelta(seconds=INDEX_WAIT_SECONDS)
+    job.last_error = (
+        f"{_record_label(job)} is on chain but not in the event mirror yet; "
+        f"waiting for index_chain_events to find the transaction that wrote it"
+    )
+    job.save(update_fields=['status', 'available_at', 'last_error', 'updated_at'])
+    logger.warning(f"Chain job {job.pk}: {job.last_error}")
+
+
+def _fail_or_confirm(job, error, reverted=False):
+    """A failed attempt, unless it reverted because the record is on chain already ("already exists")."""
+    if (reverted or 'already exists' in str(error).lower()) and _confirm_if_recorded(job):
+        return
+    _mark_failed_attempt(job, error)
+
+
+def complete_job(job, tx_hash):
+    """Back-fill the record's tx hash and write the record_blockchain audit entry."""
+    record = _job_record(job)
+    with transaction.atomic():
+        old_tx_hash = record.blockchain_tx_hash
+        record.blockchain_tx_hash = tx_hash
+        record.save(update_fields=['blockchain_tx_hash', 'updated_at'])
+
+        job.status = 'confirmed'
+        job.blockchain_tx_hash = tx_hash
+        job.last_error = ''
+        job.save(update_fields=['status', 'blockchain_tx_hash', 'last_error', 'updated_at'])
+
+        log_audit_action(
+            action='record_blockchain',
+            user=job.requested_by,
+            batch=job.batch,
+            lab_test=job.lab_test,
+            certificate=job.certificate,
+            action_description=f"Recorded {job.get_kind_display().lower()} {_record_label(job)} on blockchain",
+            blockchain_tx_hash=tx_hash,
+            old_values={'blockchain_tx_hash': old_tx_hash} if old_tx_hash else None,
+            new_values={'blockchain_tx_hash': tx_hash},
+        )
+
+
+def _record_label(job):
+    if job.kind == 'lab_test':
+        return job.payload.get('test_id')
+    if job.kind == 'certificate':
+        return job.payload.get('cert_id')
+    return job.payload.get('batch_id')
+
+
+def _skip_if_recorded(job):
+    """Close a job whose record got a tx hash some other way (e.g. record-on-chain)."""
+    record = _job_record(job)
+    if not record.blockchain_tx_hash:
+        return False
+    job.status = 'confirmed'
+    job.blockchain_tx_hash = record.blockchain_tx_hash
+    job.save(update_fields=['status', 'blockchain_tx_hash', 'updated_at'])
+    return True
+
+
+def _mark_submitted(job, tx_hash):
+    job.status = 'submitted'
+    job.blockchain_tx_hash = tx_hash
+    job.replaced_tx_hashes = []
+    job.last_error = ''
+    job.save(update_fields=['status', 'blockchain_tx_hash', 'replaced_tx_hashes', 'last_error', 'updated_at'])
+
+
+def _submit_grouped(jobs):
+    """
+    Send jobs of one kind through a multi-record contract call.
+
+    One invalid item reverts its whole transaction, so every job in a reverted
+    chunk fails this attempt and is retried on its own (see submit_jobs).
+    """
+    kind = jobs[0].kind
+    submitter, fields = BULK_SUBMITTERS[kind]
+    try:
+        chunks = submitter([tuple(job.payload[field] for field in fields) for job in jobs])
+    except Exception as e:
+        for job in jobs:
+            _fail_or_confirm(job, e)
+        return
+
+    remaining = iter(jobs)
+    for chunk in chunks:
+        for _ in chunk['items']:
+            _mark_submitted(next(remaining), chunk['tx_hash'])
+    logger.info(f"Submitted {len(jobs)} {kind} job(s) in {len(chunks)} transaction(s)")
+
+
+def submit_jobs(limit=50):
+    """
+    Claim runnable jobs and send their transactions back to back.
+
+    Nothing waits for mining here; poll_receipts() confirms the jobs later.
+    Returns the number of jobs claimed.
+    """
+    jobs = [job for job in claim_jobs(limit) if not _skip_if_recorded(job)]
+
+    # Kind by kind, so every batch transaction gets an earlier nonce than its lab tests and certificates
+    for kind in KIND_ORDER:
+        kind_jobs = [job for job in jobs if job.kind == kind]
+        single_jobs = kind_jobs
+        if settings.CHAIN_WRITE_BATCH_CALLS:
+            # Retries go one by one so a bad record cannot keep failing its neighbours
+            single_jobs = [job for job in kind_jobs if job.attempts > 0]
+            grouped = [job for job in kind_jobs if job.attempts == 0]
+            if grouped:
+                _submit_grouped(grouped)
+
+        for job in single_jobs:
+            try:
+                tx_hash = SUBMITTERS[job.kind](**job.payload)
+            except Exception as e:
+                _fail_or_confirm(job, e)
+                continue
+            _mark_submitted(job, tx_hash)
+    return len(jobs)
+
+
+def anchor_jobs(force=False):
+    """
+    Anchor mode: hash runnable jobs into a Merkle tree and send only its root.
+
+    Waits until the oldest runnable job has been queued for
+    CHAIN_ANCHOR_WINDOW seconds, or CHAIN_ANCHOR_MAX_LEAVES jobs are waiting,
+    so each root covers a window of records. `force` anchors whatever is
+    runnable now. Returns the number of jobs claimed.
+    """
+    from .anchoring import create_anchor
+
+    if not force:
+        now = timezone.now()
+        runnable = ChainWriteJob.objects.filter(status='pending', available_at__lte=now)
+        oldest = runnable.order_by('created_at').values_list('created_at', flat=True).first()
+        if oldest is None:
+            return 0
+        window_open = oldest > now - timedelta(seconds=settings.CHAIN_ANCHOR_WINDOW)
+        if window_open and runnable.count() < settings.CHAIN_ANCHOR_MAX_LEAVES:
+            return 0
+
+    claimed = claim_jobs(settings.CHAIN_ANCHOR_MAX_LEAVES)
+    jobs = [job for job in claimed if not _skip_if_recorded(job)]
+    if not jobs:
+        return len(claimed)
+
+    anchor = None
+    try:
+        anchor = create_anchor(jobs)
+        tx_hash = submit_anchor_root(anchor.root, anchor.leaf_count)
+    except Exception as e:
+        if anchor is not None:
+            anchor.status = 'failed'
+            anchor.save(update_fields=['status', 'updated_at'])
+        for job in jobs:
+            _mark_failed_attempt(job, e)
+        return len(claimed)
+
+    anchor.status = 'submitted'
+    anchor.blockchain_tx_hash = tx_hash
+    anchor.save(update_fields=['status', 'blockchain_tx_hash', 'updated_at'])
+    for job in jobs:
+        _mark_submitted(job, tx_hash)
+    logger.info(f"Anchored {len(jobs)} record(s) under Merkle root {anchor.root}: {tx_hash}")
+    return len(claimed)
+
+
+def _sent_hashes(record):
+    """Every transaction sent for a job or anchor under its current nonce, newest first."""
+    return [record.blockchain_tx_hash, *reversed(record.replaced_tx_hashes)]
+
+
+def _mined(record, receipts):
+    """(tx hash, receipt) of the one mined transaction among a job's or anchor's hashes, or (None, None)."""
+    for tx_hash in _sent_hashes(record):
+        if receipts.get(tx_hash) is not None:
+            return tx_hash, receipts[tx_hash]
+    return None, None
+
+
+def _resolve_anchors(receipts):
+    """Mark submitted Merkle anchors confirmed or failed from the polled receipts."""
+    for anchor in MerkleAnchor.objects.filter(status='submitted'):
+        tx_hash, receipt = _mined(anchor, receipts)
+        if receipt is None:
+            continue
+        anchor.status = 'confirmed' if receipt['status'] == 1 else 'failed'
+        anchor.blockchain_tx_hash = tx_hash
+        anchor.block_number = receipt['blockNumber']
+        anchor.save(update_fields=['status', 'blockchain_tx_hash', 'block_number', 'updated_at'])
+
+
+def _replaced(record, tx_hash, fields=()):
+    record.replaced_tx_hashes = [*record.replaced_tx_hashes, record.blockchain_tx_hash]
+    record.blockchain_tx_hash = tx_hash
+    record.save(update_fields=['blockchain_tx_hash', 'replaced_tx_hashes', 'updated_at', *fields])
+
+
+def _unstick(tx_hash, jobs):
+    """
+    Handle a transaction with no receipt after CHAIN_RECEIPT_TIMEOUT; returns the jobs resolved.
+
+    Jobs whose records are on chain already are confirmed. If none are, the
+    transaction is resent under its nonce at a higher gas price. If only some
+    are, the nonce is freed with a cancelling transfer and the rest go back to
+    the queue. A transaction the node has dropped frees its nonce by itself.
+    """
+    anchor = MerkleAnchor.objects.filter(status='submitted', blockchain_tx_hash=tx_hash).first()
+    waiting = jobs if anchor is not None else [job for job in jobs if not _confirm_if_recorded(job)]
+    cancel = len(waiting) < len(jobs)
+    try:
+        new_hash = replace_transaction(tx_hash, cancel=cancel)
+    except Exception as e:
+        logger.warning(f"Could not replace stuck transaction {tx_hash}, still waiting for it: {str(e)}")
+        return len(jobs) - len(waiting)
+
+    if new_hash == tx_hash:
+        # Mined after all; its receipt is picked up on the next poll
+        return len(jobs) - len(waiting)
+    if new_hash is None or cancel:
+        if new_hash is None:
+            logger.warning(f"Transaction {tx_hash} was dropped by the node, sending its records again")
+            resync_nonce()
+        reason = 'dropped by the node' if new_hash is None else f'cancelled by {new_hash}'
+        for job in waiting:
+            _mark_failed_attempt(job, f"Transaction {tx_hash} had no receipt after {settings.CHAIN_RECEIPT_TIMEOUT}s and was {reason}")
+        if anchor is not None:
+            anchor.status = 'failed'
+            anchor.save(update_fields=['status', 'updated_at'])
+        return len(jobs)
+
+    for job in waiting:
+        _replaced(job, new_hash)
+    if anchor is not None:
+        _replaced(anchor, new_hash)
+    return 0
+
+
+def poll_receipts(limit=500):
+    """
+    Resolve submitted jobs with one batched receipt lookup.
+
+    Confirmed transactions are back-filled onto their records. Reverted ones
+    go back to the queue as failed attempts, unless the record turns out to be
+    on chain already (an "already exists" revert). Transactions with no
+    receipt after CHAIN_RECEIPT_TIMEOUT seconds are handled by _unstick().
+    Returns the number of jobs resolved.
+    """
+    jobs = list(
+        ChainWriteJob.objects.filter(status='submitted')
+        .select_related('batch', 'lab_test', 'certificate', 'requested_by')
+        .order_by('updated_at')[:limit]
+    )
+    if not jobs:
+        return 0
+
+    try:
+        receipts = get_transaction_receipts(list(dict.fromkeys(
+            tx_hash for job in jobs for tx_hash in _sent_hashes(job)
+        )))
+    except Exception as e:
+        logger.warning(f"Could not poll transaction receipts: {str(e)}")
+        return 0
+
+    timed_out = timezone.now() - timedelta(seconds=settings.CHAIN_RECEIPT_TIMEOUT)
+    resolved = 0
+    stuck = defaultdict(list)  # tx hash => its jobs
+    for job in jobs:
+        tx_hash, receipt = _mined(job, receipts)
+        if receipt is None:
+            # Still pending (or the lookup errored)
+            if job.updated_at < timed_out:
+                stuck[job.blockchain_tx_hash].append(job)
+            continue
+
+        if receipt['status'] == 1:
+            complete_job(job, tx_hash)
+            logger.info(f"Chain job {job.pk} confirmed in block {receipt['blockNumber']}: {tx_hash}")
+        else:
+            _fail_or_confirm(
+                job, f"Transaction {tx_hash} failed with status {receipt['status']} in block {receipt['blockNumber']}",
+                reverted=True,
+            )
+        resolved += 1
+
+    for tx_hash, stuck_jobs in stuck.items():
+        resolved += _unstick(tx_hash, stuck_jobs)
+
+    _resolve_anchors(receipts)
+    return resolved
+
+
+def run_pending_jobs(limit=50):
+    """Run one worker round: submit runnable jobs, then poll receipts. Returns jobs handled."""
+    if settings.CHAIN_ANCHOR_MODE:
+        submitted = anchor_jobs()
+    else:
+        submitted = submit_jobs(limit)
+    resolved = poll_receipts()
+    return submitted + resolved
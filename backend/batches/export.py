@@ -0,0 +1,157 @@
+"""
+Streaming CSV/NDJSON exports of batches, lab tests, certificates and audit logs.
+
+Rows are read with values_list() over QuerySet.iterator(), which uses a
+server-side cursor on PostgreSQL, and encoded straight to text without
+model instances or serializers. The response is a StreamingHttpResponse
+that sends the header line first and then EXPORT_CHUNK_SIZE rows at a time,
+so memory stays flat and the download starts at once however many rows there
+are.
+"""
+import csv
+import datetime
+import decimal
+import json
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.renderers import BaseRenderer
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+BATCH_EXPORT_FIELDS = (
+    'id', 'batch_id', 'producer_name', 'production_date', 'honey_type', 'quantity', 'status',
+    'blockchain_tx_hash', 'created_by__email', 'owner__email', 'created_at', 'updated_at',
+)
+LAB_TEST_EXPORT_FIELDS = (
+    'id', 'batch__batch_id', 'test_type', 'result', 'tested_by', 'test_date',
+    'blockchain_tx_hash', 'created_by__email', 'created_at', 'updated_at',
+)
+CERTIFICATE_EXPORT_FIELDS = (
+    'id', 'batch__batch_id', 'certificate_id', 'issued_by', 'issue_date', 'expiry_date',
+    'blockchain_tx_hash', 'created_by__email', 'created_at', 'updated_at',
+)
+AUDIT_LOG_EXPORT_FIELDS = (
+    'id', 'timestamp', 'action', 'action_description', 'batch__batch_id', 'lab_test_id', 'certificate_id',
+    'user_id', 'user_email', 'old_values', 'new_values', 'blockchain_tx_hash', 'ip_address', 'user_agent',
+)
+
+
+class CSVRenderer(BaseRenderer):
+    """Lets ?format=csv through content negotiation; exports stream their own body."""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only error responses get here
+        return json.dumps(data, default=str).encode('utf-8')
+
+
+class NDJSONRenderer(CSVRenderer):
+    """Lets ?format=ndjson through content negotiation."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+def column_name(field):
+    """Export column for a values() lookup (created_by__email -> created_by_email, batch__batch_id -> batch_id)."""
+    parts = field.split('__')
+    if len(parts) == 2 and parts[1].startswith(parts[0]):
+        return parts[1]
+    return '_'.join(parts)
+
+
+def _json_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True, default=str)
+    return _json_value(value)
+
+
+class _Line:
+    """csv.writer target that hands back each line instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def encode_csv(rows, fields):
+    writer = csv.writer(_Line())
+    yield writer.writerow([column_name(field) for field in fields])
+    for row in rows:
+        yield writer.writerow([_csv_value(value) for value in row])
+
+
+def encode_ndjson(rows, fields):
+    columns = [column_name(field) for field in fields]
+    for row in rows:
+        yield json.dumps(
+            {column: _json_value(value) for column, value in zip(columns, row)},
+            separators=(',', ':'), default=str,
+        ) + '\n'
+
+
+def _chunked(lines, size):
+    """Join encoded lines into chunks of `size`, sending the first line on its own."""
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is not None:
+        yield first
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= size:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def parse_moment(value):
+    """Aware datetime from an ISO date or datetime query parameter (dates mean midnight), or None."""
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            moment = datetime.datetime.combine(day, datetime.time.min) if day else None
+    except ValueError:
+        return None
+    if moment is not None and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def export_format(request):
+    """'csv' or 'ndjson' from ?format= (CSV unless NDJSON was asked for)."""
+    renderer = getattr(request, 'accepted_renderer', None)
+    if renderer is not None and renderer.format in EXPORT_FORMATS:
+        return renderer.format
+    return 'ndjson' if request.query_params.get('format') == 'ndjson' else 'csv'
+
+
+def stream_export(queryset, fields, fmt, name):
+    """StreamingHttpResponse with every row of `queryset` (ordered by id) as CSV or NDJSON."""
+    chunk_size = settings.EXPORT_CHUNK_SIZE
+    rows = queryset.order_by('id').values_list(*fields).iterator(chunk_size=chunk_size)
+    lines = encode_csv(rows, fields) if fmt == 'csv' else encode_ndjson(rows, fields)
+    response = StreamingHttpResponse(_chunked(lines, chunk_size), content_type=CONTENT_TYPES[fmt])
+    filename = f"{name}-{timezone.now():%Y%m%d-%H%M%S}.{fmt}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    # Keep proxies from buffering the whole download
+    response['X-Accel-Buffering'] = 'no'
+    return response
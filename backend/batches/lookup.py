@@ -0,0 +1,75 @@
+"""
+Resolving a batch from a URL lookup value in one query.
+
+Batch URLs take either the primary key or the batch_id. Looking the value up
+as a pk, then as a batch_id, then loading the creator and owner to check
+access could take four queries per detail request. resolve_batch() works out
+from the value's shape which columns it can match, fetches the batch with a
+single query, and the access check compares foreign key ids, so the users are
+never loaded just for that.
+
+Resolved batches are remembered on the request, so the detail view, the
+record-on-chain and journey actions, and anything else that resolves the same
+batch while handling the request share one query. The cache lives only as
+long as the request: a batch cached across requests could hand
+record-on-chain a stale blockchain_tx_hash.
+"""
+from django.db.models import Q
+from .models import Batch
+
+REQUEST_CACHE_ATTR = '_resolved_batches'
+
+
+def looks_like_pk(lookup_value):
+    """Only all-digit values can be primary keys."""
+    return str(lookup_value).isdigit()
+
+
+def lookup_filter(lookup_value, by_pk=True):
+    """Q matching the batch a lookup value names: its pk and/or batch_id, depending on its shape."""
+    lookup_value = str(lookup_value)
+    if by_pk and looks_like_pk(lookup_value):
+        # Numeric batch_ids exist too, so match both; the pk wins (see resolve_batch)
+        return Q(pk=int(lookup_value)) | Q(batch_id=lookup_value)
+    return Q(batch_id=lookup_value)
+
+
+def _request_cache(request):
+    if request is None:
+        return None
+    cache = getattr(request, REQUEST_CACHE_ATTR, None)
+    if cache is None:
+        cache = {}
+        setattr(request, REQUEST_CACHE_ATTR, cache)
+    return cache
+
+
+def resolve_batch(lookup_value, queryset=None, request=None, by_pk=True, cache_key='detail'):
+    """
+    The batch `lookup_value` names, in one query, or None.
+
+    `queryset` sets what is loaded with it (creator and owner by default).
+    With `request`, the result is cached on the request under
+    (`cache_key`, lookup value), so pass a distinct `cache_key` for a
+    queryset that loads different relations. `by_pk=False` matches the
+    batch_id only.
+    """
+    cache = _request_cache(request)
+    key = (cache_key, str(lookup_value), by_pk)
+    if cache is not None and key in cache:
+        return cache[key]
+
+    if queryset is None:
+        queryset = Batch.objects.select_related('created_by', 'owner')
+    # Two rows at most: a batch whose pk is the value and one whose batch_id is
+    matches = list(queryset.filter(lookup_filter(lookup_value, by_pk))[:2])
+    batch = None
+    if matches:
+        # Prefer the pk match, as the pk-then-batch_id lookup did
+        pk = int(lookup_value) if by_pk and looks_like_pk(lookup_value) else None
+        batch = next((match for match in matches if match.pk == pk), matches[0])
+
+    if cache is not None:
+        cache[key] = batch
+    return batch
+
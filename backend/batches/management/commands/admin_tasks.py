@@ -0,0 +1,32 @@
+"""
+Run bulk admin actions (re-verify, export) queued from the Django admin.
+
+Usage:
+    python manage.py admin_tasks            # run forever
+    python manage.py admin_tasks --once     # run the pending tasks and exit
+"""
+import time
+from django.core.management.base import BaseCommand
+from batches.admin_tasks import run_pending_tasks
+
+
+class Command(BaseCommand):
+    help = "Run the re-verify and export actions queued from the admin."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run the pending tasks and exit")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep when no task is pending")
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS("Admin task worker started"))
+        try:
+            while True:
+                processed = run_pending_tasks()
+                if processed:
+                    self.stdout.write(f"Ran {processed} task(s)")
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Admin task worker stopped")
@@ -0,0 +1,46 @@
+"""
+Anchor every queued record under one Merkle root right away.
+
+Usage:
+    python manage.py anchor_records          # send the root and exit
+    python manage.py anchor_records --wait   # also wait for the anchor to confirm
+
+The chain worker anchors on its own when CHAIN_ANCHOR_MODE is on; this
+command closes the current window early (e.g. before verifying a fresh import).
+"""
+import time
+from django.core.management.base import BaseCommand
+from batches.chain_queue import anchor_jobs, poll_receipts
+from batches.models import ChainWriteJob, MerkleAnchor
+
+
+class Command(BaseCommand):
+    help = "Hash queued batch, lab test and certificate records into a Merkle tree and anchor its root on-chain."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wait', action='store_true', help="Wait until the anchored records are confirmed")
+        parser.add_argument('--timeout', type=float, default=120.0, help="Seconds to wait with --wait")
+
+    def handle(self, *args, **options):
+        claimed = anchor_jobs(force=True)
+        if not claimed:
+            self.stdout.write("No queued records to anchor")
+            return
+        self.stdout.write(f"Anchored {claimed} record(s)")
+
+        if not options['wait']:
+            return
+
+        deadline = time.time() + options['timeout']
+        while ChainWriteJob.objects.filter(status='submitted').exists():
+            if time.time() > deadline:
+                self.stdout.write(self.style.WARNING("Timed out waiting for the anchor transaction"))
+                return
+            poll_receipts()
+            time.sleep(1)
+
+        anchor = MerkleAnchor.objects.first()
+        if anchor and anchor.status == 'confirmed':
+            self.stdout.write(self.style.SUCCESS(f"Anchor {anchor.root} confirmed in block {anchor.block_number}"))
+        else:
+            self.stdout.write(self.style.ERROR("Anchor transaction failed; the records were queued for retry"))
@@ -0,0 +1,56 @@
+"""
+Move cold months of audit logs into compressed archive files.
+
+Usage:
+    python manage.py archive_audit_logs                  # archive months older than AUDIT_LOG_HOT_MONTHS
+    python manage.py archive_audit_logs --months 6       # keep only the last 6 months in the table
+    python manage.py archive_audit_logs --format parquet # write Parquet (needs pyarrow)
+    python manage.py archive_audit_logs --dry-run        # list the months that would be archived
+    python manage.py archive_audit_logs --verify         # check the archive files and hash chain
+
+On PostgreSQL every run also creates the monthly partitions for the coming
+months, so run it at least monthly (e.g. daily from cron).
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from batches.audit_storage import archive_month, cold_months, ensure_audit_partitions, verify_audit_archives
+
+
+class Command(BaseCommand):
+    help = "Archive audit logs older than AUDIT_LOG_HOT_MONTHS to hash-chained files, or verify the archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, help="Months of audit logs to keep in the table (default AUDIT_LOG_HOT_MONTHS)")
+        parser.add_argument('--format', choices=['ndjson', 'parquet'], help="Archive file format (default AUDIT_ARCHIVE_FORMAT)")
+        parser.add_argument('--dry-run', action='store_true', help="List the months that would be archived")
+        parser.add_argument('--verify', action='store_true', help="Verify the archive files and hash chain, then exit")
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            problems = verify_audit_archives()
+            for problem in problems:
+                self.stdout.write(self.style.ERROR(problem))
+            if problems:
+                raise CommandError(f"{len(problems)} problem(s) in the audit archive")
+            self.stdout.write(self.style.SUCCESS("Audit archive hash chain verified"))
+            return
+
+        if not options['dry_run']:
+            for name in ensure_audit_partitions():
+                self.stdout.write(f"Created partition {name}")
+
+        months = cold_months(options['months'])
+        if not months:
+            self.stdout.write(self.style.SUCCESS("No audit logs to archive"))
+            return
+
+        for month in months:
+            if options['dry_run']:
+                self.stdout.write(f"Would archive {month:%Y-%m}")
+                continue
+            try:
+                archive = archive_month(month, options['format'] or settings.AUDIT_ARCHIVE_FORMAT)
+            except RuntimeError as e:
+                raise CommandError(str(e))
+            if archive:
+                self.stdout.write(self.style.SUCCESS(f"Archived {archive.rows} audit logs for {month:%Y-%m} to {archive.path}"))
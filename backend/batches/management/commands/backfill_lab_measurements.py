@@ -0,0 +1,31 @@
+"""
+Parse lab test results into LabMeasurement rows.
+
+Usage:
+    python manage.py backfill_lab_measurements                 # every lab test
+    python manage.py backfill_lab_measurements --only-missing  # lab tests without measurements
+
+Signal handlers keep measurements current for lab tests saved through the
+ORM; this covers lab tests written before LabMeasurement existed, or by
+writes that skip signals, and re-parses after the parser learns new names.
+"""
+from django.core.management.base import BaseCommand
+from batches.measurements import backfill_measurements
+from batches.models import LabTest
+
+
+class Command(BaseCommand):
+    help = "Parse lab test results into structured measurements."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Lab tests parsed per transaction")
+        parser.add_argument('--only-missing', action='store_true', help="Skip lab tests that already have measurements")
+
+    def handle(self, *args, **options):
+        tests, measurements = backfill_measurements(options['chunk_size'], options['only_missing'])
+        unparsed = LabTest.objects.filter(measurements__isnull=True).count()
+        self.stdout.write(self.style.SUCCESS(f"Parsed {tests} lab test(s) into {measurements} measurement(s)"))
+        if unparsed:
+            self.stdout.write(self.style.WARNING(
+                f"{unparsed} lab test(s) have no recognisable measurement in their result"
+            ))
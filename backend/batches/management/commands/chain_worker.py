@@ -0,0 +1,79 @@
+"""
+Process the on-chain write queue.
+
+Usage:
+    python manage.py chain_worker            # run forever
+    python manage.py chain_worker --once     # drain one round and exit
+"""
+import time
+from django.core.management.base import BaseCommand, CommandError
+from batches.audit import flush_audit_log
+from batches.chain_queue import missing_contract_functions, run_pending_jobs, undeployed_contract_functions
+
+# Longest pause between rounds after repeated failures
+MAX_BACKOFF_SECONDS = 60
+
+
+class Command(BaseCommand):
+    help = "Submit queued batch, lab test and certificate writes to the blockchain."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Process one round of jobs and exit")
+        parser.add_argument('--batch-size', type=int, default=50, help="Jobs submitted per round")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds to sleep when the queue is empty")
+
+    def handle(self, *args, **options):
+        # Fail now rather than on every job if the ABI predates the enabled mode
+        try:
+            missing = missing_contract_functions()
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+        if missing:
+            raise CommandError(
+                f"The contract ABI has no {', '.join(missing)}. Recompile it from contracts/ "
+                f"(npx hardhat compile writes frontend/src/artifacts) and redeploy the contract, "
+                f"or turn off CHAIN_WRITE_BATCH_CALLS / CHAIN_ANCHOR_MODE"
+            )
+
+        # The ABI file can be newer than the deployed contract
+        try:
+            undeployed = undeployed_contract_functions()
+        except ValueError as e:
+            raise CommandError(str(e))
+        except Exception as e:
+            undeployed = []
+            self.stderr.write(f"Could not read the deployed contract, not checking it: {str(e)}")
+        if undeployed:
+            raise CommandError(
+                f"The contract at CONTRACT_ADDRESS has no {', '.join(undeployed)}. Redeploy it from "
+                f"contracts/ (npx hardhat run scripts/deploy.js) and update CONTRACT_ADDRESS, "
+                f"or turn off CHAIN_WRITE_BATCH_CALLS / CHAIN_ANCHOR_MODE"
+            )
+
+        self.stdout.write(self.style.SUCCESS("Chain worker started"))
+        failures = 0
+        try:
+            while True:
+                try:
+                    processed = run_pending_jobs(limit=options['batch_size'])
+                    # Completed jobs write record_blockchain audit entries
+                    flush_audit_log()
+                except Exception as e:
+                    if options['once']:
+                        raise
+                    # The node or the database is down; back off instead of spinning
+                    failures += 1
+                    delay = min(options['interval'] * 2 ** failures, MAX_BACKOFF_SECONDS)
+                    self.stderr.write(f"Chain worker round failed, retrying in {delay:.0f}s: {type(e).__name__}: {str(e)}")
+                    time.sleep(delay)
+                    continue
+                failures = 0
+
+                if processed:
+                    self.stdout.write(f"Processed {processed} job(s)")
+                if options['once']:
+                    break
+                if not processed:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Chain worker stopped")
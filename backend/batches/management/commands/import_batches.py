@@ -0,0 +1,65 @@
+"""
+Import batches from a CSV or NDJSON file.
+
+Usage:
+    python manage.py import_batches batches.csv --user admin@example.com
+    python manage.py import_batches batches.ndjson --user admin --errors errors.ndjson
+    cat batches.ndjson | python manage.py import_batches - --format ndjson --user admin
+
+CSV files need a header row with the batch fields (batch_id, producer_name,
+production_date, honey_type, quantity and optionally status). The file is
+streamed in chunks, so any size works; each failed row is reported with its
+errors and the rest are imported and queued for the chain.
+"""
+import json
+import sys
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from batches.bulk_import import IMPORT_FORMATS, detect_format, import_batches, read_rows
+
+
+class Command(BaseCommand):
+    help = "Import batches from a CSV or NDJSON file, creating them in bulk and queueing them for the chain."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or NDJSON file, or - for stdin")
+        parser.add_argument('--user', required=True, help="Username or email of the user the batches are created for")
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help="File format (default: from the file extension)")
+        parser.add_argument('--chunk-size', type=int, help="Rows per transaction (default BULK_IMPORT_CHUNK_SIZE)")
+        parser.add_argument('--errors', help="Write failed rows to this NDJSON file instead of the console")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(Q(username=options['user']) | Q(email=options['user']))
+        except (User.DoesNotExist, User.MultipleObjectsReturned):
+            raise CommandError(f"No single user with username or email {options['user']}")
+
+        fmt = options['format'] or detect_format(options['path'])
+        errors_file = open(options['errors'], 'w', encoding='utf-8') if options['errors'] else None
+
+        def on_error(entry):
+            if errors_file:
+                errors_file.write(json.dumps(entry, default=str) + '\n')
+            else:
+                self.stdout.write(self.style.ERROR(f"Row {entry['row']} ({entry['batch_id']}): {json.dumps(entry['errors'], default=str)}"))
+
+        try:
+            if options['path'] == '-':
+                report = import_batches(read_rows(sys.stdin, fmt), user=user, chunk_size=options['chunk_size'], on_error=on_error)
+            else:
+                try:
+                    source = open(options['path'], encoding='utf-8-sig', newline='')
+                except OSError as e:
+                    raise CommandError(str(e))
+                with source:
+                    report = import_batches(read_rows(source, fmt), user=user, chunk_size=options['chunk_size'], on_error=on_error)
+        finally:
+            if errors_file:
+                errors_file.close()
+
+        self.stdout.write(self.style.SUCCESS(f"Created {report.created} batches"))
+        if report.failed:
+            where = f" (see {options['errors']})" if errors_file else ""
+            self.stdout.write(self.style.WARNING(f"{report.failed} rows failed{where}"))
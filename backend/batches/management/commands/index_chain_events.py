@@ -0,0 +1,46 @@
+"""
+Mirror contract events into the local Indexed* tables.
+
+Usage:
+    python manage.py index_chain_events            # follow the chain forever
+    python manage.py index_chain_events --once     # catch up to the safe head and exit
+"""
+import time
+from django.core.management.base import BaseCommand
+from batches.chain_index import index_chain_events
+
+
+class Command(BaseCommand):
+    help = "Index BatchCreated, LabTestAdded and CertificateIssued events into local mirror tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Index up to the current safe head and exit")
+        parser.add_argument('--max-blocks', type=int, default=None, help="Blocks to index per round (default: all)")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds between rounds when caught up")
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS("Chain indexer started"))
+        try:
+            while True:
+                try:
+                    summary = index_chain_events(max_blocks=options['max_blocks'])
+                except Exception as e:
+                    if options['once']:
+                        raise
+                    self.stderr.write(f"Indexing failed, retrying: {str(e)}")
+                    time.sleep(options['interval'])
+                    continue
+
+                if summary['rewound']:
+                    self.stdout.write(self.style.WARNING("Reorg detected; chain index rewound"))
+                if summary['to_block'] >= summary['from_block']:
+                    self.stdout.write(
+                        f"Indexed blocks {summary['from_block']}-{summary['to_block']} "
+                        f"({summary['events']} event(s), head {summary['head']})"
+                    )
+                if options['once']:
+                    break
+                if summary['to_block'] < summary['from_block']:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Chain indexer stopped")
@@ -0,0 +1,31 @@
+"""
+Render every batch's journey from scratch into BatchTimeline.
+
+Usage:
+    python manage.py rebuild_batch_timelines               # all batches
+    python manage.py rebuild_batch_timelines --batch B-1   # one batch
+
+Run once after turning BATCH_TIMELINE_ENABLED on; from then on the signal
+handlers in batches.signals keep the rows up to date.
+"""
+from django.core.management.base import BaseCommand
+from batches.models import Batch
+from batches.timeline import rebuild_batch_timeline
+
+
+class Command(BaseCommand):
+    help = "Re-render the denormalized journey timeline of every batch (or one batch)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', help="Only rebuild the batch with this batch_id")
+
+    def handle(self, *args, **options):
+        batches = Batch.objects.order_by('pk')
+        if options['batch']:
+            batches = batches.filter(batch_id=options['batch'])
+
+        rebuilt = 0
+        for batch_pk in batches.values_list('pk', flat=True).iterator():
+            if rebuild_batch_timeline(batch_pk):
+                rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} batch timeline(s)"))
@@ -0,0 +1,35 @@
+"""
+Recount the producer and honey type rollups from the tables.
+
+Usage:
+    python manage.py rebuild_rollups                                  # every day
+    python manage.py rebuild_rollups --since 2024-01-01 --until 2024-12-31
+
+Signal handlers keep the rollups current; run this once after migrating, and
+after writes that skip signals (queryset.update(), raw SQL).
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from batches.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per producer, honey type and production day rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="First production date to rebuild (YYYY-MM-DD)")
+        parser.add_argument('--until', help="Last production date to rebuild (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        days = {}
+        for name in ('since', 'until'):
+            if options[name]:
+                try:
+                    days[name] = parse_date(options[name])
+                except ValueError:
+                    days[name] = None
+                if days[name] is None:
+                    raise CommandError(f"--{name} must be a date (YYYY-MM-DD)")
+
+        rows = rebuild_rollups(**days)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} rollup row(s)"))
@@ -0,0 +1,26 @@
+"""
+Rewrite every batch's search document and rebuild the search index.
+
+Usage:
+    python manage.py rebuild_search_index
+
+Signal handlers keep the documents current and the database keeps the index
+in step with them; run this after writes that skip signals (bulk_create,
+queryset.update(), raw SQL), and on SQLite after a migration that rebuilds
+the document table (which drops its FTS triggers).
+"""
+from django.core.management.base import BaseCommand
+from batches.search import get_search_backend, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the batch search documents and index."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Batches read per database round trip")
+
+    def handle(self, *args, **options):
+        written = rebuild_search_index(options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {written} batch(es) with the {get_search_backend().name} search backend"
+        ))
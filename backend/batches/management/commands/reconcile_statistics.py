@@ -0,0 +1,32 @@
+"""
+Recount the statistics counters from the tables.
+
+Usage:
+    python manage.py reconcile_statistics                  # once (e.g. from cron)
+    python manage.py reconcile_statistics --interval 3600  # every hour, forever
+
+Signal handlers keep the counters current; this catches writes that skip
+signals (queryset.update(), bulk_create(), raw SQL).
+"""
+import time
+from django.core.management.base import BaseCommand
+from batches.statistics import reconcile_statistics
+
+
+class Command(BaseCommand):
+    help = "Recount batch, lab test, certificate and producer statistics and fix any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, help="Keep running, reconciling every INTERVAL seconds")
+
+    def handle(self, *args, **options):
+        while True:
+            drift = reconcile_statistics()
+            if drift:
+                for name, (stored, counted) in drift.items():
+                    self.stdout.write(self.style.WARNING(f"{name}: {stored} -> {counted}"))
+            else:
+                self.stdout.write(self.style.SUCCESS("Statistics counters are up to date"))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
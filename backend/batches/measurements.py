@@ -0,0 +1,192 @@
+"""
+Typed measurements parsed from lab test results.
+
+LabTest.result is free text ("17.2%", "Moisture: 17.2%, HMF: 12 mg/kg,
+Diastase 9.1 DN"), which cannot be queried or compared. parse_measurements()
+pulls (analyte, value, unit) triples out of it, converting values to each
+analyte's canonical unit where the unit is known. A bare value is read as the
+analyte named by the lab test's test_type.
+
+batches.signals keeps a lab test's LabMeasurement rows in step with its
+result on every save; `manage.py backfill_lab_measurements` parses the lab
+tests written before (or without) signals. The on-chain result string is
+still built from the original text, so existing chain records keep verifying.
+"""
+import re
+from django.db import transaction
+from .models import LabMeasurement, LabTest
+
+ANALYTE_ALIASES = {
+    'moisture': ('moisture', 'moisture content', 'water', 'water content', 'humidity'),
+    'hmf': ('hmf', '5 hmf', 'hydroxymethylfurfural', '5 hydroxymethylfurfural'),
+    'diastase': ('diastase', 'diastase activity', 'diastase number', 'dn'),
+    'ph': ('ph',),
+    'free_acidity': ('free acidity', 'acidity', 'free acid'),
+    'conductivity': ('electrical conductivity', 'conductivity', 'ec'),
+    'sucrose': ('sucrose',),
+    'fructose_glucose': ('fructose+glucose', 'glucose+fructose', 'reducing sugars', 'sum of fructose and glucose'),
+    'fructose': ('fructose',),
+    'glucose': ('glucose',),
+    'ash': ('ash', 'ash content'),
+    'insoluble_solids': ('water insoluble solids', 'insoluble solids', 'insoluble matter'),
+}
+
+# Unit every value of an analyte is stored in
+CANONICAL_UNITS = {
+    'moisture': '%',
+    'hmf': 'mg/kg',
+    'diastase': 'DN',
+    'ph': '',
+    'free_acidity': 'meq/kg',
+    'conductivity': 'mS/cm',
+    'sucrose': 'g/100g',
+    'fructose': 'g/100g',
+    'glucose': 'g/100g',
+    'fructose_glucose': 'g/100g',
+    'ash': '%',
+    'insoluble_solids': '%',
+}
+
+# Spellings of each unit
+UNIT_ALIASES = {
+    '%': ('%', 'percent', 'pct', '% w/w', '%w/w'),
+    'g/100g': ('g/100g', 'g/100 g', 'g per 100g'),
+    'mg/kg': ('mg/kg', 'mg kg-1', 'ppm'),
+    'mg/100g': ('mg/100g', 'mg/100 g'),
+    'DN': ('dn', 'schade', 'schade units', 'dn units', 'diastase number'),
+    'meq/kg': ('meq/kg', 'mequiv/kg', 'milliequivalents/kg'),
+    'mS/cm': ('ms/cm',),
+    'µS/cm': ('µs/cm', 'us/cm', 'μs/cm'),
+}
+
+# (from unit, to unit) => factor
+UNIT_CONVERSIONS = {
+    ('%', 'g/100g'): 1.0,
+    ('g/100g', '%'): 1.0,
+    ('mg/100g', 'mg/kg'): 10.0,
+    ('µS/cm', 'mS/cm'): 0.001,
+}
+
+_SEPARATORS = re.compile(r';|\n|\||,(?=\s*[^\d\s])')
+# Not part of a word, a decimal or a hyphenated token ("5-HMF", "2024-05-01")
+_NUMBER = re.compile(r'(?<![\w.\-])([<>≤≥]?)\s*(-?\d+(?:[.,]\d+)?)')
+
+
+def _normalize(text):
+    text = re.sub(r'[^a-z0-9+%/µμ]+', ' ', text.lower()).strip()
+    return re.sub(r'\s*\+\s*', '+', text)
+
+
+def _lookup_table(aliases):
+    """(normalized alias, key) pairs, longest alias first so the most specific name wins."""
+    pairs = [(_normalize(alias), key) for key, names in aliases.items() for alias in names]
+    return sorted(pairs, key=lambda pair: len(pair[0]), reverse=True)
+
+
+_ANALYTES = _lookup_table(ANALYTE_ALIASES)
+_UNITS = {_normalize(alias): unit for unit, names in UNIT_ALIASES.items() for alias in names}
+
+
+def match_analyte(name):
+    """Analyte key for a name such as "Moisture content (refractometer)", or None."""
+    name = _normalize(name or '')
+    for alias, analyte in _ANALYTES:
+        if name == alias or name.startswith(alias + ' '):
+            return analyte
+    return None
+
+
+def match_unit(text):
+    """(canonical spelling, characters used) of the unit at the start of `text`, or (None, 0)."""
+    stripped = text.strip()
+    for length in range(min(len(stripped), 20), 0, -1):
+        unit = _UNITS.get(_normalize(stripped[:length]))
+        if unit and (length == len(stripped) or not stripped[length].isalnum()):
+            return unit, length
+    return None, 0
+
+
+def convert(analyte, value, unit):
+    """(value, unit) in the analyte's canonical unit, or as given if there is no known conversion."""
+    canonical = CANONICAL_UNITS[analyte]
+    if unit is None or unit == canonical:
+        return value, canonical
+    factor = UNIT_CONVERSIONS.get((unit, canonical))
+    if factor is None:
+        return value, unit
+    return round(value * factor, 6), canonical
+
+
+def _value_number(segment):
+    """
+    The number in a segment that is the measured value, or None.
+
+    A number running into a hyphen ("5-HMF") is part of a name. One followed
+    by a word that is not a unit ("2024 sample: 17.5%") is a label too, unless
+    it is the segment's last number (a unit we do not know, "12 ppb").
+    """
+    numbers = list(_NUMBER.finditer(segment))
+    for i, number in enumerate(numbers):
+        rest = segment[number.end():]
+        if rest.startswith('-'):
+            continue
+        stripped = rest.lstrip()
+        if not stripped or not stripped[0].isalnum() or match_unit(rest)[0] or i == len(numbers) - 1:
+            return number
+    return None
+
+
+def parse_measurements(result, test_type=''):
+    """[(analyte, value, unit)] found in a lab result, one per analyte (the first wins)."""
+    measurements = {}
+    for segment in _SEPARATORS.split(result or ''):
+        number = _value_number(segment)
+        if not number:
+            continue
+        name = segment[:number.start()].strip(' :=-\t')
+        analyte = match_analyte(name) if name else match_analyte(test_type)
+        # "<5 mg/kg" is a detection limit or a spec, not a measured value
+        if analyte is None or analyte in measurements or number.group(1):
+            continue
+        value = float(number.group(2).replace(',', '.'))
+        unit, _ = match_unit(segment[number.end():])
+        measurements[analyte] = convert(analyte, value, unit)
+    return [(analyte, value, unit) for analyte, (value, unit) in measurements.items()]
+
+
+def build_measurements(lab_test):
+    """Unsaved LabMeasurement rows for a lab test's result."""
+    return [
+        LabMeasurement(lab_test_id=lab_test.pk, analyte=analyte, value=value, unit=unit)
+        for analyte, value, unit in parse_measurements(lab_test.result, lab_test.test_type)
+    ]
+
+
+def sync_measurements(lab_tests):
+    """Replace the LabMeasurement rows of the given lab tests with ones parsed from their results."""
+    lab_tests = list(lab_tests)
+    if not lab_tests:
+        return 0
+    rows = [measurement for lab_test in lab_tests for measurement in build_measurements(lab_test)]
+    with transaction.atomic():
+        LabMeasurement.objects.filter(lab_test_id__in=[lab_test.pk for lab_test in lab_tests]).delete()
+        LabMeasurement.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def backfill_measurements(chunk_size=1000, only_missing=False):
+    """Parse every lab test's result into measurements; returns (lab tests, measurements)."""
+    lab_tests = LabTest.objects.only('id', 'test_type', 'result').order_by('id')
+    if only_missing:
+        lab_tests = lab_tests.filter(measurements__isnull=True)
+    tests = measurements = 0
+    chunk = []
+    for lab_test in lab_tests.iterator(chunk_size=chunk_size):
+        chunk.append(lab_test)
+        if len(chunk) >= chunk_size:
+            measurements += sync_measurements(chunk)
+            tests += len(chunk)
+            chunk = []
+    measurements += sync_measurements(chunk)
+    tests += len(chunk)
+    return tests, measurements
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('batches', '0003_chainwritejob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='chainwritejob',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('submitted', 'Submitted'), ('confirmed', 'Confirmed'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='chainwritejob',
+            name='replaced_tx_hashes',
+            field=models.JSONField(blank=True, default=list, help_text='Earlier transactions under the same nonce, replaced by blockchain_tx_hash but still polled'),
+        ),
+    ]
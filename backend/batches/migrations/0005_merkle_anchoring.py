@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('batches', '0004_chainwritejob_submitted_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MerkleAnchor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('root', models.CharField(max_length=66, unique=True)),
+                ('leaf_count', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('submitted', 'Submitted'), ('confirmed', 'Confirmed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('blockchain_tx_hash', models.CharField(blank=True, db_index=True, max_length=66, null=True)),
+                ('block_number', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('anchored_by', models.CharField(blank=True, help_text='Account that sent the anchorRoot transaction', max_length=42)),
+                ('replaced_tx_hashes', models.JSONField(blank=True, default=list, help_text='Earlier anchorRoot transactions under the same nonce, still polled')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AnchorLeaf',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('batch', 'Batch'), ('lab_test', 'Lab Test'), ('certificate', 'Certificate')], max_length=20)),
+                ('leaf_index', models.PositiveIntegerField()),
+                ('leaf_hash', models.CharField(max_length=66)),
+                ('proof', models.JSONField(help_text='Sibling hashes from leaf to root')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='anchor_leaves', to='batches.batch')),
+                ('certificate', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='anchor_leaves', to='batches.certificate')),
+                ('lab_test', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='anchor_leaves', to='batches.labtest')),
+                ('anchor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaves', to='batches.merkleanchor')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['kind', 'batch'], name='batches_anc_kind_b1b814_idx')],
+            },
+        ),
+    ]
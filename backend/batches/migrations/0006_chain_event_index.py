@@ -0,0 +1,77 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('batches', '0005_merkle_anchoring'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexedBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('block_number', models.PositiveBigIntegerField(db_index=True)),
+                ('block_hash', models.CharField(max_length=66)),
+                ('tx_hash', models.CharField(max_length=66)),
+                ('log_index', models.PositiveIntegerField()),
+                ('timestamp', models.PositiveBigIntegerField(help_text='Block timestamp, as stored by the contract')),
+                ('indexed_at', models.DateTimeField(auto_now=True)),
+                ('batch_id', models.CharField(max_length=255, unique=True)),
+                ('description', models.TextField()),
+                ('created_by', models.CharField(max_length=42)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='IndexedCertificate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('block_number', models.PositiveBigIntegerField(db_index=True)),
+                ('block_hash', models.CharField(max_length=66)),
+                ('tx_hash', models.CharField(max_length=66)),
+                ('log_index', models.PositiveIntegerField()),
+                ('timestamp', models.PositiveBigIntegerField(help_text='Block timestamp, as stored by the contract')),
+                ('indexed_at', models.DateTimeField(auto_now=True)),
+                ('cert_id', models.CharField(max_length=255, unique=True)),
+                ('batch_id', models.CharField(db_index=True, max_length=255)),
+                ('issuer', models.TextField()),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='IndexedLabTest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('block_number', models.PositiveBigIntegerField(db_index=True)),
+                ('block_hash', models.CharField(max_length=66)),
+                ('tx_hash', models.CharField(max_length=66)),
+                ('log_index', models.PositiveIntegerField()),
+                ('timestamp', models.PositiveBigIntegerField(help_text='Block timestamp, as stored by the contract')),
+                ('indexed_at', models.DateTimeField(auto_now=True)),
+                ('test_id', models.CharField(max_length=255, unique=True)),
+                ('batch_id', models.CharField(db_index=True, max_length=255)),
+                ('result', models.TextField()),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='IndexerCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('last_block', models.BigIntegerField()),
+                ('last_block_hash', models.CharField(blank=True, max_length=66)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
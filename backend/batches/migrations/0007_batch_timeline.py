@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('batches', '0006_chain_event_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BatchTimeline',
+            fields=[
+                ('batch', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='timeline', serialize=False, to='batches.batch')),
+                ('steps', models.JSONField(default=list, help_text='Journey steps, as returned by the journey endpoint')),
+                ('audit_trail', models.JSONField(default=list, help_text='Audit log entries, oldest first')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
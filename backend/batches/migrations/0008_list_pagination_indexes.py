@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('batches', '0007_batch_timeline'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='batch',
+            index=models.Index(fields=['-created_at', '-id'], name='batches_bat_created_f952e8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='certificate',
+            index=models.Index(fields=['-created_at', '-id'], name='batches_cer_created_0dedf6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='labtest',
+            index=models.Index(fields=['-created_at', '-id'], name='batches_lab_created_065dd9_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:30
+
+from django.db import migrations, models
+
+
+def seed_statistics(apps, schema_editor):
+    # Count the tables now so the first /statistics/ request does not have to
+    from batches.statistics import reconcile_statistics
+    reconcile_statistics(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('batches', '0008_list_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProducerCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('producer_name', models.CharField(max_length=200, unique=True)),
+                ('batches', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StatCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('shard', models.PositiveSmallIntegerField(default=0)),
+                ('value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('name', 'shard'), name='unique_stat_counter_shard')],
+            },
+        ),
+        migrations.RunPython(seed_statistics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_batch_access(apps, schema_editor):
+    Batch = apps.get_model('batches', 'Batch')
+    BatchAccess = apps.get_model('batches', 'BatchAccess')
+    rows = []
+    for batch_id, created_by_id, owner_id in Batch.objects.values_list('id', 'created_by_id', 'owner_id').iterator():
+        for user_id in {created_by_id, owner_id} - {None}:
+            rows.append(BatchAccess(user_id=user_id, batch_id=batch_id))
+        if len(rows) >= 1000:
+            BatchAccess.objects.bulk_create(rows, ignore_conflicts=True)
+            rows = []
+    BatchAccess.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('batches', '0009_statistics_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BatchAccess',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='batch',
+            index=models.Index(fields=['created_by', '-created_at'], name='batches_bat_created_b3fa56_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='batch',
+            index=models.Index(fields=['owner', '-created_at'], name='batches_bat_owner_i_f4fc1c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='batch',
+            index=models.Index(condition=models.Q(('blockchain_tx_hash__isnull', True)), fields=['-created_at'], name='batch_unrecorded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='certificate',
+            index=models.Index(fields=['created_by', '-created_at'], name='batches_cer_created_6f895b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='certificate',
+            index=models.Index(condition=models.Q(('blockchain_tx_hash__isnull', True)), fields=['-created_at'], name='cert_unrecorded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='labtest',
+            index=models.Index(fields=['created_by', '-created_at'], name='batches_lab_created_db1d15_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='labtest',
+            index=models.Index(condition=models.Q(('blockchain_tx_hash__isnull', True)), fields=['-created_at'], name='labtest_unrecorded_idx'),
+        ),
+        migrations.AddField(
+            model_name='batchaccess',
+            name='batch',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access', to='batches.batch'),
+        ),
+        migrations.AddField(
+            model_name='batchaccess',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='batch_access', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='batchaccess',
+            constraint=models.UniqueConstraint(fields=('user', 'batch'), name='unique_batch_access'),
+        ),
+        migrations.RunPython(backfill_batch_access, migrations.RunPython.noop),
+    ]
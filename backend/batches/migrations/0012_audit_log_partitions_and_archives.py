@@ -0,0 +1,119 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:38
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Columns that get a plain index besides the Meta indexes (batch_id and
+# user_id lead the composite Meta indexes already)
+FK_INDEX_COLUMNS = ('lab_test_id', 'certificate_id')
+
+
+def _next_month(month):
+    return datetime.date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _rebuild_audit_log_table(schema_editor, AuditLog, partitioned):
+    """
+    Recreate the audit log table, range-partitioned by month on timestamp or
+    plain, and copy the rows across.
+
+    PostgreSQL requires the partition key in the primary key, so a
+    partitioned table's key is (id, timestamp); ids stay unique through the
+    shared identity sequence.
+    """
+    table = AuditLog._meta.db_table
+    old = f"{table}_old"
+    execute = schema_editor.execute
+    execute(f'ALTER TABLE "{table}" RENAME TO "{old}"')
+    if partitioned:
+        execute(f'CREATE TABLE "{table}" (LIKE "{old}" INCLUDING DEFAULTS INCLUDING IDENTITY) PARTITION BY RANGE ("timestamp")')
+        execute(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT')
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'SELECT MIN("timestamp"), MAX("timestamp") FROM "{old}"')
+            first, last = cursor.fetchone()
+        today = datetime.datetime.now(datetime.timezone.utc).date()
+        month = datetime.date((first or last or today).year, (first or last or today).month, 1)
+        # Every month with rows, plus two ahead (archive_audit_logs keeps adding them)
+        end = _next_month(_next_month(_next_month(datetime.date(today.year, today.month, 1))))
+        while month < end:
+            execute(
+                f'CREATE TABLE "{table}_p{month:%Y_%m}" PARTITION OF "{table}" FOR VALUES FROM (%s) TO (%s)',
+                [month.isoformat(), _next_month(month).isoformat()],
+            )
+            month = _next_month(month)
+    else:
+        execute(f'CREATE TABLE "{table}" (LIKE "{old}" INCLUDING DEFAULTS INCLUDING IDENTITY)')
+
+    execute(f'INSERT INTO "{table}" SELECT * FROM "{old}"')
+    execute(f'DROP TABLE "{old}"')
+
+    key = '"id", "timestamp"' if partitioned else '"id"'
+    execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_pkey" PRIMARY KEY ({key})')
+    execute(
+        f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), COALESCE(MAX(\"id\"), 0) + 1, false) FROM \"{table}\""
+    )
+    for index in AuditLog._meta.indexes:
+        schema_editor.add_index(AuditLog, index)
+    for column in FK_INDEX_COLUMNS:
+        execute(f'CREATE INDEX "{table}_{column}_idx" ON "{table}" ("{column}")')
+    for field in AuditLog._meta.concrete_fields:
+        if field.remote_field:
+            target = field.related_model._meta
+            execute(
+                f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_{field.column}_fk" FOREIGN KEY ("{field.column}") '
+                f'REFERENCES "{target.db_table}" ("{target.pk.column}") DEFERRABLE INITIALLY DEFERRED'
+            )
+
+
+def partition_audit_log(apps, schema_editor):
+    # SQLite and other databases keep the plain table
+    if schema_editor.connection.vendor == 'postgresql':
+        _rebuild_audit_log_table(schema_editor, apps.get_model('batches', 'AuditLog'), partitioned=True)
+
+
+def unpartition_audit_log(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        _rebuild_audit_log_table(schema_editor, apps.get_model('batches', 'AuditLog'), partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('batches', '0011_audit_log_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the archived month')),
+                ('path', models.CharField(help_text='File name, relative to AUDIT_ARCHIVE_DIR', max_length=500)),
+                ('format', models.CharField(choices=[('ndjson', 'Gzipped NDJSON'), ('parquet', 'Parquet')], max_length=10)),
+                ('rows', models.PositiveIntegerField()),
+                ('first_timestamp', models.DateTimeField()),
+                ('last_timestamp', models.DateTimeField()),
+                ('sha256', models.CharField(help_text='SHA-256 of the file', max_length=64)),
+                ('prev_hash', models.CharField(help_text='chain_hash of the previous archive', max_length=64)),
+                ('chain_hash', models.CharField(max_length=64, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AuditArchiveBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch_id', models.BigIntegerField(db_index=True)),
+                ('archive', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='batches', to='batches.auditarchive')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('archive', 'batch_id'), name='unique_audit_archive_batch')],
+            },
+        ),
+        migrations.RunPython(partition_audit_log, unpartition_audit_log),
+    ]
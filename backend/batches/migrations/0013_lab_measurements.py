@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('batches', '0012_audit_log_partitions_and_archives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LabMeasurement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('analyte', models.CharField(choices=[('moisture', 'Moisture'), ('hmf', 'Hydroxymethylfurfural (HMF)'), ('diastase', 'Diastase activity'), ('ph', 'pH'), ('free_acidity', 'Free acidity'), ('conductivity', 'Electrical conductivity'), ('sucrose', 'Sucrose'), ('fructose', 'Fructose'), ('glucose', 'Glucose'), ('fructose_glucose', 'Fructose + glucose'), ('ash', 'Ash'), ('insoluble_solids', 'Water-insoluble solids')], max_length=30)),
+                ('value', models.FloatField()),
+                ('unit', models.CharField(blank=True, max_length=20)),
+                ('lab_test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='measurements', to='batches.labtest')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['analyte', 'value'], name='batches_lab_analyte_4a401b_idx')],
+                'constraints': [models.UniqueConstraint(fields=('lab_test', 'analyte'), name='unique_lab_measurement')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('batches', '0013_lab_measurements'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BatchRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('producer_name', models.CharField(max_length=200)),
+                ('honey_type', models.CharField(max_length=100)),
+                ('day', models.DateField()),
+                ('batches', models.BigIntegerField(default=0)),
+                ('quantity', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('verified_batches', models.BigIntegerField(default=0)),
+                ('lab_tests', models.BigIntegerField(default=0)),
+                ('certificates', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='batches_bat_day_8bf07e_idx'), models.Index(fields=['honey_type', 'day'], name='batches_bat_honey_t_b8db41_idx')],
+                'constraints': [models.UniqueConstraint(fields=('producer_name', 'honey_type', 'day'), name='unique_batch_rollup')],
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_search_index(apps, schema_editor):
+    """Create the vendor's search index, then write a document for every batch (the index fills itself)."""
+    from batches.search import install_search_index
+
+    install_search_index(schema_editor.connection)
+    Batch = apps.get_model('batches', 'Batch')
+    BatchSearchDocument = apps.get_model('batches', 'BatchSearchDocument')
+    rows = Batch.objects.order_by('pk').values_list(
+        'pk', 'batch_id', 'producer_name', 'honey_type', 'created_by__email', 'owner__email',
+    )
+    documents = []
+    for batch_pk, batch_code, producer_name, honey_type, *emails in rows.iterator(chunk_size=1000):
+        documents.append(BatchSearchDocument(
+            batch_id=batch_pk,
+            batch_code=batch_code,
+            producer_name=producer_name,
+            honey_type=honey_type,
+            emails=' '.join(sorted({email for email in emails if email})),
+        ))
+        if len(documents) >= 1000:
+            BatchSearchDocument.objects.bulk_create(documents)
+            documents = []
+    BatchSearchDocument.objects.bulk_create(documents)
+
+
+def drop_search_index(apps, schema_editor):
+    from batches.search import uninstall_search_index
+
+    uninstall_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('batches', '0014_batch_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BatchSearchDocument',
+            fields=[
+                ('batch', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='batches.batch')),
+                ('batch_code', models.CharField(max_length=100)),
+                ('producer_name', models.CharField(max_length=200)),
+                ('honey_type', models.CharField(max_length=100)),
+                ('emails', models.TextField(blank=True, default='')),
+            ],
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
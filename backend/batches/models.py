@@ -24,6 +24,21 @@ class Batch(models.Model):
     owner = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='owned_batches', help_text="Current owner of the batch")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination (batches.pagination)
+            models.Index(fields=['-created_at', '-id']),
+            # "My records" lists
+            models.Index(fields=['created_by', '-created_at']),
+            models.Index(fields=['owner', '-created_at']),
+            # Records not yet on-chain (?recorded=false)
+            models.Index(
+                fields=['-created_at'],
+                name='batch_unrecorded_idx',
+                condition=models.Q(blockchain_tx_hash__isnull=True),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.batch_id} - {self.honey_type}"
@@ -39,10 +54,63 @@ class LabTest(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='created_lab_tests')
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination (batches.pagination)
+            models.Index(fields=['-created_at', '-id']),
+            # "My records" lists
+            models.Index(fields=['created_by', '-created_at']),
+            # Records not yet on-chain (?recorded=false)
+            models.Index(
+                fields=['-created_at'],
+                name='labtest_unrecorded_idx',
+                condition=models.Q(blockchain_tx_hash__isnull=True),
+            ),
+        ]
     
     def __str__(self):
         return f"Test for {self.batch.batch_id}"
 
+class LabMeasurement(models.Model):
+    """
+    One typed value from a lab test's result (batches.measurements parses the free-text result).
+
+    Values are stored in the analyte's canonical unit where the parser knows
+    it, so the whole table can be compared and analyzed at once.
+    """
+    ANALYTE_CHOICES = [
+        ('moisture', 'Moisture'),
+        ('hmf', 'Hydroxymethylfurfural (HMF)'),
+        ('diastase', 'Diastase activity'),
+        ('ph', 'pH'),
+        ('free_acidity', 'Free acidity'),
+        ('conductivity', 'Electrical conductivity'),
+        ('sucrose', 'Sucrose'),
+        ('fructose', 'Fructose'),
+        ('glucose', 'Glucose'),
+        ('fructose_glucose', 'Fructose + glucose'),
+        ('ash', 'Ash'),
+        ('insoluble_solids', 'Water-insoluble solids'),
+    ]
+
+    lab_test = models.ForeignKey(LabTest, on_delete=models.CASCADE, related_name='measurements')
+    analyte = models.CharField(max_length=30, choices=ANALYTE_CHOICES)
+    value = models.FloatField()
+    unit = models.CharField(max_length=20, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['lab_test', 'analyte'], name='unique_lab_measurement'),
+        ]
+        indexes = [
+            models.Index(fields=['analyte', 'value']),
+        ]
+
+    def __str__(self):
+        return f"{self.analyte} = {self.value} {self.unit}".rstrip()
+
+
 class Certificate(models.Model):
     batch = models.OneToOneField(Batch, on_delete=models.CASCADE)
     certificate_id = models.CharField(max_length=100, unique=True)
@@ -54,6 +122,20 @@ class Certificate(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='created_certificates')
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination (batches.pagination)
+            models.Index(fields=['-created_at', '-id']),
+            # "My records" lists
+            models.Index(fields=['created_by', '-created_at']),
+            # Records not yet on-chain (?recorded=false)
+            models.Index(
+                fields=['-created_at'],
+                name='cert_unrecorded_idx',
+                condition=models.Q(blockchain_tx_hash__isnull=True),
+            ),
+        ]
     
     def __str__(self):
         return f"Certificate {self.certificate_id}"
@@ -89,8 +171,8 @@ class AuditLog(models.Model):
     # Blockchain info
     blockchain_tx_hash = models.CharField(max_length=66, blank=True, null=True)
     
-    # When
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # When (set when the entry is built, so buffered and queued entries keep the time of the action)
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
     
@@ -105,4 +187,356 @@ class AuditLog(models.Model):
     def __str__(self):
         entity = self.batch or self.lab_test or self.certificate
         entity_name = str(entity) if entity else "Unknown"
-        return f"{self.action} - {entity_name} by {self.user_email or 'Anonymous'} at {self.timestamp}"
\ No newline at end of file
+        return f"{self.action} - {entity_name} by {self.user_email or 'Anonymous'} at {self.timestamp}"
+
+class ChainWriteJob(models.Model):
+    """Outbox entry for an on-chain write, processed by the chain worker (manage.py chain_worker)."""
+    KIND_CHOICES = [
+        ('batch', 'Batch'),
+        ('lab_test', 'Lab Test'),
+        ('certificate', 'Certificate'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('submitted', 'Submitted'),
+        ('confirmed', 'Confirmed'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    batch = models.ForeignKey(Batch, on_delete=models.CASCADE, related_name='chain_jobs')
+    lab_test = models.ForeignKey(LabTest, on_delete=models.CASCADE, related_name='chain_jobs', null=True, blank=True)
+    certificate = models.ForeignKey(Certificate, on_delete=models.CASCADE, related_name='chain_jobs', null=True, blank=True)
+
+    # Contract call arguments, captured when the record was saved
+    payload = models.JSONField(help_text="Arguments for the contract call")
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    blockchain_tx_hash = models.CharField(max_length=66, blank=True, null=True)
+    replaced_tx_hashes = models.JSONField(default=list, blank=True, help_text="Earlier transactions under the same nonce, replaced by blockchain_tx_hash but still polled")
+
+    # Who asked for the write (used for the record_blockchain audit entry)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='chain_write_jobs')
+
+    available_at = models.DateTimeField(default=timezone.now, help_text="Earliest time the worker may pick this job up")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} job {self.pk} ({self.status})"
+
+
+class MerkleAnchor(models.Model):
+    """Merkle root of a set of records, committed on-chain in one anchorRoot transaction."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('submitted', 'Submitted'),
+        ('confirmed', 'Confirmed'),
+        ('failed', 'Failed'),
+    ]
+
+    root = models.CharField(max_length=66, unique=True)
+    leaf_count = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    blockchain_tx_hash = models.CharField(max_length=66, blank=True, null=True, db_index=True)
+    replaced_tx_hashes = models.JSONField(default=list, blank=True, help_text="Earlier anchorRoot transactions under the same nonce, still polled")
+    block_number = models.PositiveBigIntegerField(null=True, blank=True)
+    anchored_by = models.CharField(max_length=42, blank=True, help_text="Account that sent the anchorRoot transaction")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Anchor {self.root[:18]}... ({self.leaf_count} records, {self.status})"
+
+
+class AnchorLeaf(models.Model):
+    """A record's leaf in a Merkle anchor, with the proof linking it to the root."""
+    anchor = models.ForeignKey(MerkleAnchor, on_delete=models.CASCADE, related_name='leaves')
+    kind = models.CharField(max_length=20, choices=ChainWriteJob.KIND_CHOICES)
+    batch = models.ForeignKey(Batch, on_delete=models.CASCADE, related_name='anchor_leaves')
+    lab_test = models.ForeignKey(LabTest, on_delete=models.CASCADE, related_name='anchor_leaves', null=True, blank=True)
+    certificate = models.ForeignKey(Certificate, on_delete=models.CASCADE, related_name='anchor_leaves', null=True, blank=True)
+
+    leaf_index = models.PositiveIntegerField()
+    leaf_hash = models.CharField(max_length=66)
+    proof = models.JSONField(help_text="Sibling hashes from leaf to root")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['kind', 'batch']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} leaf {self.leaf_index} of {self.anchor_id}"
+
+
+# --- On-chain mirror (filled by manage.py index_chain_events) ---
+
+class IndexedEvent(models.Model):
+    """Where a mirrored contract event was emitted."""
+    block_number = models.PositiveBigIntegerField(db_index=True)
+    block_hash = models.CharField(max_length=66)
+    tx_hash = models.CharField(max_length=66)
+    log_index = models.PositiveIntegerField()
+    timestamp = models.PositiveBigIntegerField(help_text="Block timestamp, as stored by the contract")
+    indexed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class IndexedBatch(IndexedEvent):
+    """Mirror of a BatchCreated event."""
+    batch_id = models.CharField(max_length=255, unique=True)
+    description = models.TextField()
+    created_by = models.CharField(max_length=42)
+
+    def __str__(self):
+        return f"{self.batch_id} @ block {self.block_number}"
+
+
+class IndexedLabTest(IndexedEvent):
+    """Mirror of a LabTestAdded event."""
+    test_id = models.CharField(max_length=255, unique=True)
+    batch_id = models.CharField(max_length=255, db_index=True)
+    result = models.TextField()
+
+    def __str__(self):
+        return f"{self.test_id} @ block {self.block_number}"
+
+
+class IndexedCertificate(IndexedEvent):
+    """Mirror of a CertificateIssued event."""
+    cert_id = models.CharField(max_length=255, unique=True)
+    batch_id = models.CharField(max_length=255, db_index=True)
+    issuer = models.TextField()
+
+    def __str__(self):
+        return f"{self.cert_id} @ block {self.block_number}"
+
+
+class IndexerCheckpoint(models.Model):
+    """Last block the event indexer has fully processed for a contract."""
+    name = models.CharField(max_length=100, unique=True)
+    last_block = models.BigIntegerField()
+    last_block_hash = models.CharField(max_length=66, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ block {self.last_block}"
+
+
+# --- Denormalized journey (batches.timeline, BATCH_TIMELINE_ENABLED) ---
+
+class BatchTimeline(models.Model):
+    """Pre-rendered journey of a batch, updated on every write to the batch or its records."""
+    batch = models.OneToOneField(Batch, on_delete=models.CASCADE, primary_key=True, related_name='timeline')
+    steps = models.JSONField(default=list, help_text="Journey steps, as returned by the journey endpoint")
+    audit_trail = models.JSONField(default=list, help_text="Audit log entries, oldest first")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Timeline for batch {self.batch_id}"
+
+
+# --- Statistics counters (batches.statistics) ---
+
+class StatCounter(models.Model):
+    """
+    One shard of a running total shown by the statistics endpoint, kept in
+    step by batches.signals. The total is the sum of the counter's shards.
+    """
+    name = models.CharField(max_length=50)
+    shard = models.PositiveSmallIntegerField(default=0)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'shard'], name='unique_stat_counter_shard'),
+        ]
+
+    def __str__(self):
+        return f"{self.name}[{self.shard}] = {self.value}"
+
+
+class ProducerCount(models.Model):
+    """Batches per producer name, so the number of distinct producers can be kept as a counter."""
+    producer_name = models.CharField(max_length=200, unique=True)
+    batches = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.producer_name}: {self.batches} batches"
+
+
+# --- Rollups (batches.rollups) ---
+
+class BatchRollup(models.Model):
+    """
+    Batch, lab test and certificate totals for one producer, honey type and
+    production day, kept in step by batches.signals (batches.rollups).
+    """
+    producer_name = models.CharField(max_length=200)
+    honey_type = models.CharField(max_length=100)
+    day = models.DateField()
+    batches = models.BigIntegerField(default=0)
+    quantity = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    verified_batches = models.BigIntegerField(default=0)
+    lab_tests = models.BigIntegerField(default=0)
+    # A batch has at most one certificate, so this is also the certified batch count
+    certificates = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['producer_name', 'honey_type', 'day'], name='unique_batch_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['day']),
+            models.Index(fields=['honey_type', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.producer_name} / {self.honey_type} on {self.day}: {self.batches} batches"
+
+
+# --- Search (batches.search) ---
+
+class BatchSearchDocument(models.Model):
+    """
+    The searchable text of a batch (batches.search), one row per batch.
+
+    The database indexes it: an FTS5 table kept in step by triggers on SQLite,
+    a generated tsvector column with GIN and pg_trgm indexes on PostgreSQL.
+    """
+    batch = models.OneToOneField(Batch, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    batch_code = models.CharField(max_length=100)
+    producer_name = models.CharField(max_length=200)
+    honey_type = models.CharField(max_length=100)
+    # Creator and owner emails, space-separated
+    emails = models.TextField(blank=True, default='')
+
+    def __str__(self):
+        return self.batch_code
+
+
+# --- Ownership (batches.access) ---
+
+class BatchAccess(models.Model):
+    """
+    A user who can see a batch: its creator and its current owner.
+
+    Denormalized from Batch.created_by/owner so "batches I can access" is one
+    indexed join instead of an OR across two columns.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='batch_access')
+    batch = models.ForeignKey(Batch, on_delete=models.CASCADE, related_name='access')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'batch'], name='unique_batch_access'),
+        ]
+
+    def __str__(self):
+        return f"User {self.user_id} -> batch {self.batch_id}"
+
+
+# --- Archived audit logs (batches.audit_storage, manage.py archive_audit_logs) ---
+
+class AuditArchive(models.Model):
+    """
+    A month of audit logs moved out of AuditLog into a compressed file.
+
+    Each archive's chain_hash covers its file hash and the previous archive's
+    chain_hash, so a changed, missing or reordered file breaks the chain.
+    """
+    FORMAT_CHOICES = [
+        ('ndjson', 'Gzipped NDJSON'),
+        ('parquet', 'Parquet'),
+    ]
+
+    month = models.DateField(help_text="First day of the archived month")
+    path = models.CharField(max_length=500, help_text="File name, relative to AUDIT_ARCHIVE_DIR")
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    rows = models.PositiveIntegerField()
+    first_timestamp = models.DateTimeField()
+    last_timestamp = models.DateTimeField()
+    sha256 = models.CharField(max_length=64, help_text="SHA-256 of the file")
+    prev_hash = models.CharField(max_length=64, help_text="chain_hash of the previous archive")
+    chain_hash = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"Audit archive {self.month:%Y-%m} ({self.rows} rows)"
+
+
+class AuditArchiveBatch(models.Model):
+    """A batch with audit logs in an archive, so journeys only open the files they need."""
+    archive = models.ForeignKey(AuditArchive, on_delete=models.CASCADE, related_name='batches')
+    # Not a foreign key: archived logs outlive the batches they describe
+    batch_id = models.BigIntegerField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['archive', 'batch_id'], name='unique_audit_archive_batch'),
+        ]
+
+    def __str__(self):
+        return f"Batch {self.batch_id} in archive {self.archive_id}"
+
+
+# --- Background admin actions (batches.admin_tasks, manage.py admin_tasks) ---
+
+class AdminTask(models.Model):
+    """A bulk admin action (re-verify, export) queued for the admin task worker."""
+    KIND_CHOICES = [
+        ('reverify', 'Re-verify on chain'),
+        ('export', 'Export CSV'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # "app_label.model" of the selected records
+    model = models.CharField(max_length=100)
+    query = models.BinaryField(help_text="Pickled QuerySet.query of the selected records (batches.admin_tasks)")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    result = models.JSONField(null=True, blank=True)
+    result_file = models.CharField(max_length=500, blank=True)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='admin_tasks')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} of {self.model} ({self.status})"
@@ -0,0 +1,161 @@
+"""
+Keyset (cursor) pagination for the batch, lab test and certificate lists.
+
+Pages are ordered newest first on (created_at, id) and each cursor holds the
+(created_at, id) of the row it continues from, so fetching any page is one
+indexed range query, however deep into the table it is. Unlike offset
+pagination, rows inserted while a client pages through do not shift or
+repeat results.
+
+Lab tests and certificates created before created_at existed have it NULL;
+they sort after every dated row, by id.
+"""
+import base64
+import json
+from collections import OrderedDict
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class CreatedAtCursorPagination(BasePagination):
+    """Newest-first pages keyed on (created_at, id), with ?cursor= and ?page_size=."""
+    page_size = settings.API_PAGE_SIZE
+    max_page_size = settings.API_MAX_PAGE_SIZE
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    # --- Cursors ---
+
+    @staticmethod
+    def row_position(row):
+        """(created_at, id) of a model instance or values() row."""
+        if isinstance(row, dict):
+            return row['created_at'], row['id']
+        return row.created_at, row.pk
+
+    def encode_cursor(self, row, reverse):
+        created_at, pk = self.row_position(row)
+        position = [created_at.isoformat() if created_at else None, pk]
+        payload = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        """(created_at, id, reverse) from the request, or None for the first page."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            created_at, pk = payload['p']
+            created_at = parse_datetime(created_at) if created_at is not None else None
+            return created_at, int(pk), bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    # --- Queries ---
+
+    @staticmethod
+    def _ordered(queryset, reverse):
+        if reverse:
+            return queryset.order_by(F('created_at').asc(nulls_first=True), 'id')
+        return queryset.order_by(F('created_at').desc(nulls_last=True), '-id')
+
+    @staticmethod
+    def _after(created_at, pk, reverse):
+        """Rows that come after (created_at, pk) in newest-first order, or before it with `reverse`."""
+        if created_at is None:
+            if reverse:
+                return Q(created_at__isnull=False) | Q(created_at__isnull=True, id__gt=pk)
+            return Q(created_at__isnull=True, id__lt=pk)
+        if reverse:
+            return Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+        return Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk) | Q(created_at__isnull=True)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = remove_query_param(request.build_absolute_uri(), self.cursor_query_param)
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor[2])
+
+        if cursor:
+            queryset = queryset.filter(self._after(cursor[0], cursor[1], reverse))
+        rows = list(self._ordered(queryset, reverse)[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        # Going forward there is a previous page if we came from a cursor;
+        # going back there is always a next page (the one we came from)
+        has_next = has_more if not reverse else True
+        has_previous = has_more if reverse else cursor is not None
+        self.next_link = self.encode_cursor(rows[-1], reverse=False) if rows and has_next else None
+        self.previous_link = self.encode_cursor(rows[0], reverse=True) if rows and has_previous else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.next_link),
+            ('previous', self.previous_link),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class RankedPagePagination(CreatedAtCursorPagination):
+    """
+    Numbered pages (?page=, ?page_size=) over ranked results, such as search
+    hits, which have no stable key to continue from.
+
+    paginate_ranked() takes fetch(limit, offset) returning the ranked rows.
+    """
+    page_query_param = 'page'
+    invalid_page_message = 'Invalid page'
+
+    def get_page_number(self, request):
+        try:
+            page = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            raise NotFound(self.invalid_page_message)
+        if page < 1:
+            raise NotFound(self.invalid_page_message)
+        return page
+
+    def paginate_ranked(self, fetch, request):
+        base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        page = self.get_page_number(request)
+
+        rows = list(fetch(page_size + 1, (page - 1) * page_size))
+        has_next = len(rows) > page_size
+        self.next_link = replace_query_param(base_url, self.page_query_param, page + 1) if has_next else None
+        if page == 1:
+            self.previous_link = None
+        elif page == 2:
+            self.previous_link = remove_query_param(base_url, self.page_query_param)
+        else:
+            self.previous_link = replace_query_param(base_url, self.page_query_param, page - 1)
+        return rows[:page_size]
@@ -0,0 +1,218 @@
+"""
+Pre-rendered public verification records for consumer QR scans.
+
+Jar labels link to GET /api/batches/public/<batch_id>/, which anyone can
+open. A promotion can bring thousands of scans a minute for the same few
+batches, so the record is small (no quantities, owners or emails), is
+rendered to JSON once and kept in the cache, and the response carries an
+ETag and Cache-Control with stale-while-revalidate so shared caches and CDNs
+answer most scans themselves:
+
+    fresh   PUBLIC_VERIFICATION_CACHE_SECONDS after rendering (only
+            PUBLIC_VERIFICATION_UNVERIFIED_SECONDS while any part of the
+            record is not on chain yet), the cached bytes are returned as
+            they are
+    stale   for PUBLIC_VERIFICATION_STALE_SECONDS more, one request
+            re-renders the record while the others keep getting the stale
+            copy
+    missing rendered by the request (two queries); batch IDs that do not
+            exist are remembered for NOT_FOUND_CACHE_SECONDS
+
+The record states what the database knows about the batch's chain writes
+(the transaction hashes the chain worker back-filled). It never calls the
+node; verify-batch does the live check.
+
+The cache has to be shared by every process that serves the endpoint or
+runs the chain worker (REDIS_URL, see settings.CACHES): with a per-process
+LocMem cache the worker's re-render never reaches the web workers. The short
+freshness of unverified records bounds how long a missed re-render shows a
+batch as not on chain.
+
+batches.signals re-renders a cached record after a write to its batch,
+lab tests or certificate commits, and renders it unconditionally when one of
+them gets its blockchain_tx_hash (the chain worker's complete_job() or a
+record-on-chain call), so a batch is warm by the time its jars are scanned.
+"""
+import hashlib
+import logging
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+from .models import Batch, Certificate, LabTest
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = 'batches:public_verification'
+
+# Seconds an unknown batch ID is answered from the cache
+NOT_FOUND_CACHE_SECONDS = 60
+
+# Seconds one request may spend re-rendering a stale record before another takes over
+RENDER_LOCK_SECONDS = 30
+
+
+def cache_key(batch_id):
+    # Batch IDs are free text; memcached keys cannot hold spaces or run past 250 characters
+    return f"{CACHE_KEY_PREFIX}:{hashlib.md5(batch_id.encode('utf-8')).hexdigest()}"
+
+
+def cache_control():
+    """Cache-Control of a found record."""
+    return (
+        f"public, max-age={settings.PUBLIC_VERIFICATION_MAX_AGE}, "
+        f"stale-while-revalidate={settings.PUBLIC_VERIFICATION_STALE_SECONDS}"
+    )
+
+
+def public_batches():
+    """Batches with what a public record shows, in two queries."""
+    return Batch.objects.select_related('certificate').prefetch_related(
+        Prefetch(
+            'lab_tests',
+            queryset=LabTest.objects.only('batch_id', 'test_type', 'tested_by', 'test_date', 'blockchain_tx_hash')
+            .order_by('test_date', 'id'),
+        )
+    )
+
+
+def build_public_record(batch):
+    """The public verification record of a batch loaded through public_batches()."""
+    try:
+        certificate = batch.certificate
+    except Certificate.DoesNotExist:
+        certificate = None
+    return {
+        'found': True,
+        'batch_id': batch.batch_id,
+        'producer_name': batch.producer_name,
+        'honey_type': batch.honey_type,
+        'production_date': batch.production_date.isoformat(),
+        'status': batch.status,
+        'verified': bool(batch.blockchain_tx_hash),
+        'blockchain_tx_hash': batch.blockchain_tx_hash,
+        'lab_tests': [
+            {
+                'test_type': lab_test.test_type,
+                'tested_by': lab_test.tested_by,
+                'test_date': lab_test.test_date.isoformat(),
+                'verified': bool(lab_test.blockchain_tx_hash),
+                'blockchain_tx_hash': lab_test.blockchain_tx_hash,
+            }
+            for lab_test in batch.lab_tests.all()
+        ],
+        'certificate': {
+            'certificate_id': certificate.certificate_id,
+            'issued_by': certificate.issued_by,
+            'issue_date': certificate.issue_date.isoformat(),
+            'expiry_date': certificate.expiry_date.isoformat(),
+            'verified': bool(certificate.blockchain_tx_hash),
+            'blockchain_tx_hash': certificate.blockchain_tx_hash,
+        } if certificate else None,
+    }
+
+
+def is_fully_verified(record):
+    """Whether the batch, its lab tests and its certificate are all on chain."""
+    parts = [record, *record['lab_tests'], *([record['certificate']] if record['certificate'] else [])]
+    return all(part['verified'] for part in parts)
+
+
+def _entry(batch):
+    """(content, etag, fresh until) to cache for a batch, or for a missing one (None)."""
+    if batch is None:
+        return None, None, time.time() + NOT_FOUND_CACHE_SECONDS
+    record = build_public_record(batch)
+    content = JSONRenderer().render(record)
+    etag = f'"{hashlib.md5(content).hexdigest()}"'
+    if is_fully_verified(record):
+        fresh_seconds = settings.PUBLIC_VERIFICATION_CACHE_SECONDS
+    else:
+        fresh_seconds = settings.PUBLIC_VERIFICATION_UNVERIFIED_SECONDS
+    return content, etag, time.time() + fresh_seconds
+
+
+def _store(batch_id, entry):
+    # Kept past its freshness so a stale copy can be served while it is re-rendered
+    timeout = entry[2] - time.time() + settings.PUBLIC_VERIFICATION_STALE_SECONDS
+    cache.set(cache_key(batch_id), entry, timeout=int(timeout))
+    return entry
+
+
+def render_public_record(batch_id):
+    """Render a batch's record from the database into the cache; returns the entry."""
+    batch = public_batches().filter(batch_id=batch_id).first()
+    return _store(batch_id, _entry(batch))
+
+
+def get_public_record(batch_id):
+    """
+    (content, etag) of a batch's record, or (None, None) if there is no such
+    batch. Only a cold or stale cache entry reaches the database.
+    """
+    key = cache_key(batch_id)
+    entry = cache.get(key)
+    if entry is not None:
+        if time.time() < entry[2] or not cache.add(f"{key}:lock", True, timeout=RENDER_LOCK_SECONDS):
+            return entry[:2]
+        # This request re-renders; concurrent ones keep getting the stale copy
+        try:
+            entry = render_public_record(batch_id)
+        except Exception as e:
+            logger.error(f"Could not re-render public record of batch {batch_id}: {str(e)}")
+        finally:
+            cache.delete(f"{key}:lock")
+        return entry[:2]
+    return render_public_record(batch_id)[:2]
+
+
+# --- Warming (batches.signals) ---
+
+def warm_public_records(batch_pks):
+    """Render the records of the given batches into the cache, cached or not."""
+    for batch in public_batches().filter(pk__in=list(batch_pks)):
+        _store(batch.batch_id, _entry(batch))
+
+
+def refresh_public_records(batch_pks=(), batch_ids=()):
+    """
+    Re-render the cached records among the given batches (by pk and/or
+    batch_id), including cached "not found" entries of batch IDs that now
+    exist. Records nobody has scanned are left to be rendered on demand.
+    """
+    batch_ids = set(batch_ids)
+    if batch_pks:
+        batch_ids.update(Batch.objects.filter(pk__in=list(batch_pks)).values_list('batch_id', flat=True))
+    keys = {cache_key(batch_id): batch_id for batch_id in batch_ids}
+    cached = [keys[key] for key in cache.get_many(list(keys))]
+    if not cached:
+        return
+    batches = {batch.batch_id: batch for batch in public_batches().filter(batch_id__in=cached)}
+    for batch_id in cached:
+        _store(batch_id, _entry(batches.get(batch_id)))
+
+
+def forget_public_record(batch_id):
+    cache.delete(cache_key(batch_id))
+
+
+# --- Startup check (BatchesConfig.ready) ---
+
+# Cache backends that live inside one process
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def check_shared_cache():
+    """Log an error when the default cache is not shared between processes outside DEBUG."""
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.DEBUG or backend not in PROCESS_LOCAL_CACHES:
+        return
+    logger.error(
+        f"The default cache is {backend}, which each process keeps to itself: public verification "
+        f"records re-rendered by the chain worker or another gunicorn worker will not be seen here. "
+        f"Set REDIS_URL to share the cache"
+    )
@@ -0,0 +1,352 @@
+"""
+Batch volume rollups per producer, honey type and production day.
+
+Dashboards chart quantity, batch counts and verification and certification
+rates over time. GROUP BY scans over the batch, lab test and certificate
+tables get slower as they grow, so the totals are kept in BatchRollup rows
+keyed by (producer_name, honey_type, production date) instead. The signal
+handlers in batches.signals work out deltas on every save and delete and
+apply them after the write commits, so concurrent writes to the same day
+only hold the rollup row lock briefly. query_rollups() only ever reads
+BatchRollup, summing days into weeks, months or years as asked.
+
+Writes that skip model signals (queryset.update(), raw SQL) are caught up
+by rebuild_rollups() (`manage.py rebuild_rollups`), which recounts the rows
+from the tables; bulk inserts call record_batches() themselves.
+"""
+import logging
+from collections import defaultdict
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek, TruncYear
+from django.utils import timezone
+from .models import Batch, BatchRollup, Certificate, LabTest
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_FIELDS = ('batches', 'quantity', 'verified_batches', 'lab_tests', 'certificates')
+
+GRANULARITIES = {
+    'day': None,
+    'week': TruncWeek,
+    'month': TruncMonth,
+    'year': TruncYear,
+}
+
+# ?group_by= value => BatchRollup field
+GROUP_BY_FIELDS = {
+    'producer': 'producer_name',
+    'honey_type': 'honey_type',
+}
+
+
+# --- Incremental updates ---
+
+def record_changes(deltas):
+    """
+    Apply rollup deltas once the current transaction commits.
+
+    `deltas` maps a (producer_name, honey_type, day) key to {field: delta}.
+    A missing row is created for positive deltas; decrements of a missing
+    row are dropped (the next rebuild recounts it).
+    """
+    deltas = {key: {field: delta for field, delta in changes.items() if delta} for key, changes in deltas.items()}
+    deltas = {key: changes for key, changes in deltas.items() if changes}
+    if not deltas:
+        return
+
+    def apply():
+        try:
+            with transaction.atomic():
+                for key, changes in deltas.items():
+                    _apply(key, changes)
+        except Exception as e:
+            logger.error(f"Failed to update batch rollups (rebuild_rollups will fix them): {str(e)}")
+    transaction.on_commit(apply)
+
+
+def _apply(key, changes):
+    producer_name, honey_type, day = key
+    rows = BatchRollup.objects.filter(producer_name=producer_name, honey_type=honey_type, day=day)
+    update = {field: F(field) + delta for field, delta in changes.items()}
+    if rows.update(updated_at=timezone.now(), **update):
+        return
+    if all(delta < 0 for delta in changes.values()):
+        return
+    try:
+        with transaction.atomic():
+            BatchRollup.objects.create(producer_name=producer_name, honey_type=honey_type, day=day, **changes)
+    except IntegrityError:
+        # Created by a concurrent write
+        rows.update(updated_at=timezone.now(), **update)
+
+
+def batch_state(batch):
+    """(key, quantity, verified) as loaded on a batch; None for deferred fields."""
+    loaded = batch.__dict__
+    verified = loaded['blockchain_tx_hash'] is not None if 'blockchain_tx_hash' in loaded else None
+    return (
+        (loaded.get('producer_name'), loaded.get('honey_type'), loaded.get('production_date')),
+        loaded.get('quantity'),
+        verified,
+    )
+
+
+def _stored_state(batch_pk):
+    row = (
+        Batch.objects.filter(pk=batch_pk)
+        .values_list('producer_name', 'honey_type', 'production_date', 'quantity', 'blockchain_tx_hash')
+        .first()
+    )
+    if row is None:
+        return None
+    return (row[0], row[1], row[2]), row[3], row[4] is not None
+
+
+def _complete(state, stored):
+    """A batch_state() with deferred fields filled in from the stored row."""
+    key, quantity, verified = state
+    stored_key, stored_quantity, stored_verified = stored
+    return (
+        tuple(stored_part if part is None else part for part, stored_part in zip(key, stored_key)),
+        stored_quantity if quantity is None else quantity,
+        stored_verified if verified is None else verified,
+    )
+
+
+def _records(batch_pk):
+    """{'lab_tests', 'certificates'} that a batch adds to its rollup row."""
+    return {
+        'lab_tests': LabTest.objects.filter(batch_id=batch_pk).count(),
+        'certificates': Certificate.objects.filter(batch_id=batch_pk).count(),
+    }
+
+
+def _batch_totals(quantity, verified, records=None, sign=1):
+    totals = {'batches': 1, 'quantity': quantity, 'verified_batches': int(verified), **(records or {})}
+    return {field: sign * value for field, value in totals.items()}
+
+
+def record_batch_created(batch):
+    key, quantity, verified = batch_state(batch)
+    record_changes({key: _batch_totals(quantity, bool(verified))})
+
+
+def record_batches(batches):
+    """Add new batches (e.g. from bulk_create(), which skips signals) to their rollups."""
+    deltas = defaultdict(lambda: defaultdict(int))
+    for batch in batches:
+        key, quantity, verified = batch_state(batch)
+        for field, delta in _batch_totals(quantity, bool(verified)).items():
+            deltas[key][field] += delta
+    record_changes(deltas)
+
+
+def record_batch_update(batch_pk, old_state, new_state):
+    """Move a saved batch's totals from its state when loaded to its state now."""
+    if old_state == new_state:
+        return
+    if None in old_state[0] + old_state[1:] or None in new_state[0] + new_state[1:]:
+        # Deferred fields were not saved, so the stored row still has their old values
+        stored = _stored_state(batch_pk)
+        if stored is None:
+            return
+        old_state, new_state = _complete(old_state, stored), _complete(new_state, stored)
+
+    (old_key, old_quantity, old_verified), (key, quantity, verified) = old_state, new_state
+    if old_key == key:
+        record_changes({key: {
+            'quantity': quantity - old_quantity,
+            'verified_batches': int(verified) - int(old_verified),
+        }})
+    else:
+        # A new producer, honey type or production date moves the batch's lab tests and certificates too
+        records = _records(batch_pk)
+        record_changes({
+            old_key: _batch_totals(old_quantity, old_verified, records, sign=-1),
+            key: _batch_totals(quantity, verified, records),
+        })
+
+
+def record_batch_deleted(batch):
+    """Remove a batch, with its lab tests and certificates, before they are deleted."""
+    key, quantity, verified = batch_state(batch)
+    if None in key or quantity is None or verified is None:
+        stored = _stored_state(batch.pk)
+        if stored is None:
+            return
+        key, quantity, verified = _complete((key, quantity, verified), stored)
+    record_changes({key: _batch_totals(quantity, verified, _records(batch.pk), sign=-1)})
+
+
+def _batch_key(record, batch_pk):
+    """Rollup key of a lab test's or certificate's batch, from the loaded batch where there is one."""
+    if type(record).batch.is_cached(record) and record.batch.pk == batch_pk:
+        key = batch_state(record.batch)[0]
+        if None not in key:
+            return key
+    stored = _stored_state(batch_pk)
+    return stored[0] if stored else None
+
+
+def record_record_change(record, batch_pk, delta):
+    """Count a lab test or certificate added to (delta=1) or removed from (delta=-1) a batch."""
+    key = _batch_key(record, batch_pk)
+    if key is not None:
+        field = 'lab_tests' if isinstance(record, LabTest) else 'certificates'
+        record_changes({key: {field: delta}})
+
+
+# --- Rebuild ---
+
+def _batch_keys(prefix=''):
+    return (f'{prefix}producer_name', f'{prefix}honey_type', f'{prefix}production_date')
+
+
+def _days(field, since=None, until=None):
+    days = Q()
+    if since:
+        days &= Q(**{f'{field}__gte': since})
+    if until:
+        days &= Q(**{f'{field}__lte': until})
+    return days
+
+
+def count_rollups(since=None, until=None):
+    """{key: {field: value}} counted from the tables, for production days in [since, until]."""
+    rollups = defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0))
+
+    batches = Batch.objects.filter(_days('production_date', since, until)).values(*_batch_keys()).annotate(
+        total=Count('id'),
+        total_quantity=Sum('quantity'),
+        verified=Count('id', filter=Q(blockchain_tx_hash__isnull=False)),
+    ).order_by()
+    for row in batches:
+        key = tuple(row[field] for field in _batch_keys())
+        rollups[key].update(batches=row['total'], quantity=row['total_quantity'], verified_batches=row['verified'])
+
+    related = (
+        (LabTest, {'lab_tests': Count('id')}),
+        (Certificate, {'certificates': Count('id')}),
+    )
+    for model, counts in related:
+        rows = (
+            model.objects.filter(_days('batch__production_date', since, until))
+            .values(*_batch_keys('batch__'))
+            .annotate(**counts)
+            .order_by()
+        )
+        for row in rows:
+            key = tuple(row[field] for field in _batch_keys('batch__'))
+            rollups[key].update({field: row[field] for field in counts})
+    return rollups
+
+
+def rebuild_rollups(since=None, until=None):
+    """
+    Recount the rollup rows for production days in [since, until] (every day
+    by default) and replace them. Returns the number of rows written.
+    """
+    with transaction.atomic():
+        counted = count_rollups(since, until)
+        BatchRollup.objects.filter(_days('day', since, until)).delete()
+        BatchRollup.objects.bulk_create([
+            BatchRollup(producer_name=producer_name, honey_type=honey_type, day=day, **totals)
+            for (producer_name, honey_type, day), totals in counted.items()
+        ], batch_size=1000)
+    return len(counted)
+
+
+# --- Reads ---
+
+def _percentage(part, whole):
+    return round((part / whole * 100) if whole > 0 else 0, 1)
+
+
+def _period(field, granularity):
+    trunc = GRANULARITIES[granularity]
+    return F(field) if trunc is None else trunc(field)
+
+
+def _rollup_totals(rows, granularity, groups):
+    """{(period, *group values): {field: total}} summed from BatchRollup rows."""
+    rows = (
+        rows.annotate(period=_period('day', granularity))
+        .values('period', *groups)
+        .annotate(**{f'total_{field}': Sum(field) for field in ROLLUP_FIELDS})
+        .order_by()
+    )
+    return {
+        (row['period'], *(row[field] for field in groups)): {field: row[f'total_{field}'] or 0 for field in ROLLUP_FIELDS}
+        for row in rows
+    }
+
+
+def _table_totals(batches, granularity, groups):
+    """The same totals counted from the tables, for the given batches only."""
+    totals = defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0))
+    rows = (
+        batches.annotate(period=_period('production_date', granularity))
+        .values('period', *groups)
+        .annotate(
+            total=Count('id'),
+            total_quantity=Sum('quantity'),
+            verified=Count('id', filter=Q(blockchain_tx_hash__isnull=False)),
+        )
+        .order_by()
+    )
+    for row in rows:
+        totals[(row['period'], *(row[field] for field in groups))].update(
+            batches=row['total'], quantity=row['total_quantity'] or 0, verified_batches=row['verified'],
+        )
+
+    for model, total_field in ((LabTest, 'lab_tests'), (Certificate, 'certificates')):
+        rows = (
+            model.objects.filter(batch__in=batches)
+            .annotate(period=_period('batch__production_date', granularity))
+            .values('period', *(f'batch__{field}' for field in groups))
+            .annotate(total=Count('id'))
+            .order_by()
+        )
+        for row in rows:
+            totals[(row['period'], *(row[f'batch__{field}'] for field in groups))][total_field] = row['total']
+    return totals
+
+
+def query_rollups(since=None, until=None, granularity='day', group_by=(), producer=None, honey_type=None, batches=None):
+    """
+    Totals per period (and per producer and/or honey type when grouped),
+    oldest period first. Reads only BatchRollup, whose rows cover every
+    producer; with `batches` (a Batch queryset) only those batches are
+    counted, from the tables, for users who may not see everyone's totals.
+    """
+    groups = [GROUP_BY_FIELDS[name] for name in group_by]
+    if batches is None:
+        rows = BatchRollup.objects.filter(_days('day', since, until))
+        if producer:
+            rows = rows.filter(producer_name=producer)
+        if honey_type:
+            rows = rows.filter(honey_type=honey_type)
+        grouped = _rollup_totals(rows, granularity, groups)
+    else:
+        batches = batches.filter(_days('production_date', since, until))
+        if producer:
+            batches = batches.filter(producer_name=producer)
+        if honey_type:
+            batches = batches.filter(honey_type=honey_type)
+        grouped = _table_totals(batches, granularity, groups)
+
+    results = []
+    for (period_start, *group_values), totals in sorted(grouped.items()):
+        if not totals['batches'] and not totals['lab_tests'] and not totals['certificates']:
+            continue
+        results.append({
+            'period': period_start.isoformat(),
+            **dict(zip(groups, group_values)),
+            **totals,
+            'quantity': str(Decimal(totals['quantity']).quantize(Decimal('0.01'))),
+            'verified_percentage': _percentage(totals['verified_batches'], totals['batches']),
+            'certified_percentage': _percentage(totals['certificates'], totals['batches']),
+        })
+    return results
@@ -0,0 +1,313 @@
+"""
+Batch search (GET /api/batches/search/?q= and the admin search box).
+
+`icontains` across batch_id, producer_name and the joined user emails is a
+sequential scan with two joins. Instead each batch has a BatchSearchDocument
+row holding its searchable text, which batches.signals keeps in step with
+the batch and its users, and the database indexes it with the backend picked
+by SEARCH_BACKEND:
+
+    postgres  A generated tsvector column (batch ID, producer, honey type,
+              emails, in falling weight) with a GIN index, plus pg_trgm GIN
+              indexes so partial batch IDs and emails match with ILIKE.
+              PostgreSQL maintains both on every write.
+    sqlite    An external-content FTS5 table, kept in step with the
+              documents by triggers, ranked with bm25().
+    basic     Case-insensitive matching on the document table, for databases
+              with neither (no joins, but still a scan).
+
+"auto" (the default) picks postgres or sqlite from the database vendor,
+falling back to basic when the index is missing (e.g. SQLite built without
+FTS5). Every word of the query must match; the last token of each word is a
+prefix, so "AB-20" finds AB-2024-001 while it is still being typed.
+
+`manage.py rebuild_search_index` rewrites every document and rebuilds the
+backend's index (run it after writes that skip signals).
+"""
+import re
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from .models import Batch, BatchSearchDocument
+
+SEARCH_BACKENDS = ('auto', 'postgres', 'sqlite', 'basic')
+
+# Words of a query that are used; the rest are ignored
+MAX_QUERY_WORDS = 8
+
+DOCUMENT_TABLE = BatchSearchDocument._meta.db_table
+FTS_TABLE = 'batches_batchsearch_fts'
+FTS_COLUMNS = ('batch_code', 'producer_name', 'honey_type', 'emails')
+
+
+def query_words(query):
+    """The tokens of each whitespace-separated word of a query: "AB-20 acacia" -> [['ab', '20'], ['acacia']]."""
+    words = [re.findall(r'\w+', word.lower()) for word in (query or '').split()]
+    return [tokens for tokens in words if tokens][:MAX_QUERY_WORDS]
+
+
+# --- Documents ---
+
+def _document(batch_pk, batch_code, producer_name, honey_type, *emails):
+    return BatchSearchDocument(
+        batch_id=batch_pk,
+        batch_code=batch_code,
+        producer_name=producer_name,
+        honey_type=honey_type,
+        emails=' '.join(sorted({email for email in emails if email})),
+    )
+
+
+def _document_rows(batches):
+    return batches.values_list(
+        'pk', 'batch_id', 'producer_name', 'honey_type', 'created_by__email', 'owner__email',
+    )
+
+
+def index_batches(batch_pks):
+    """Rewrite the search documents of the given batches (by pk) from the tables."""
+    batch_pks = list(batch_pks)
+    if not batch_pks:
+        return
+    documents = [_document(*row) for row in _document_rows(Batch.objects.filter(pk__in=batch_pks))]
+    with transaction.atomic():
+        BatchSearchDocument.objects.filter(batch_id__in=batch_pks).delete()
+        BatchSearchDocument.objects.bulk_create(documents, batch_size=1000)
+
+
+def index_user_batches(user):
+    """Rewrite the documents of every batch a user created or owns (after an email change)."""
+    batch_pks = list(Batch.objects.filter(Q(created_by=user) | Q(owner=user)).values_list('pk', flat=True))
+    for start in range(0, len(batch_pks), 1000):
+        index_batches(batch_pks[start:start + 1000])
+
+
+def rebuild_search_index(chunk_size=1000):
+    """Rewrite every search document and rebuild the backend's index; returns the number of documents."""
+    global _backend
+    install_search_index(connection)
+    _backend = None
+    written = 0
+    with transaction.atomic():
+        BatchSearchDocument.objects.all().delete()
+        chunk = []
+        for row in _document_rows(Batch.objects.order_by('pk')).iterator(chunk_size=chunk_size):
+            chunk.append(_document(*row))
+            if len(chunk) >= chunk_size:
+                BatchSearchDocument.objects.bulk_create(chunk)
+                written += len(chunk)
+                chunk = []
+        BatchSearchDocument.objects.bulk_create(chunk)
+        written += len(chunk)
+    get_search_backend().rebuild_index()
+    return written
+
+
+# --- Index DDL (also run by migration 0015) ---
+
+def install_search_index(conn):
+    """Create the vendor's search index on the document table if it is missing."""
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            cursor.execute(f'''
+                ALTER TABLE "{DOCUMENT_TABLE}" ADD COLUMN IF NOT EXISTS "search_vector" tsvector
+                GENERATED ALWAYS AS (
+                    setweight(to_tsvector('simple', coalesce("batch_code", '')), 'A') ||
+                    setweight(to_tsvector('simple', coalesce("producer_name", '')), 'B') ||
+                    setweight(to_tsvector('simple', coalesce("honey_type", '')), 'C') ||
+                    setweight(to_tsvector('simple', coalesce("emails", '')), 'D')
+                ) STORED
+            ''')
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS "batchsearch_vector_idx" ON "{DOCUMENT_TABLE}" USING GIN ("search_vector")')
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS "batchsearch_code_trgm_idx" ON "{DOCUMENT_TABLE}" USING GIN ("batch_code" gin_trgm_ops)')
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS "batchsearch_emails_trgm_idx" ON "{DOCUMENT_TABLE}" USING GIN ("emails" gin_trgm_ops)')
+        elif conn.vendor == 'sqlite':
+            columns = ', '.join(FTS_COLUMNS)
+            new_values = ', '.join(f'new.{column}' for column in FTS_COLUMNS)
+            old_values = ', '.join(f'old.{column}' for column in FTS_COLUMNS)
+            try:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5({columns}, "
+                    f"content='{DOCUMENT_TABLE}', content_rowid='batch_id', "
+                    f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+                )
+            except Exception:
+                # SQLite without FTS5: the basic backend is used
+                return False
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {DOCUMENT_TABLE} BEGIN "
+                f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.batch_id, {new_values}); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {DOCUMENT_TABLE} BEGIN "
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.batch_id, {old_values}); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON {DOCUMENT_TABLE} BEGIN "
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.batch_id, {old_values}); "
+                f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.batch_id, {new_values}); END"
+            )
+        else:
+            return False
+    return True
+
+
+def uninstall_search_index(conn):
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute(f'ALTER TABLE "{DOCUMENT_TABLE}" DROP COLUMN IF EXISTS "search_vector"')
+        elif conn.vendor == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+# --- Backends ---
+
+class BasicSearchBackend:
+    """Case-insensitive matching on the document table."""
+    name = 'basic'
+
+    def search(self, words, user=None, limit=50, offset=0):
+        documents = BatchSearchDocument.objects.all()
+        for tokens in words:
+            text = ' '.join(tokens)
+            documents = documents.filter(
+                # Batch IDs are usually written with dashes ("AB-2024-001")
+                Q(batch_code__icontains='-'.join(tokens))
+                | Q(batch_code__icontains=''.join(tokens))
+                | Q(producer_name__icontains=text)
+                | Q(honey_type__icontains=text)
+                | Q(emails__icontains=tokens[0])
+            )
+        if user is not None:
+            documents = documents.filter(batch__access__user=user)
+        first = '-'.join(words[0])
+        documents = documents.annotate(rank=Case(
+            When(batch_code__iexact=first, then=Value(0)),
+            When(batch_code__istartswith=first, then=Value(1)),
+            default=Value(2),
+            output_field=IntegerField(),
+        ))
+        return list(documents.order_by('rank', '-batch_id').values_list('batch_id', flat=True)[offset:offset + limit])
+
+    def rebuild_index(self):
+        pass
+
+
+class SQLiteSearchBackend:
+    """FTS5 MATCH ranked with bm25(), batch ID column weighted highest."""
+    name = 'sqlite'
+
+    @staticmethod
+    def match_expression(words):
+        # Tokens are \w+, so they need no escaping; "ab 20"* is the phrase ab, 20... with a prefix last token
+        return ' AND '.join('"' + ' '.join(tokens) + '"*' for tokens in words)
+
+    def search(self, words, user=None, limit=50, offset=0):
+        sql = f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+        params = [self.match_expression(words)]
+        if user is not None:
+            sql += ' AND rowid IN (SELECT batch_id FROM batches_batchaccess WHERE user_id = %s)'
+            params.append(user.pk)
+        sql += f' ORDER BY bm25({FTS_TABLE}, 10.0, 4.0, 2.0, 1.0), rowid DESC LIMIT %s OFFSET %s'
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + [limit, offset])
+            return [row[0] for row in cursor.fetchall()]
+
+    def rebuild_index(self):
+        # Re-read every document, in case the triggers were missing for some writes
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+
+class PostgresSearchBackend:
+    """tsvector match with prefix lexemes, plus pg_trgm ILIKE on batch IDs and emails."""
+    name = 'postgres'
+
+    @staticmethod
+    def tsquery(words):
+        # Each word is a phrase of its tokens, the last one a prefix: ab <-> 20:*
+        return ' & '.join(' <-> '.join(tokens[:-1] + [f'{tokens[-1]}:*']) for tokens in words)
+
+    @staticmethod
+    def _like(text):
+        return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+    def search(self, words, user=None, limit=50, offset=0):
+        first = '-'.join(words[0])
+        # The ILIKE branch stands in for the first word only; the other words must still match the tsvector
+        partial = '(d.batch_code ILIKE %s OR d.emails ILIKE %s)'
+        params = [self.tsquery(words), self._like(first) + '%', '%' + self._like(first) + '%']
+        if len(words) > 1:
+            partial = f"({partial} AND d.search_vector @@ to_tsquery('simple', %s))"
+            params.append(self.tsquery(words[1:]))
+        sql = f'''
+            SELECT d.batch_id
+            FROM "{DOCUMENT_TABLE}" d, to_tsquery('simple', %s) query
+            WHERE (d.search_vector @@ query OR {partial})
+        '''
+        if user is not None:
+            sql += ' AND d.batch_id IN (SELECT batch_id FROM batches_batchaccess WHERE user_id = %s)'
+            params.append(user.pk)
+        sql += '''
+            ORDER BY ts_rank_cd(d.search_vector, query) + similarity(d.batch_code, %s) DESC, d.batch_id DESC
+            LIMIT %s OFFSET %s
+        '''
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + [first, limit, offset])
+            return [row[0] for row in cursor.fetchall()]
+
+    def rebuild_index(self):
+        # The generated column and GIN indexes are maintained by PostgreSQL; refresh the planner statistics
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE "{DOCUMENT_TABLE}"')
+
+
+BACKEND_CLASSES = {
+    'basic': BasicSearchBackend,
+    'sqlite': SQLiteSearchBackend,
+    'postgres': PostgresSearchBackend,
+}
+
+_backend = None
+
+
+def _index_installed(name):
+    with connection.cursor() as cursor:
+        if name == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        else:
+            cursor.execute(
+                'SELECT 1 FROM information_schema.columns WHERE table_name = %s AND column_name = %s',
+                [DOCUMENT_TABLE, 'search_vector'],
+            )
+        return cursor.fetchone() is not None
+
+
+def get_search_backend():
+    """The backend for SEARCH_BACKEND (checked against the database once per process)."""
+    global _backend
+    if _backend is None:
+        name = settings.SEARCH_BACKEND
+        if name not in SEARCH_BACKENDS:
+            raise ValueError(f"Unknown SEARCH_BACKEND {name!r} (expected one of {', '.join(SEARCH_BACKENDS)})")
+        if name == 'auto':
+            name = {'postgresql': 'postgres', 'sqlite': 'sqlite'}.get(connection.vendor, 'basic')
+            if name != 'basic' and not _index_installed(name):
+                name = 'basic'
+        _backend = BACKEND_CLASSES[name]()
+    return _backend
+
+
+def search_batches(query, user=None, limit=50, offset=0):
+    """
+    PKs of the batches matching `query`, best match first. With a user, only
+    the batches they can access (BatchAccess); without, all of them.
+    """
+    words = query_words(query)
+    if not words:
+        return []
+    return get_search_backend().search(words, user=user, limit=limit, offset=offset)
@@ -1,3 +1,7 @@
+import decimal
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
 from rest_framework import serializers
 from .models import Batch, LabTest, Certificate, AuditLog
 
@@ -30,4 +34,130 @@ class AuditLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = AuditLog
         fields = '__all__'
-        read_only_fields = ['timestamp']
\ No newline at end of file
+        read_only_fields = ['timestamp']
+
+
+class BatchImportSerializer(serializers.ModelSerializer):
+    """One row of a bulk import (batches.bulk_import checks batch_id uniqueness per chunk, in one query)."""
+
+    class Meta:
+        model = Batch
+        fields = ['batch_id', 'producer_name', 'production_date', 'honey_type', 'quantity', 'status']
+        extra_kwargs = {'batch_id': {'validators': []}}
+
+
+# --- Read fast path ---
+
+class ValuesSerializer:
+    """
+    Read-only serializer over values() rows, with the same output as a ModelSerializer.
+
+    Each output field is a values() lookup with a converter chosen once from
+    the model field, so rendering a row is a dict comprehension instead of a
+    pass through DRF's field machinery. Use lookups() to build the queryset,
+    to_representation() for a values() row and instance_representation() for
+    an already loaded instance.
+    """
+    model = None
+    # (output name, values() lookup), in output order
+    fields = ()
+    # Output fields DRF leaves out when the related object is missing (dotted sources)
+    omit_if_null = ()
+
+    def __init__(self):
+        self._fields = [
+            (name, lookup, self._converter(self._model_field(lookup)), name in self.omit_if_null)
+            for name, lookup in self.fields
+        ]
+
+    def _model_field(self, lookup):
+        model, field = self.model, None
+        for part in lookup.split('__'):
+            field = model._meta.get_field(part)
+            if field.is_relation:
+                model = field.related_model
+        return field
+
+    @staticmethod
+    def _converter(field):
+        """Function (value, output timezone) -> representation for a non-null value, or None to pass values through."""
+        if isinstance(field, models.DateTimeField):
+            def datetime_value(value, tz):
+                if tz is not None and timezone.is_aware(value):
+                    value = value.astimezone(tz)
+                value = value.isoformat()
+                return value[:-6] + 'Z' if value.endswith('+00:00') else value
+            return datetime_value
+        if isinstance(field, models.DateField):
+            return lambda value, tz: value.isoformat()
+        if isinstance(field, models.DecimalField):
+            quantum = decimal.Decimal(1).scaleb(-field.decimal_places)
+            return lambda value, tz: '{:f}'.format(decimal.Decimal(value).quantize(quantum))
+        return None
+
+    def lookups(self):
+        return [lookup for _, lookup, _, _ in self._fields]
+
+    @staticmethod
+    def _output_timezone():
+        # Looked up once per call: get_current_timezone() is slow enough to show per value
+        return timezone.get_current_timezone() if settings.USE_TZ else None
+
+    def _represent(self, row, tz):
+        data = {}
+        for name, lookup, convert, omit_if_null in self._fields:
+            value = row[lookup]
+            if value is None:
+                if omit_if_null:
+                    continue
+            elif convert is not None:
+                value = convert(value, tz)
+            data[name] = value
+        return data
+
+    def to_representation(self, row):
+        """Output dict for a values() row (keyed by lookup)."""
+        return self._represent(row, self._output_timezone())
+
+    def many(self, rows):
+        tz = self._output_timezone()
+        return [self._represent(row, tz) for row in rows]
+
+    def instance_representation(self, instance):
+        """Output dict for a model instance (its related objects should already be loaded)."""
+        row = {}
+        for _, lookup, _, _ in self._fields:
+            value = instance
+            *path, last = lookup.split('__')
+            for part in path:
+                value = getattr(value, part) if value is not None else None
+            if value is not None:
+                field = value._meta.get_field(last)
+                value = getattr(value, field.attname)
+            row[lookup] = value
+        return self.to_representation(row)
+
+
+class BatchReadSerializer(ValuesSerializer):
+    """BatchSerializer output for the batch list and detail views."""
+    model = Batch
+    fields = (
+        ('id', 'id'),
+        ('created_by_email', 'created_by__email'),
+        ('owner_email', 'owner__email'),
+        ('batch_id', 'batch_id'),
+        ('producer_name', 'producer_name'),
+        ('production_date', 'production_date'),
+        ('honey_type', 'honey_type'),
+        ('quantity', 'quantity'),
+        ('status', 'status'),
+        ('blockchain_tx_hash', 'blockchain_tx_hash'),
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+        ('created_by', 'created_by'),
+        ('owner', 'owner'),
+    )
+    omit_if_null = ('created_by_email', 'owner_email')
+
+
+batch_read_serializer = BatchReadSerializer()
@@ -0,0 +1,316 @@
+"""
+Signal handlers that keep derived data in step with batches, lab tests,
+certificates and audit logs.
+
+BatchAccess rows (batches.access), BatchSearchDocument rows
+(batches.search) and LabMeasurement rows (batches.measurements) are updated
+inside the write's own transaction, so they roll back with it. Statistics
+counters (batches.statistics) and BatchRollup rows (batches.rollups) are
+hot rows shared by many writes, so their deltas are applied after it commits. `manage.py reconcile_statistics` and `manage.py
+rebuild_rollups` recount the counters and rollups from the tables.
+
+BatchTimeline rows (batches.timeline, only when BATCH_TIMELINE_ENABLED is
+on) and cached public verification records (batches.public_verification,
+only when a field the record shows changed) are updated after the
+surrounding transaction commits, so a rolled-back
+write never reaches them and they see the committed rows. A failed update is
+logged and never fails the write itself; `manage.py rebuild_batch_timelines`
+re-renders timelines from scratch.
+"""
+import logging
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.contrib.auth import get_user_model
+from django.dispatch import receiver
+from .models import AuditLog, Batch, Certificate, LabTest
+from . import public_verification, rollups, search, statistics, timeline
+from .access import sync_batch_access
+from .measurements import sync_measurements
+
+logger = logging.getLogger(__name__)
+
+
+def _on_commit(update, *args):
+    def run():
+        try:
+            update(*args)
+        except Exception as e:
+            logger.error(f"Failed to run {update.__name__} after commit: {str(e)}")
+    transaction.on_commit(run)
+
+
+@receiver(post_save, sender=Batch)
+def batch_saved(sender, instance, **kwargs):
+    if settings.BATCH_TIMELINE_ENABLED:
+        _on_commit(timeline.refresh_timeline_steps, instance.pk)
+
+
+@receiver(post_save, sender=LabTest)
+@receiver(post_save, sender=Certificate)
+@receiver(post_delete, sender=LabTest)
+@receiver(post_delete, sender=Certificate)
+def record_changed(sender, instance, **kwargs):
+    if settings.BATCH_TIMELINE_ENABLED:
+        _on_commit(timeline.refresh_timeline_steps, instance.batch_id)
+
+
+@receiver(post_save, sender=AuditLog)
+def audit_log_saved(sender, instance, created, **kwargs):
+    if settings.BATCH_TIMELINE_ENABLED and created and instance.batch_id:
+        _on_commit(timeline.append_timeline_audit_log, instance)
+
+
+# --- Statistics counters ---
+
+# Not loaded (deferred field): the value cannot have been changed by save()
+_UNLOADED = object()
+
+
+def _counted_state(instance):
+    """(verified, producer_name) as loaded on the instance, without fetching deferred fields."""
+    tx_hash = instance.__dict__.get('blockchain_tx_hash', _UNLOADED)
+    verified = tx_hash if tx_hash is _UNLOADED else tx_hash is not None
+    producer = instance.__dict__.get('producer_name', _UNLOADED) if isinstance(instance, Batch) else _UNLOADED
+    return verified, producer
+
+
+@receiver(post_init, sender=Batch)
+@receiver(post_init, sender=LabTest)
+@receiver(post_init, sender=Certificate)
+def remember_counted_state(sender, instance, **kwargs):
+    instance._stats_state = _counted_state(instance)
+
+
+@receiver(post_save, sender=Batch)
+@receiver(post_save, sender=LabTest)
+@receiver(post_save, sender=Certificate)
+def count_saved_record(sender, instance, created, **kwargs):
+    total, verified = statistics.MODEL_COUNTERS[sender]
+    was_verified, old_producer = instance._stats_state
+    is_verified, producer = _counted_state(instance)
+    counters, producers = {}, {}
+    if created:
+        counters[total] = 1
+        counters[verified] = int(is_verified is True)
+        if producer is not _UNLOADED:
+            producers[producer] = 1
+    else:
+        if _UNLOADED not in (was_verified, is_verified):
+            counters[verified] = int(is_verified) - int(was_verified)
+        if _UNLOADED not in (old_producer, producer) and old_producer != producer:
+            producers[old_producer] = -1
+            producers[producer] = 1
+    statistics.record_changes(counters, producers)
+    # The instance may be saved again
+    instance._stats_state = (is_verified, producer)
+
+
+@receiver(post_delete, sender=Batch)
+@receiver(post_delete, sender=LabTest)
+@receiver(post_delete, sender=Certificate)
+def count_deleted_record(sender, instance, **kwargs):
+    total, verified = statistics.MODEL_COUNTERS[sender]
+    counters = {total: -1, verified: -int(instance.blockchain_tx_hash is not None)}
+    producers = {instance.producer_name: -1} if sender is Batch else {}
+    statistics.record_changes(counters, producers)
+
+
+# --- Batch access ---
+
+def _access_state(instance):
+    return (instance.__dict__.get('created_by_id', _UNLOADED), instance.__dict__.get('owner_id', _UNLOADED))
+
+
+@receiver(post_init, sender=Batch)
+def remember_access_state(sender, instance, **kwargs):
+    instance._access_state = _access_state(instance)
+
+
+@receiver(post_save, sender=Batch)
+def sync_access_on_save(sender, instance, created, **kwargs):
+    state = _access_state(instance)
+    if created or state != instance._access_state:
+        sync_batch_access([instance])
+        instance._access_state = state
+
+
+# --- Lab measurements ---
+
+def _result_state(instance):
+    return (instance.__dict__.get('test_type', _UNLOADED), instance.__dict__.get('result', _UNLOADED))
+
+
+@receiver(post_init, sender=LabTest)
+def remember_result_state(sender, instance, **kwargs):
+    instance._result_state = _result_state(instance)
+
+
+@receiver(post_save, sender=LabTest)
+def sync_measurements_on_save(sender, instance, created, **kwargs):
+    state = _result_state(instance)
+    if _UNLOADED in state:
+        return
+    if created or state != instance._result_state:
+        sync_measurements([instance])
+        instance._result_state = state
+
+
+# --- Rollups ---
+
+@receiver(post_init, sender=Batch)
+def remember_rollup_state(sender, instance, **kwargs):
+    instance._rollup_state = rollups.batch_state(instance)
+
+
+@receiver(post_save, sender=Batch)
+def roll_up_saved_batch(sender, instance, created, **kwargs):
+    state = rollups.batch_state(instance)
+    if created:
+        rollups.record_batch_created(instance)
+    else:
+        rollups.record_batch_update(instance.pk, instance._rollup_state, state)
+    instance._rollup_state = state
+
+
+@receiver(pre_delete, sender=Batch)
+def roll_up_deleted_batch(sender, instance, **kwargs):
+    # Counted before the cascade removes its lab tests and certificates
+    rollups.record_batch_deleted(instance)
+
+
+@receiver(post_init, sender=LabTest)
+@receiver(post_init, sender=Certificate)
+def remember_rollup_batch(sender, instance, **kwargs):
+    instance._rollup_batch = instance.__dict__.get('batch_id')
+
+
+@receiver(post_save, sender=LabTest)
+@receiver(post_save, sender=Certificate)
+def roll_up_saved_record(sender, instance, created, **kwargs):
+    if created:
+        rollups.record_record_change(instance, instance.batch_id, 1)
+    elif instance._rollup_batch is not None and instance.batch_id != instance._rollup_batch:
+        rollups.record_record_change(instance, instance._rollup_batch, -1)
+        rollups.record_record_change(instance, instance.batch_id, 1)
+    instance._rollup_batch = instance.batch_id
+
+
+@receiver(post_delete, sender=LabTest)
+@receiver(post_delete, sender=Certificate)
+def roll_up_deleted_record(sender, instance, origin=None, **kwargs):
+    # A deleted batch took its records out of the rollups in pre_delete
+    if isinstance(origin, Batch) or getattr(origin, 'model', None) is Batch:
+        return
+    rollups.record_record_change(instance, instance.batch_id, -1)
+
+
+# --- Search documents ---
+
+def _search_state(instance):
+    return tuple(
+        instance.__dict__.get(field, _UNLOADED)
+        for field in ('batch_id', 'producer_name', 'honey_type', 'created_by_id', 'owner_id')
+    )
+
+
+@receiver(post_init, sender=Batch)
+def remember_search_state(sender, instance, **kwargs):
+    instance._search_state = _search_state(instance)
+
+
+@receiver(post_save, sender=Batch)
+def index_saved_batch(sender, instance, created, **kwargs):
+    state = _search_state(instance)
+    if created or state != instance._search_state:
+        search.index_batches([instance.pk])
+        instance._search_state = state
+
+
+@receiver(post_init, sender=get_user_model())
+def remember_user_email(sender, instance, **kwargs):
+    instance._search_email = instance.__dict__.get('email', _UNLOADED)
+
+
+@receiver(post_save, sender=get_user_model())
+def index_user_batches(sender, instance, created, **kwargs):
+    email = instance.__dict__.get('email', _UNLOADED)
+    if not created and _UNLOADED not in (email, instance._search_email) and email != instance._search_email:
+        search.index_user_batches(instance)
+    instance._search_email = email
+
+
+# --- Public verification records ---
+
+# Fields build_public_record() shows, per model (batch_id is the foreign key on records)
+PUBLIC_FIELDS = {
+    Batch: ('batch_id', 'producer_name', 'honey_type', 'production_date', 'status', 'blockchain_tx_hash'),
+    LabTest: ('batch_id', 'test_type', 'tested_by', 'test_date', 'blockchain_tx_hash'),
+    Certificate: ('batch_id', 'certificate_id', 'issued_by', 'issue_date', 'expiry_date', 'blockchain_tx_hash'),
+}
+
+
+def _public_state(instance):
+    return {field: instance.__dict__.get(field, _UNLOADED) for field in PUBLIC_FIELDS[type(instance)]}
+
+
+def _public_batch_ids(instance):
+    """The batch_id of the instance's batch where it is loaded, so no query is needed to find its record."""
+    batch = instance if isinstance(instance, Batch) else (
+        instance.batch if type(instance).batch.is_cached(instance) else None
+    )
+    return [batch.batch_id] if batch is not None and 'batch_id' in batch.__dict__ else []
+
+
+@receiver(post_init, sender=Batch)
+@receiver(post_init, sender=LabTest)
+@receiver(post_init, sender=Certificate)
+def remember_public_state(sender, instance, **kwargs):
+    instance._public_state = _public_state(instance)
+
+
+@receiver(post_save, sender=Batch)
+@receiver(post_save, sender=LabTest)
+@receiver(post_save, sender=Certificate)
+def refresh_public_record(sender, instance, created, update_fields=None, **kwargs):
+    old_state, state = instance._public_state, _public_state(instance)
+    fields = PUBLIC_FIELDS[sender]
+    if update_fields is not None:
+        # Only these were written; the foreign key can be named either way
+        fields = [field for field in fields if field in update_fields or field.removesuffix('_id') in update_fields]
+    if not created and all(old_state[field] == state[field] for field in fields):
+        return
+    instance._public_state = {**old_state, **{field: state[field] for field in fields}}
+
+    old_tx_hash, tx_hash = old_state['blockchain_tx_hash'], state['blockchain_tx_hash']
+    recorded = 'blockchain_tx_hash' in fields and tx_hash and tx_hash is not _UNLOADED
+    batch_pk = instance.pk if sender is Batch else instance.batch_id
+    batch_ids = _public_batch_ids(instance)
+    if recorded and not (old_tx_hash and old_tx_hash is not _UNLOADED):
+        # Just recorded on chain: render the record before the jars are scanned
+        _on_commit(public_verification.warm_public_records, [batch_pk])
+    elif batch_ids:
+        _on_commit(public_verification.refresh_public_records, (), batch_ids)
+    else:
+        _on_commit(public_verification.refresh_public_records, [batch_pk])
+    old_batch_id, batch_id = old_state['batch_id'], state['batch_id']
+    if not created and 'batch_id' in fields and _UNLOADED not in (old_batch_id, batch_id) and old_batch_id != batch_id:
+        if sender is Batch:
+            _on_commit(public_verification.forget_public_record, old_batch_id)
+        else:
+            # Moved to another batch: the old batch's record still lists it
+            _on_commit(public_verification.refresh_public_records, [old_batch_id])
+
+
+@receiver(post_delete, sender=Batch)
+def forget_deleted_batch_record(sender, instance, **kwargs):
+    _on_commit(public_verification.forget_public_record, instance.batch_id)
+
+
+@receiver(post_delete, sender=LabTest)
+@receiver(post_delete, sender=Certificate)
+def refresh_deleted_record(sender, instance, origin=None, **kwargs):
+    # The batch's own post_delete drops its record
+    if isinstance(origin, Batch) or getattr(origin, 'model', None) is Batch:
+        return
+    _on_commit(public_verification.refresh_public_records, [instance.batch_id])
@@ -0,0 +1,191 @@
+"""
+Counters behind the public statistics endpoint.
+
+Counting the batch, lab test and certificate tables on every landing-page
+hit gets slower as they grow, so the totals are kept in StatCounter rows
+instead. The endpoint sums them in one query and caches the response for
+STATISTICS_CACHE_SECONDS.
+
+Every write would otherwise update the same total_batches row and hold its
+lock until the write commits, so each counter is split over
+STATISTICS_COUNTER_SHARDS rows and a delta goes to a random one. The signal
+handlers in batches.signals hand their deltas to record_changes(), which
+applies them after the write commits, in a transaction of their own. The
+number of distinct producers is counted from ProducerCount rows (one per
+producer name) when the statistics are read, so a batch write never locks a
+shared row to keep it.
+
+Writes that skip model signals (queryset.update(), bulk_create() without
+record_changes()), and deltas lost to a crash between a commit and its
+counter update, are picked up by reconcile_statistics()
+(manage.py reconcile_statistics, run periodically), which recounts everything
+from the tables.
+"""
+import hashlib
+import json
+import logging
+import random
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from .models import Batch, LabTest, Certificate, StatCounter, ProducerCount
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = (
+    'total_batches',
+    'verified_batches',
+    'total_lab_tests',
+    'verified_lab_tests',
+    'total_certificates',
+    'verified_certificates',
+)
+
+# Model => (total counter, verified counter)
+MODEL_COUNTERS = {
+    Batch: ('total_batches', 'verified_batches'),
+    LabTest: ('total_lab_tests', 'verified_lab_tests'),
+    Certificate: ('total_certificates', 'verified_certificates'),
+}
+
+CACHE_KEY = 'batches:statistics'
+
+
+# --- Incremental updates ---
+
+def record_changes(counters=None, producers=None):
+    """
+    Apply counter deltas once the current transaction commits.
+
+    `counters` maps counter name to delta, `producers` maps producer name to
+    a change in its batch count. Counters that do not exist yet are skipped:
+    the first read reconciles them from the tables.
+    """
+    counters = {name: delta for name, delta in (counters or {}).items() if delta}
+    producers = {name: delta for name, delta in (producers or {}).items() if delta}
+    if not counters and not producers:
+        return
+
+    def apply():
+        try:
+            _apply_changes(counters, producers)
+        except Exception as e:
+            logger.error(f"Failed to update statistics counters (reconcile_statistics will fix them): {str(e)}")
+    transaction.on_commit(apply)
+
+
+def _apply_changes(counters, producers):
+    shard = random.randrange(settings.STATISTICS_COUNTER_SHARDS)
+    with transaction.atomic():
+        for producer_name, delta in producers.items():
+            _adjust_producer(producer_name, delta)
+        for name, delta in counters.items():
+            updated = StatCounter.objects.filter(name=name, shard=shard).update(value=F('value') + delta)
+            if not updated:
+                # Fewer shards than configured (the setting was raised since the last reconcile)
+                StatCounter.objects.filter(name=name, shard=0).update(value=F('value') + delta)
+
+
+def _adjust_producer(producer_name, delta):
+    """Change a producer's batch count, creating its row on its first batch."""
+    if ProducerCount.objects.filter(producer_name=producer_name).update(batches=F('batches') + delta) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            ProducerCount.objects.create(producer_name=producer_name, batches=delta)
+    except IntegrityError:
+        # Created by a concurrent write
+        ProducerCount.objects.filter(producer_name=producer_name).update(batches=F('batches') + delta)
+
+
+# --- Reads ---
+
+def _count_tables(apps):
+    """Every counter counted from the tables (the old, slow path)."""
+    counts = {}
+    for model, (total, verified) in MODEL_COUNTERS.items():
+        model = apps.get_model('batches', model.__name__)
+        counts[total] = model.objects.count()
+        # Counting the unrecorded rows can use the partial blockchain_tx_hash IS NULL index
+        counts[verified] = counts[total] - model.objects.filter(blockchain_tx_hash__isnull=True).count()
+    return counts
+
+
+def reconcile_statistics(apps=global_apps):
+    """
+    Recount every counter from the tables and overwrite the counters.
+    Returns {counter: (stored value or None, counted value)} for counters that had drifted.
+
+    Migrations pass their historical `apps` to seed the counters.
+    """
+    stat_counter = apps.get_model('batches', 'StatCounter')
+    producer_count = apps.get_model('batches', 'ProducerCount')
+    batch = apps.get_model('batches', 'Batch')
+    shards = settings.STATISTICS_COUNTER_SHARDS
+
+    with transaction.atomic():
+        stored = {}
+        for name, value in stat_counter.objects.select_for_update().values_list('name', 'value'):
+            stored[name] = stored.get(name, 0) + value
+        counts = _count_tables(apps)
+        stat_counter.objects.all().delete()
+        stat_counter.objects.bulk_create([
+            stat_counter(name=name, shard=shard, value=value if shard == 0 else 0)
+            for name, value in counts.items()
+            for shard in range(shards)
+        ])
+
+        producer_count.objects.all().delete()
+        producer_count.objects.bulk_create([
+            producer_count(producer_name=row['producer_name'], batches=row['batches'])
+            for row in batch.objects.values('producer_name').annotate(batches=Count('id'))
+        ], batch_size=1000)
+
+    try:
+        cache.delete(CACHE_KEY)
+    except Exception as e:
+        logger.warning(f"Could not clear cached statistics: {str(e)}")
+    drift = {name: (stored.get(name), value) for name, value in counts.items() if stored.get(name) != value}
+    if any(stored_value is not None for stored_value, _ in drift.values()):
+        logger.warning(f"Statistics counters drifted and were reconciled: {drift}")
+    return drift
+
+
+def _sum_counters():
+    return dict(
+        StatCounter.objects.filter(name__in=COUNTERS).values('name')
+        .annotate(total=Sum('value')).values_list('name', 'total')
+    )
+
+
+def read_statistics():
+    """The statistics payload from the counters (two queries; reconciles first if counters are missing)."""
+    counts = _sum_counters()
+    if len(counts) < len(COUNTERS):
+        reconcile_statistics()
+        counts = _sum_counters()
+
+    total_batches = counts['total_batches']
+    return {
+        'total_batches': total_batches,
+        'verified_batches': counts['verified_batches'],
+        'verified_percentage': round((counts['verified_batches'] / total_batches * 100) if total_batches > 0 else 0, 1),
+        'unique_producers': ProducerCount.objects.filter(batches__gt=0).count(),
+        'total_lab_tests': counts['total_lab_tests'],
+        'verified_lab_tests': counts['verified_lab_tests'],
+        'total_certificates': counts['total_certificates'],
+        'verified_certificates': counts['verified_certificates'],
+    }
+
+
+def get_statistics():
+    """(payload, etag) from the cache, read from the counters on a miss."""
+    cached = cache.get(CACHE_KEY)
+    if cached is None:
+        payload = read_statistics()
+        digest = hashlib.md5(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+        cached = (payload, f'"{digest}"')
+        cache.set(CACHE_KEY, cached, timeout=settings.STATISTICS_CACHE_SECONDS)
+    return cached
@@ -0,0 +1,207 @@
+"""
+Batch journey: the steps and audit trail shown by the journey endpoint.
+
+build_journey() renders a journey in a fixed number of queries (the batch
+with its creator, owner and certificate, its lab tests, and its audit logs),
+however long the batch's history is.
+
+With BATCH_TIMELINE_ENABLED on, each batch also keeps a rendered copy in
+BatchTimeline. The signal handlers in batches.signals refresh it when the
+batch, a lab test or the certificate is saved, and append each new audit log
+to it, so reading a journey is a single query.
+
+Audit logs moved to archive files by `manage.py archive_audit_logs` are
+merged back in (batches.audit_storage).
+"""
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils.dateparse import parse_datetime
+from .models import AuditLog, Batch, BatchTimeline, Certificate, LabTest
+from .audit_storage import merged_audit_logs
+
+AUDIT_TRAIL_FIELDS = (
+    'id', 'action', 'action_description', 'user_id', 'user_email', 'timestamp',
+    'blockchain_tx_hash', 'old_values', 'new_values', 'ip_address',
+)
+
+
+def journey_batches():
+    """Batches with everything the journey steps touch loaded up front (two queries)."""
+    return Batch.objects.select_related(
+        'created_by', 'owner', 'certificate', 'certificate__created_by',
+    ).prefetch_related(
+        Prefetch(
+            'lab_tests',
+            queryset=LabTest.objects.select_related('created_by').order_by('test_date', 'created_at'),
+        ),
+    )
+
+
+def journey_audit_logs(batch_pk):
+    """The batch's audit logs, oldest first, with only the fields the journey shows (one query)."""
+    return AuditLog.objects.filter(batch_id=batch_pk).only(*AUDIT_TRAIL_FIELDS).order_by('timestamp')
+
+
+def audit_trail_entry(log):
+    return {
+        'id': log.id,
+        'action': log.action,
+        'action_description': log.action_description,
+        'user': log.user_email,
+        'user_id': log.user_id,
+        'timestamp': log.timestamp.isoformat(),
+        'blockchain_tx_hash': log.blockchain_tx_hash,
+        'old_values': log.old_values,
+        'new_values': log.new_values,
+        'ip_address': str(log.ip_address) if log.ip_address else None,
+    }
+
+
+def build_journey_steps(batch, blockchain_log=None):
+    """
+    Journey steps for a batch loaded through journey_batches().
+
+    `blockchain_log` is the first record_blockchain audit entry
+    ({'timestamp', 'user'}), or None.
+    """
+    journey_steps = []
+
+    # Step 1: Batch Created
+    if batch.created_at:
+        journey_steps.append({
+            'id': 1,
+            'title': 'Batch Created',
+            'location': batch.producer_name or 'Unknown Producer',
+            'date': batch.created_at.strftime('%b %d, %Y'),
+            'verified': False,
+            'action': 'create',
+            'user': batch.created_by.email if batch.created_by else 'System',
+            'timestamp': batch.created_at.isoformat(),
+        })
+
+    # Step 2: Lab Tests
+    for test in batch.lab_tests.all():
+        journey_steps.append({
+            'id': len(journey_steps) + 1,
+            'title': f'Lab Test: {test.test_type}',
+            'location': test.tested_by or 'Unknown Lab',
+            'date': test.test_date.strftime('%b %d, %Y') if test.test_date else test.created_at.strftime('%b %d, %Y'),
+            'verified': bool(test.blockchain_tx_hash),
+            'action': 'lab_test',
+            'user': test.created_by.email if test.created_by else 'System',
+            'blockchain_tx_hash': test.blockchain_tx_hash,
+            'timestamp': (test.test_date or test.created_at).isoformat() if test.test_date or test.created_at else None,
+        })
+
+    # Step 3: Certificate
+    try:
+        cert = batch.certificate
+        journey_steps.append({
+            'id': len(journey_steps) + 1,
+            'title': 'Certificate Issued',
+            'location': cert.issued_by or 'Unknown Authority',
+            'date': cert.issue_date.strftime('%b %d, %Y') if cert.issue_date else cert.created_at.strftime('%b %d, %Y'),
+            'verified': bool(cert.blockchain_tx_hash),
+            'action': 'certificate',
+            'user': cert.created_by.email if cert.created_by else 'System',
+            'blockchain_tx_hash': cert.blockchain_tx_hash,
+            'timestamp': (cert.issue_date or cert.created_at).isoformat() if cert.issue_date or cert.created_at else None,
+        })
+    except Certificate.DoesNotExist:
+        pass
+
+    # Step 4: Blockchain Recording
+    if batch.blockchain_tx_hash:
+        timestamp = blockchain_log['timestamp'] if blockchain_log else batch.updated_at
+        journey_steps.append({
+            'id': len(journey_steps) + 1,
+            'title': 'Recorded on Blockchain',
+            'location': 'Ethereum Blockchain',
+            'date': timestamp.strftime('%b %d, %Y'),
+            'verified': True,
+            'action': 'record_blockchain',
+            'user': blockchain_log['user'] if blockchain_log else 'System',
+            'blockchain_tx_hash': batch.blockchain_tx_hash,
+            'timestamp': timestamp.isoformat(),
+        })
+
+    return journey_steps
+
+
+def _first_blockchain_log(logs):
+    for log in logs:
+        if log.action == 'record_blockchain':
+            return {'timestamp': log.timestamp, 'user': log.user_email}
+    return None
+
+
+def _first_blockchain_entry(audit_trail):
+    """_first_blockchain_log() for a rendered audit trail."""
+    for entry in audit_trail:
+        if entry['action'] == 'record_blockchain':
+            return {'timestamp': parse_datetime(entry['timestamp']), 'user': entry['user']}
+    return None
+
+
+def build_journey(batch):
+    """
+    Journey steps and audit trail for a batch loaded through journey_batches()
+    (one more query, plus the archive lookup for batches older than the newest archived entry).
+    """
+    logs = merged_audit_logs(batch, journey_audit_logs(batch.pk))
+    return {
+        'journey_steps': build_journey_steps(batch, _first_blockchain_log(logs)),
+        'audit_trail': [audit_trail_entry(log) for log in logs],
+    }
+
+
+# --- Denormalized timeline ---
+
+def rebuild_batch_timeline(batch_pk):
+    """Render a batch's journey from scratch into its BatchTimeline row."""
+    batch = journey_batches().filter(pk=batch_pk).first()
+    if batch is None:
+        return None
+    journey = build_journey(batch)
+    timeline, _ = BatchTimeline.objects.update_or_create(
+        batch=batch,
+        defaults={'steps': journey['journey_steps'], 'audit_trail': journey['audit_trail']},
+    )
+    return timeline
+
+
+def refresh_timeline_steps(batch_pk):
+    """
+    Re-render the journey steps after the batch, a lab test or the certificate changed.
+
+    The audit trail is kept as is; a batch without a timeline row yet is
+    rendered from scratch.
+    """
+    with transaction.atomic():
+        timeline = BatchTimeline.objects.select_for_update().filter(batch_id=batch_pk).first()
+        if timeline is None:
+            return rebuild_batch_timeline(batch_pk)
+        batch = journey_batches().filter(pk=batch_pk).first()
+        if batch is None:
+            return None
+        timeline.steps = build_journey_steps(batch, _first_blockchain_entry(timeline.audit_trail))
+        timeline.save(update_fields=['steps', 'updated_at'])
+    return timeline
+
+
+def append_timeline_audit_log(log):
+    """Add a new audit log to its batch's timeline, re-rendering the steps for record_blockchain entries."""
+    with transaction.atomic():
+        timeline = BatchTimeline.objects.select_for_update().filter(batch_id=log.batch_id).first()
+        if timeline is None:
+            return rebuild_batch_timeline(log.batch_id)
+        # Already there if the row was just rendered from scratch
+        if any(entry['id'] == log.id for entry in timeline.audit_trail):
+            return timeline
+        timeline.audit_trail.append(audit_trail_entry(log))
+        timeline.save(update_fields=['audit_trail', 'updated_at'])
+
+    if log.action == 'record_blockchain':
+        # The blockchain step shows the first record_blockchain entry
+        return refresh_timeline_steps(log.batch_id)
+    return timeline
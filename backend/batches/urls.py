@@ -1,12 +1,13 @@
 # backend/batches/urls.py
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import BatchViewSet, LabTestViewSet, CertificateViewSet
+from .views import BatchViewSet, LabTestViewSet, CertificateViewSet, AuditLogViewSet
 
 router = DefaultRouter()
 router.register(r'batches', BatchViewSet, basename='batch')
 router.register(r'labtests', LabTestViewSet, basename='labtest')
 router.register(r'certificates', CertificateViewSet, basename='certificate')
+router.register(r'audit-logs', AuditLogViewSet, basename='auditlog')
 
 urlpatterns = [
     path('', include(router.urls)),
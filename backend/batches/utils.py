@@ -5,6 +5,8 @@ import logging
 from django.contrib.auth import get_user_model
 from django.db import models
 from .models import AuditLog, Batch, LabTest, Certificate
+from .access import accessible_batches
+from .audit import get_audit_sink
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -24,6 +26,9 @@ def log_audit_action(
 ):
     """
     Create an audit log entry for any action.
+
+    The entry is written through the AUDIT_LOG_MODE sink, so outside sync
+    mode the returned AuditLog may not be saved yet.
     
     Args:
         action: One of 'create', 'update', 'delete', 'record_blockchain', 'verify_blockchain'
@@ -38,31 +43,23 @@ def log_audit_action(
         request: Django request object (for IP and user agent)
     """
     try:
-        user_email = user.email if user and hasattr(user, 'email') else 'Anonymous'
-        
-        # Get IP and user agent from request
-        ip_address = None
-        user_agent = ""
-        if request:
-            ip_address = get_client_ip(request)
-            user_agent = request.META.get('HTTP_USER_AGENT', '')[:500]  # Limit length
-        
-        audit_log = AuditLog.objects.create(
+        audit_log = build_audit_log(
+            action,
+            user,
             batch=batch,
             lab_test=lab_test,
             certificate=certificate,
-            user=user,
-            user_email=user_email,
-            action=action,
             action_description=action_description,
             old_values=old_values,
             new_values=new_values,
             blockchain_tx_hash=blockchain_tx_hash,
-            ip_address=ip_address,
-            user_agent=user_agent
+            request=request,
         )
+        # Saved now, or buffered/queued, depending on AUDIT_LOG_MODE (see batches.audit)
+        get_audit_sink().write(audit_log)
         
-        logger.info(f"Audit log created: {audit_log}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Audit log created: {audit_log}")
         return audit_log
     except Exception as e:
         logger.error(f"Failed to create audit log: {str(e)}")
@@ -70,6 +67,44 @@ def log_audit_action(
         return None
 
 
+def build_audit_log(
+    action,
+    user,
+    batch=None,
+    lab_test=None,
+    certificate=None,
+    action_description="",
+    old_values=None,
+    new_values=None,
+    blockchain_tx_hash=None,
+    request=None
+):
+    """Unsaved audit log entry (see log_audit_action for the arguments); for callers that write entries in bulk."""
+    user_email = user.email if user and hasattr(user, 'email') else 'Anonymous'
+    
+    # Get IP and user agent from request
+    ip_address = None
+    user_agent = ""
+    if request:
+        ip_address = get_client_ip(request)
+        user_agent = request.META.get('HTTP_USER_AGENT', '')[:500]  # Limit length
+    
+    return AuditLog(
+        batch=batch,
+        lab_test=lab_test,
+        certificate=certificate,
+        user=user,
+        user_email=user_email,
+        action=action,
+        action_description=action_description,
+        old_values=old_values,
+        new_values=new_values,
+        blockchain_tx_hash=blockchain_tx_hash,
+        ip_address=ip_address,
+        user_agent=user_agent
+    )
+
+
 def get_client_ip(request):
     """Get client IP address from request."""
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -93,8 +128,8 @@ def can_user_access_batch(user, batch):
     if user.is_staff or user.is_superuser:
         return True
     
-    # Users can access their own batches
-    if batch.created_by == user or batch.owner == user:
+    # Users can access their own batches (compared by id, so the users are not loaded)
+    if user.pk in (batch.created_by_id, batch.owner_id):
         return True
     
     return False
@@ -112,7 +147,18 @@ def get_user_batches(user):
     if user.is_staff or user.is_superuser:
         return Batch.objects.all()
     
-    return Batch.objects.filter(
-        models.Q(created_by=user) | models.Q(owner=user)
-    )
+    # Creator or owner, through the BatchAccess table (one indexed join)
+    return accessible_batches(user)
+
+
+def filter_recorded(queryset, recorded):
+    """
+    Filter records by whether they are on-chain, from a ?recorded= query value.
+    "false" uses the partial blockchain_tx_hash IS NULL indexes.
+    """
+    if recorded is None:
+        return queryset
+    if recorded.lower() in ('false', '0', 'no'):
+        return queryset.filter(blockchain_tx_hash__isnull=True)
+    return queryset.filter(blockchain_tx_hash__isnull=False)
 
@@ -0,0 +1,87 @@
+"""
+Comparing batches in the database with their on-chain records, many at once.
+
+verify_batches() backs POST /api/batches/verify-bulk/ and the admin's
+background re-verify action (batches.admin_tasks). Chain data comes from
+anchored Merkle proofs, the event mirror, and batched getBatch calls for the
+rest, so a call needs a few RPC round trips instead of one per batch.
+"""
+from .anchoring import verify_anchored_records
+from .chain_index import find_batches_on_chain
+from .chain_queue import batch_chain_description
+from .models import Batch, ChainWriteJob
+
+
+def bulk_verification_result(batch_id, db_batch, chain_data, anchor_result, expected_description):
+    """One entry of the verify-bulk response: how a batch in the database compares with the chain."""
+    result = {
+        'batch_id': batch_id,
+        'in_database': db_batch is not None,
+        'blockchain_tx_hash': db_batch.blockchain_tx_hash if db_batch else None,
+    }
+
+    if anchor_result:
+        anchor_result['data']['createdBy'] = anchor_result['anchored_by']
+        result.update({
+            'status': {True: 'verified', False: 'mismatch', None: 'unverified'}[anchor_result['valid']],
+            'on_chain': anchor_result['root_on_chain'],
+            'source': 'anchor',
+            'chain': anchor_result['data'],
+            'mismatches': [] if anchor_result['proof_valid'] else ['merkle_proof'],
+        })
+        return result
+
+    if chain_data is False:
+        result.update({'status': 'error', 'on_chain': None, 'message': 'Could not read batch from blockchain'})
+        return result
+    if chain_data is None:
+        result.update({'status': 'not_on_chain' if db_batch else 'not_found', 'on_chain': False})
+        return result
+
+    result.update({'on_chain': True, 'source': chain_data.pop('source', 'node'), 'chain': chain_data})
+    if db_batch is None:
+        result['status'] = 'not_in_database'
+        return result
+
+    mismatches = []
+    if chain_data['description'] != expected_description:
+        mismatches.append('description')
+    result['mismatches'] = mismatches
+    result['status'] = 'mismatch' if mismatches else 'verified'
+    return result
+
+
+def verify_batches(batch_ids):
+    """
+    bulk_verification_result() for each batch ID, in order. Raises if the
+    chain cannot be read at all.
+    """
+    db_batches = {batch.batch_id: batch for batch in Batch.objects.filter(batch_id__in=batch_ids)}
+    anchored = verify_anchored_records('batch', db_batches.values())
+
+    # Description each batch was written with (record-on-chain may have used a custom one)
+    expected_descriptions = {
+        batch.batch_id: batch_chain_description(batch) for batch in db_batches.values()
+    }
+    for job in ChainWriteJob.objects.filter(
+        kind='batch', status='confirmed', batch__batch_id__in=list(db_batches)
+    ).order_by('updated_at').values('payload'):
+        expected_descriptions[job['payload']['batch_id']] = job['payload']['description']
+
+    to_read = [
+        batch_id for batch_id in batch_ids
+        if batch_id not in db_batches or db_batches[batch_id].pk not in anchored
+    ]
+    chain_data = find_batches_on_chain(to_read) if to_read else {}
+
+    results = []
+    for batch_id in batch_ids:
+        db_batch = db_batches.get(batch_id)
+        results.append(bulk_verification_result(
+            batch_id,
+            db_batch,
+            chain_data.get(batch_id, False),  # missing key: the read failed
+            anchored.get(db_batch.pk) if db_batch else None,
+            expected_descriptions.get(batch_id),
+        ))
+    return results
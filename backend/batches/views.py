@@ -1,32 +1,101 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.http import Http404
-from .models import Batch, LabTest, Certificate
-from django.db import models
-from .serializers import BatchSerializer, LabTestSerializer, CertificateSerializer
-from asalitrace.blockchain.eth_adapter import (
-    add_batch_to_chain, 
-    get_batch_from_chain, 
-    add_lab_test_to_chain,
-    get_lab_test_from_chain,
-    issue_certificate_on_chain,
-    get_certificate_from_chain,
-    test_connection
-)
+from rest_framework.renderers import JSONRenderer
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils.dateparse import parse_date
+from django.utils.http import parse_etags
+from django.conf import settings
+from collections import Counter
+from .models import Batch, LabTest, Certificate, BatchTimeline, AuditLog
+from django.db import models, transaction
+from .serializers import BatchSerializer, LabTestSerializer, CertificateSerializer, batch_read_serializer
+from asalitrace.blockchain.eth_adapter import test_connection
 import logging
 import os
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
-from rest_framework.exceptions import PermissionDenied
-from .utils import log_audit_action, can_user_access_batch, get_user_batches
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from .utils import log_audit_action, can_user_access_batch, get_user_batches, filter_recorded
+from .access import accessible_batch_ids
+from .chain_queue import (
+    enqueue_batch,
+    enqueue_lab_test,
+    enqueue_certificate,
+    get_open_job,
+)
+from .anchoring import verify_anchored_record
+from .chain_index import (
+    find_batch_on_chain,
+    find_lab_test_on_chain,
+    find_certificate_on_chain,
+)
+from .lookup import resolve_batch
+from .export import (
+    BATCH_EXPORT_FIELDS,
+    LAB_TEST_EXPORT_FIELDS,
+    CERTIFICATE_EXPORT_FIELDS,
+    AUDIT_LOG_EXPORT_FIELDS,
+    CSVRenderer,
+    NDJSONRenderer,
+    export_format,
+    parse_moment,
+    stream_export,
+)
+from .bulk_import import detect_format, import_batches, read_list, read_rows
+from .timeline import journey_batches, build_journey, rebuild_batch_timeline
+from .pagination import CreatedAtCursorPagination, RankedPagePagination
+from .statistics import get_statistics
+from .rollups import GRANULARITIES, GROUP_BY_FIELDS, query_rollups
+from .search import query_words, search_batches
+from .verification import verify_batches
+from .public_verification import NOT_FOUND_CACHE_SECONDS, cache_control, get_public_record
 
 logger = logging.getLogger(__name__)
 
+# JSON for errors; the CSV and NDJSON renderers let ?format=csv|ndjson through negotiation
+EXPORT_RENDERERS = [JSONRenderer, CSVRenderer, NDJSONRenderer]
+
+
+def anchored_verification_response(result, label):
+    """Verify-endpoint response for a record checked against its Merkle anchor."""
+    anchor = {key: value for key, value in result.items() if key != 'data'}
+    if result['valid']:
+        return Response({
+            'found': True,
+            'data': result['data'],
+            'message': f'{label} verified against anchored Merkle root',
+            'tx_hash': result['tx_hash'],
+            'tx_status': 1,
+            'anchor': anchor,
+        }, status=status.HTTP_200_OK)
+
+    if result['valid'] is None:
+        return Response({
+            'found': None,
+            'data': result['data'],
+            'message': f'{label} matches its Merkle proof, but the anchored root could not be checked on the blockchain. The record is unverified.',
+            'tx_hash': result['tx_hash'],
+            'anchor': anchor,
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    if not result['proof_valid']:
+        message = f'{label} data does not match its anchored Merkle proof. The record may have been changed after it was anchored.'
+    else:
+        message = f'Merkle root {result["root"][:20]}... was not anchored on the blockchain by PUBLIC_ADDRESS.'
+    return Response({
+        'found': False,
+        'message': message,
+        'tx_hash': result['tx_hash'],
+        'anchor': anchor,
+    }, status=status.HTTP_409_CONFLICT)
+
+
 
 class BatchViewSet(viewsets.ModelViewSet):
     queryset = Batch.objects.all()
     serializer_class = BatchSerializer
     permission_classes = [IsAuthenticated]  # Require authentication
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
         """Filter batches based on user permissions."""
@@ -35,36 +104,28 @@ class BatchViewSet(viewsets.ModelViewSet):
         if not user.is_authenticated:
             return Batch.objects.none()
         
-        # Admins see all batches
-        if user.is_staff or user.is_superuser:
-            return Batch.objects.all()
+        # Admins see all batches, regular users only their batches
+        queryset = get_user_batches(user)
+        queryset = filter_recorded(queryset, self.request.query_params.get('recorded'))
         
-        # Regular users see only their batches
-        return Batch.objects.filter(
-            models.Q(created_by=user) | models.Q(owner=user)
-        )
+        # The serializer shows both users' emails
+        return queryset.select_related('created_by', 'owner')
 
     def get_object(self):
-        """Override to check access permissions and support batch_id lookup."""
-        # Get the lookup value from URL
-        lookup_value = self.kwargs.get(self.lookup_field)
+        """
+        The batch named by pk or batch_id, checked for access.
+
+        Resolved in one query (see batches.lookup) and cached on the request,
+        so record-on-chain and the journey share it.
+        """
+        lookup_value = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
         user = self.request.user
         
-        # First, try to find the batch (check if it exists at all)
-        # Use unfiltered queryset to check existence, then filter for permissions
-        try:
-            # Try primary key lookup first (default DRF behavior)
-            try:
-                # Use the base queryset without filtering to check existence
-                obj = Batch.objects.get(pk=lookup_value)
-            except (Batch.DoesNotExist, ValueError):
-                # If pk lookup fails, try batch_id lookup
-                try:
-                    obj = Batch.objects.get(batch_id=lookup_value)
-                except Batch.DoesNotExist:
-                    raise Http404("Batch not found")
-        except Http404:
-            raise
+        # Look in every batch, not just the user's, so a batch the user cannot
+        # access gets a 403 rather than a 404
+        obj = resolve_batch(lookup_value, request=self.request)
+        if obj is None:
+            raise Http404("Batch not found")
         
         # Now check if user has permission to access this batch
         if not can_user_access_batch(user, obj):
@@ -80,8 +141,11 @@ class BatchViewSet(viewsets.ModelViewSet):
         # Set ownership - pass user fields directly to save()
         user = request.user if request.user.is_authenticated else None
 
-        # Save to local database first with ownership
-        batch = serializer.save(created_by=user, owner=user)
+        # Save the batch and queue its chain write in one transaction, so a
+        # committed batch always has an outbox entry for the chain worker
+        with transaction.atomic():
+            batch = serializer.save(created_by=user, owner=user)
+            job = enqueue_batch(batch, user=user)
         
         # Log audit trail
         log_audit_action(
@@ -99,74 +163,49 @@ class BatchViewSet(viewsets.ModelViewSet):
             request=request
         )
 
-        # Create description from batch data for blockchain
-        # Smart contract only stores batchId and description, so we combine fields
-        description = f"{batch.honey_type} - {batch.producer_name} - Qty: {batch.quantity}kg"
-
-        # Write to blockchain with transaction verification
-        try:
-            tx_hash = add_batch_to_chain(
-                batch_id=batch.batch_id,
-                description=description
-            )
-            logger.info(f"Batch {batch.batch_id} recorded on-chain: {tx_hash}")
+        # The chain worker records the batch on the blockchain and back-fills blockchain_tx_hash
+        data = serializer.data
+        data["blockchain_tx_hash"] = None
+        data["blockchain_status"] = job.status
+        data["blockchain_job_id"] = job.id
 
-            # Verify the batch was actually created on blockchain
-            try:
-                from asalitrace.blockchain.eth_adapter import get_batch_from_chain
-                verify_batch = get_batch_from_chain(batch.batch_id)
-                if not verify_batch:
-                    logger.warning(f"Batch {batch.batch_id} has TX hash {tx_hash} but was not found on blockchain. Transaction may have failed.")
-                    # Still save the hash, but add a warning
-                    batch.blockchain_tx_hash = tx_hash
-                    batch.save()
-                    data = serializer.data
-                    data["blockchain_tx_hash"] = tx_hash
-                    data["blockchain_warning"] = f"Transaction sent ({tx_hash[:20]}...) but batch not found on blockchain. The transaction may have failed. Please check the transaction status."
-                    return Response(data, status=status.HTTP_201_CREATED)
-            except Exception as verify_err:
-                logger.warning(f"Could not verify batch creation: {str(verify_err)}")
-                # Continue anyway - the transaction was sent
-
-            # Update batch with blockchain transaction hash
-            batch.blockchain_tx_hash = tx_hash
-            batch.save()
-
-            # Include blockchain reference in response
-            data = serializer.data
-            data["blockchain_tx_hash"] = tx_hash
-
-            headers = self.get_success_headers(serializer.data)
-            return Response(data, status=status.HTTP_201_CREATED, headers=headers)
+        headers = self.get_success_headers(serializer.data)
+        return Response(data, status=status.HTTP_201_CREATED, headers=headers)
 
-        except Exception as e:
-            logger.error(f"Blockchain error: {str(e)}")
-            # Batch is already saved to database, but blockchain write failed
-            # Return success with warning about blockchain
-            data = serializer.data
-            data["blockchain_tx_hash"] = None
-            data["blockchain_warning"] = f"Batch saved to database but blockchain write failed: {str(e)}"
-            
-            return Response(
-                data,
-                status=status.HTTP_201_CREATED
-            )
+    def list(self, request, *args, **kwargs):
+        """Batches the user can see, newest first, read as values() rows (see BatchReadSerializer)."""
+        queryset = self.filter_queryset(self.get_queryset()).values(*batch_read_serializer.lookups())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(batch_read_serializer.many(page))
+        return Response(batch_read_serializer.many(queryset))
 
     def retrieve(self, request, *args, **kwargs):
         """Retrieve batch and optionally verify on blockchain."""
         instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        data = serializer.data
+        data = batch_read_serializer.instance_representation(instance)
+        
+        # Report queued chain writes that have not been back-filled yet
+        if not instance.blockchain_tx_hash:
+            latest_job = instance.chain_jobs.filter(kind='batch').order_by('-created_at').first()
+            data["blockchain_status"] = latest_job.status if latest_job else None
         
         # Optionally verify on blockchain if tx_hash exists
         if instance.blockchain_tx_hash:
             try:
-                blockchain_data = get_batch_from_chain(instance.batch_id)
-                if blockchain_data:
-                    data["blockchain_verified"] = True
-                    data["blockchain_data"] = blockchain_data
+                # Anchored batches have no getBatch entry; check them against their Merkle proof
+                anchor_result = verify_anchored_record('batch', instance)
+                if anchor_result:
+                    anchor_result['data']['createdBy'] = anchor_result['anchored_by']
+                    data["blockchain_verified"] = anchor_result['valid']
+                    data["blockchain_data"] = anchor_result['data']
                 else:
-                    data["blockchain_verified"] = False
+                    blockchain_data = find_batch_on_chain(instance.batch_id)
+                    if blockchain_data:
+                        data["blockchain_verified"] = True
+                        data["blockchain_data"] = blockchain_data
+                    else:
+                        data["blockchain_verified"] = False
             except Exception as e:
                 logger.warning(f"Could not verify batch on blockchain: {str(e)}")
                 data["blockchain_verified"] = None
@@ -185,96 +224,24 @@ class BatchViewSet(viewsets.ModelViewSet):
                 'blockchain_tx_hash': batch.blockchain_tx_hash
             }, status=status.HTTP_200_OK)
         
-        # Test connection first to provide better error messages
-        connection_test = test_connection()
-        if not connection_test.get('connected'):
+        # Check if a queued write is still waiting for the chain worker
+        open_job = get_open_job(batch=batch, kind='batch')
+        if open_job:
             return Response({
-                'error': 'Cannot connect to blockchain node',
-                'message': connection_test.get('error', 'Unknown connection error'),
-                'rpc_url': connection_test.get('rpc_url'),
-                'details': {
-                    'has_private_key': bool(os.getenv("PRIVATE_KEY")),
-                    'has_public_address': bool(os.getenv("PUBLIC_ADDRESS")),
-                    'has_contract_address': bool(os.getenv("CONTRACT_ADDRESS")),
-                }
-            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-        
-        # Get description from request or generate from batch data
-        description = request.data.get('description')
-        if not description:
-            description = f"{batch.honey_type} - {batch.producer_name} - Qty: {batch.quantity}kg"
+                'message': 'Batch is queued for recording on blockchain',
+                'blockchain_status': open_job.status,
+                'blockchain_job_id': open_job.id,
+            }, status=status.HTTP_202_ACCEPTED)
         
-        try:
-            # Record on blockchain
-            tx_hash = add_batch_to_chain(
-                batch_id=batch.batch_id,
-                description=description
-            )
-            logger.info(f"Batch {batch.batch_id} recorded on-chain: {tx_hash}")
-            
-            # Update batch with blockchain transaction hash
-            old_tx_hash = batch.blockchain_tx_hash
-            batch.blockchain_tx_hash = tx_hash
-            batch.save()
-            
-            # Log audit trail
-            log_audit_action(
-                action='record_blockchain',
-                user=request.user if request.user.is_authenticated else None,
-                batch=batch,
-                action_description=f"Recorded batch {batch.batch_id} on blockchain",
-                blockchain_tx_hash=tx_hash,
-                old_values={'blockchain_tx_hash': old_tx_hash} if old_tx_hash else None,
-                new_values={'blockchain_tx_hash': tx_hash},
-                request=request
-            )
-            
-            serializer = self.get_serializer(batch)
-            return Response({
-                'message': 'Batch recorded on blockchain successfully',
-                'blockchain_tx_hash': tx_hash,
-                'batch': serializer.data
-            }, status=status.HTTP_200_OK)
-            
-        except Exception as e:
-            error_msg = str(e)
-            logger.error(f"Blockchain error recording batch {batch.batch_id}: {error_msg}")
-            logger.error(f"Full exception details: {type(e).__name__}: {error_msg}")
-            
-            # Check environment variables
-            has_private_key = bool(os.getenv("PRIVATE_KEY"))
-            has_public_address = bool(os.getenv("PUBLIC_ADDRESS"))
-            has_contract_address = bool(os.getenv("CONTRACT_ADDRESS"))
-            rpc_url = os.getenv("BLOCKCHAIN_RPC_URL", "http://127.0.0.1:8545")
-            
-            # Provide more specific error messages based on error type
-            if "PRIVATE_KEY" in error_msg or not has_private_key:
-                help_msg = "PRIVATE_KEY environment variable is missing. Please set it in your backend .env file."
-            elif "PUBLIC_ADDRESS" in error_msg or not has_public_address:
-                help_msg = "PUBLIC_ADDRESS environment variable is missing. Please set it in your backend .env file."
-            elif "CONTRACT_ADDRESS" in error_msg or not has_contract_address:
-                help_msg = "CONTRACT_ADDRESS environment variable is missing. Please deploy the contract and set the address in your backend .env file."
-            elif "Cannot connect" in error_msg or "Cannot communicate" in error_msg or "Connection refused" in error_msg:
-                help_msg = f"Cannot connect to Hardhat node at {rpc_url}. Please verify: 1) Hardhat node is running (npx hardhat node), 2) RPC URL is correct, 3) No firewall blocking connection."
-            elif "ABI not found" in error_msg or "Contract ABI" in error_msg:
-                help_msg = "Contract ABI file not found. Please ensure the contract is compiled and the ABI file exists."
-            elif "Transaction failed" in error_msg:
-                help_msg = "Blockchain transaction failed. Check Hardhat node logs for details."
-            else:
-                help_msg = f"Blockchain error: {error_msg}. Please verify: 1) Hardhat node is running (npx hardhat node), 2) All environment variables are set, 3) Contract is deployed."
-            
-            return Response({
-                'error': error_msg,
-                'message': help_msg,
-                'details': {
-                    'rpc_url': rpc_url,
-                    'has_private_key': has_private_key,
-                    'has_public_address': has_public_address,
-                    'has_contract_address': has_contract_address,
-                    'contract_address': os.getenv("CONTRACT_ADDRESS") if has_contract_address else None,
-                    'error_type': type(e).__name__,
-                }
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        # Queue the write like create() does; the chain worker records it and
+        # back-fills blockchain_tx_hash, so the request never waits for a block
+        user = request.user if request.user.is_authenticated else None
+        job = enqueue_batch(batch, user=user, description=request.data.get('description'))
+        return Response({
+            'message': 'Batch queued for recording on blockchain',
+            'blockchain_status': job.status,
+            'blockchain_job_id': job.id,
+        }, status=status.HTTP_202_ACCEPTED)
 
     @action(detail=False, methods=['get'], url_path='test-blockchain-connection')
     def test_blockchain_connection(self, request):
@@ -312,20 +279,32 @@ class BatchViewSet(viewsets.ModelViewSet):
             tx_status = None
             try:
                 db_batch = Batch.objects.filter(batch_id=batch_id).first()
-                if db_batch and db_batch.blockchain_tx_hash:
-                    tx_hash = db_batch.blockchain_tx_hash
-                    # Check transaction receipt status
-                    try:
-                        from asalitrace.blockchain.eth_adapter import get_web3
-                        web3 = get_web3()
-                        receipt = web3.eth.get_transaction_receipt(tx_hash)
-                        tx_status = receipt.status  # 1 = success, 0 = failed
-                    except Exception as tx_err:
-                        logger.debug(f"Could not check transaction receipt: {str(tx_err)}")
             except Exception as db_err:
                 logger.debug(f"Could not check database: {str(db_err)}")
-            
-            blockchain_data = get_batch_from_chain(batch_id)
+
+            # Anchored batches are checked against their Merkle proof, with no contract read
+            anchor_result = verify_anchored_record('batch', db_batch) if db_batch else None
+            if anchor_result:
+                anchor_result['data']['createdBy'] = anchor_result['anchored_by']
+                return anchored_verification_response(anchor_result, 'Batch')
+
+            blockchain_data = find_batch_on_chain(batch_id)
+
+            if db_batch and db_batch.blockchain_tx_hash:
+                tx_hash = db_batch.blockchain_tx_hash
+
+            if blockchain_data and blockchain_data['source'] == 'index':
+                # Mirrored events only come from successful transactions
+                tx_status = 1
+            elif tx_hash:
+                # Check transaction receipt status
+                try:
+                    from asalitrace.blockchain.eth_adapter import get_web3
+                    web3 = get_web3()
+                    receipt = web3.eth.get_transaction_receipt(tx_hash)
+                    tx_status = receipt.status  # 1 = success, 0 = failed
+                except Exception as tx_err:
+                    logger.debug(f"Could not check transaction receipt: {str(tx_err)}")
             
             if blockchain_data:
                 return Response({
@@ -365,14 +344,109 @@ class BatchViewSet(viewsets.ModelViewSet):
                 'message': 'Failed to read batch from blockchain'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['post'], url_path='verify-bulk')
+    def verify_bulk(self, request):
+        """
+        Compare many batches in the database with their on-chain records.
+
+        Body: {"batch_ids": [...]}, up to VERIFY_BULK_MAX_IDS IDs. Chain data
+        comes from anchored Merkle proofs, the event mirror, and batched
+        getBatch calls for the rest, so the request needs a few RPC round trips
+        instead of one per batch.
+        """
+        batch_ids = request.data.get('batch_ids')
+        if not isinstance(batch_ids, list) or not batch_ids or not all(isinstance(b, str) and b for b in batch_ids):
+            return Response({
+                'error': 'batch_ids must be a non-empty list of batch IDs'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        batch_ids = list(dict.fromkeys(batch_ids))
+        if len(batch_ids) > settings.VERIFY_BULK_MAX_IDS:
+            return Response({
+                'error': f'At most {settings.VERIFY_BULK_MAX_IDS} batch IDs can be verified per request'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            results = verify_batches(batch_ids)
+        except Exception as e:
+            logger.error(f"Error reading batches from blockchain: {str(e)}")
+            return Response({
+                'error': str(e),
+                'message': 'Failed to read batches from blockchain'
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        return Response({
+            'count': len(results),
+            'summary': dict(Counter(result['status'] for result in results)),
+            'results': results,
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='export', renderer_classes=EXPORT_RENDERERS)
+    def export(self, request):
+        """
+        Stream every batch the user can see as CSV (?format=csv, the default) or NDJSON (?format=ndjson).
+
+        Honours the same filters as the list (?recorded=).
+        """
+        return stream_export(self.get_queryset(), BATCH_EXPORT_FIELDS, export_format(request), 'batches')
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Import many batches in one request (see batches.bulk_import).
+
+        Accepts a CSV or NDJSON upload in the `file` field, a raw text/csv or
+        application/x-ndjson body, or a JSON list of batches (or
+        {"batches": [...]}). Up to BULK_IMPORT_MAX_ROWS rows are read; every
+        valid row is created and queued for the chain, and each invalid row is
+        reported with its errors.
+        """
+        user = request.user if request.user.is_authenticated else None
+        content_type = request.content_type or ''
+        max_rows = settings.BULK_IMPORT_MAX_ROWS
+
+        if content_type.startswith(('text/csv', 'application/x-ndjson', 'application/ndjson')):
+            # Raw body: read straight from the request stream
+            rows = read_rows(request.stream, detect_format(content_type=content_type))
+        elif 'file' in request.FILES:
+            upload = request.FILES['file']
+            rows = read_rows(upload.file, detect_format(upload.name, upload.content_type))
+        else:
+            data = request.data
+            if isinstance(data, dict):
+                data = data.get('batches')
+            if not isinstance(data, list) or not data:
+                return Response({
+                    'error': 'Send a CSV or NDJSON file as "file", or a JSON list of batches'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            rows = read_list(data)
+
+        report = import_batches(rows, user=user, request=request, max_rows=max_rows)
+        return Response(
+            report.as_dict(),
+            status=status.HTTP_201_CREATED if report.created else status.HTTP_400_BAD_REQUEST,
+        )
+
     @action(detail=False, methods=['get'], url_path='journey/(?P<batch_id>[^/.]+)')
     def journey(self, request, batch_id=None):
-        """Get complete journey/audit trail for a batch by batch_id."""
+        """
+        Get complete journey/audit trail for a batch by batch_id.
+
+        Runs a fixed number of queries however long the history is (see
+        batches.timeline); with BATCH_TIMELINE_ENABLED it reads the batch's
+        pre-rendered BatchTimeline row instead.
+        """
+        use_timeline = settings.BATCH_TIMELINE_ENABLED
         try:
             # Find batch by batch_id instead of pk
-            try:
-                batch = Batch.objects.get(batch_id=batch_id)
-            except Batch.DoesNotExist:
+            if use_timeline:
+                batch = resolve_batch(
+                    batch_id, queryset=Batch.objects.select_related('timeline'),
+                    request=request, by_pk=False, cache_key='journey_timeline',
+                )
+            else:
+                batch = resolve_batch(batch_id, queryset=journey_batches(), request=request, by_pk=False, cache_key='journey')
+            if batch is None:
                 return Response({
                     'error': 'Batch not found',
                     'message': f'Batch with ID {batch_id} does not exist.'
@@ -407,88 +481,17 @@ class BatchViewSet(viewsets.ModelViewSet):
             # Re-raise other exceptions
             raise
         
-        # Get audit logs for this batch
-        from .models import AuditLog
-        audit_logs = AuditLog.objects.filter(batch=batch).order_by('timestamp')
-        
-        # Build journey steps from audit logs and batch data
-        journey_steps = []
-        
-        # Step 1: Batch Created
-        if batch.created_at:
-            journey_steps.append({
-                'id': 1,
-                'title': 'Batch Created',
-                'location': batch.producer_name or 'Unknown Producer',
-                'date': batch.created_at.strftime('%b %d, %Y'),
-                'verified': False,
-                'action': 'create',
-                'user': batch.created_by.email if batch.created_by else 'System',
-                'timestamp': batch.created_at.isoformat(),
-            })
-        
-        # Step 2: Lab Tests
-        lab_tests = batch.lab_tests.all().order_by('test_date', 'created_at')
-        for idx, test in enumerate(lab_tests, start=2):
-            journey_steps.append({
-                'id': len(journey_steps) + 1,
-                'title': f'Lab Test: {test.test_type}',
-                'location': test.tested_by or 'Unknown Lab',
-                'date': test.test_date.strftime('%b %d, %Y') if test.test_date else test.created_at.strftime('%b %d, %Y'),
-                'verified': bool(test.blockchain_tx_hash),
-                'action': 'lab_test',
-                'user': test.created_by.email if test.created_by else 'System',
-                'blockchain_tx_hash': test.blockchain_tx_hash,
-                'timestamp': (test.test_date or test.created_at).isoformat() if test.test_date or test.created_at else None,
-            })
-        
-        # Step 3: Certificate
-        try:
-            cert = batch.certificate
-            journey_steps.append({
-                'id': len(journey_steps) + 1,
-                'title': 'Certificate Issued',
-                'location': cert.issued_by or 'Unknown Authority',
-                'date': cert.issue_date.strftime('%b %d, %Y') if cert.issue_date else cert.created_at.strftime('%b %d, %Y'),
-                'verified': bool(cert.blockchain_tx_hash),
-                'action': 'certificate',
-                'user': cert.created_by.email if cert.created_by else 'System',
-                'blockchain_tx_hash': cert.blockchain_tx_hash,
-                'timestamp': (cert.issue_date or cert.created_at).isoformat() if cert.issue_date or cert.created_at else None,
-            })
-        except Certificate.DoesNotExist:
-            pass
-        
-        # Step 4: Blockchain Recording
-        if batch.blockchain_tx_hash:
-            blockchain_log = audit_logs.filter(action='record_blockchain').first()
-            journey_steps.append({
-                'id': len(journey_steps) + 1,
-                'title': 'Recorded on Blockchain',
-                'location': 'Ethereum Blockchain',
-                'date': blockchain_log.timestamp.strftime('%b %d, %Y') if blockchain_log else batch.updated_at.strftime('%b %d, %Y'),
-                'verified': True,
-                'action': 'record_blockchain',
-                'user': blockchain_log.user_email if blockchain_log else 'System',
-                'blockchain_tx_hash': batch.blockchain_tx_hash,
-                'timestamp': (blockchain_log.timestamp if blockchain_log else batch.updated_at).isoformat(),
-            })
-        
-        # Get full audit trail
-        audit_trail = []
-        for log in audit_logs:
-            audit_trail.append({
-                'id': log.id,
-                'action': log.action,
-                'action_description': log.action_description,
-                'user': log.user_email,
-                'user_id': log.user.id if log.user else None,
-                'timestamp': log.timestamp.isoformat(),
-                'blockchain_tx_hash': log.blockchain_tx_hash,
-                'old_values': log.old_values,
-                'new_values': log.new_values,
-                'ip_address': str(log.ip_address) if log.ip_address else None,
-            })
+        if use_timeline:
+            try:
+                timeline = batch.timeline
+            except BatchTimeline.DoesNotExist:
+                timeline = rebuild_batch_timeline(batch.pk)
+            journey_steps = timeline.steps
+            audit_trail = timeline.audit_trail
+        else:
+            journey = build_journey(batch)
+            journey_steps = journey['journey_steps']
+            audit_trail = journey['audit_trail']
         
         return Response({
             'batch_id': batch.batch_id,
@@ -498,64 +501,194 @@ class BatchViewSet(viewsets.ModelViewSet):
             'verified_steps': sum(1 for step in journey_steps if step.get('verified', False)),
         }, status=status.HTTP_200_OK)
 
+    @action(
+        detail=False, methods=['get'], url_path='public/(?P<batch_id>[^/.]+)',
+        permission_classes=[AllowAny], authentication_classes=[], renderer_classes=[JSONRenderer],
+    )
+    def public_verification(self, request, batch_id=None):
+        """
+        Public verification record of a batch, for consumers scanning a jar label.
+
+        Served as pre-rendered JSON from the cache (batches.public_verification),
+        never from a live chain call. No authentication and a single renderer,
+        so the response does not vary by Authorization or Accept and shared
+        caches can hold it under its URL.
+        """
+        try:
+            content, etag = get_public_record(batch_id)
+        except Exception as e:
+            logger.error(f"Error loading public verification record: {str(e)}")
+            return Response({
+                'error': str(e),
+                'message': 'Failed to load verification record'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        if content is None:
+            response = Response({
+                'found': False,
+                'message': f'Batch with ID {batch_id} does not exist.'
+            }, status=status.HTTP_404_NOT_FOUND)
+            response['Cache-Control'] = f"public, max-age={NOT_FOUND_CACHE_SECONDS}"
+            return response
+
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type='application/json')
+        response['ETag'] = etag
+        response['Cache-Control'] = cache_control()
+        return response
+
+    @action(detail=False, methods=['get'], url_path='search')
+    def search(self, request):
+        """
+        Batches matching ?q= (batch ID, producer, honey type, creator or owner
+        email), best match first, in ?page= pages (batches.search).
+
+        Each word must match, and its last part is a prefix, so partial batch
+        IDs find the batch. Users see only the batches they can access.
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query_words(query):
+            raise ValidationError({'q': ['Enter at least one letter or digit to search for.']})
+
+        user = request.user
+        restrict_to = None if (user.is_staff or user.is_superuser) else user
+        paginator = RankedPagePagination()
+        batch_pks = paginator.paginate_ranked(
+            lambda limit, offset: search_batches(query, user=restrict_to, limit=limit, offset=offset),
+            request,
+        )
+        rows = {
+            row['id']: row
+            for row in Batch.objects.filter(pk__in=batch_pks).values(*batch_read_serializer.lookups())
+        }
+        # Batches deleted since the search ran are skipped
+        results = batch_read_serializer.many(rows[pk] for pk in batch_pks if pk in rows)
+        return paginator.get_paginated_response(results)
+
+    @action(detail=False, methods=['get'], url_path='rollups')
+    def rollups(self, request):
+        """
+        Batch volumes over time from the pre-aggregated rollups (batches.rollups).
+
+        ?since= and ?until= bound the production dates, ?granularity= is day
+        (default), week, month or year, ?group_by= is producer, honey_type or
+        both (comma-separated), and ?producer= / ?honey_type= filter. Staff see
+        every producer; other users only the batches they have access to.
+        """
+        params = request.query_params
+        errors = {}
+        days = {}
+        for name in ('since', 'until'):
+            if params.get(name):
+                try:
+                    days[name] = parse_date(params[name])
+                except ValueError:
+                    days[name] = None
+                if days[name] is None:
+                    errors[name] = ['Must be a date (YYYY-MM-DD).']
+        granularity = params.get('granularity', 'day')
+        if granularity not in GRANULARITIES:
+            errors['granularity'] = [f"Must be one of: {', '.join(GRANULARITIES)}."]
+        group_by = [name for name in params.get('group_by', '').split(',') if name]
+        if any(name not in GROUP_BY_FIELDS for name in group_by):
+            errors['group_by'] = [f"Must be a comma-separated list of: {', '.join(GROUP_BY_FIELDS)}."]
+        if errors:
+            raise ValidationError(errors)
+
+        results = query_rollups(
+            granularity=granularity,
+            group_by=group_by,
+            producer=params.get('producer'),
+            honey_type=params.get('honey_type'),
+            batches=None if (request.user.is_staff or request.user.is_superuser) else get_user_batches(request.user),
+            **days,
+        )
+        return Response({
+            'granularity': granularity,
+            'since': params.get('since'),
+            'until': params.get('until'),
+            'group_by': group_by,
+            'results': results,
+        }, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['get'], url_path='statistics', permission_classes=[AllowAny])
     def statistics(self, request):
-        """Get statistics about batches, verification, and producers."""
+        """
+        Get statistics about batches, verification, and producers.
+
+        Served from running counters (batches.statistics) through the cache,
+        with an ETag so clients can revalidate with If-None-Match.
+        """
         try:
-            # Total batches
-            total_batches = Batch.objects.count()
-            
-            # Verified batches (with blockchain_tx_hash)
-            verified_batches = Batch.objects.filter(blockchain_tx_hash__isnull=False).count()
-            
-            # Calculate verified percentage
-            verified_percentage = round((verified_batches / total_batches * 100) if total_batches > 0 else 0, 1)
-            
-            # Unique producers/beekeepers
-            unique_producers = Batch.objects.values('producer_name').distinct().count()
-            
-            # Total lab tests
-            total_lab_tests = LabTest.objects.count()
-            
-            # Verified lab tests
-            verified_lab_tests = LabTest.objects.filter(blockchain_tx_hash__isnull=False).count()
-            
-            # Total certificates
-            total_certificates = Certificate.objects.count()
-            
-            # Verified certificates
-            verified_certificates = Certificate.objects.filter(blockchain_tx_hash__isnull=False).count()
-            
-            return Response({
-                'total_batches': total_batches,
-                'verified_batches': verified_batches,
-                'verified_percentage': verified_percentage,
-                'unique_producers': unique_producers,
-                'total_lab_tests': total_lab_tests,
-                'verified_lab_tests': verified_lab_tests,
-                'total_certificates': total_certificates,
-                'verified_certificates': verified_certificates,
-            }, status=status.HTTP_200_OK)
+            payload, etag = get_statistics()
         except Exception as e:
             logger.error(f"Error calculating statistics: {str(e)}")
             return Response({
                 'error': str(e),
                 'message': 'Failed to calculate statistics'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(payload, status=status.HTTP_200_OK)
+        response['ETag'] = etag
+        response['Cache-Control'] = f"public, max-age={settings.STATISTICS_CACHE_SECONDS}"
+        return response
 
 
 class LabTestViewSet(viewsets.ModelViewSet):
     queryset = LabTest.objects.all()
     serializer_class = LabTestSerializer
     permission_classes = [AllowAny]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
         """Filter lab tests by batch if batch parameter is provided."""
-        queryset = LabTest.objects.all()
+        queryset = LabTest.objects.select_related('created_by')
         batch_id = self.request.query_params.get('batch', None)
         if batch_id is not None:
             queryset = queryset.filter(batch_id=batch_id)
-        return queryset
+        return filter_recorded(queryset, self.request.query_params.get('recorded'))
+
+    @action(detail=False, methods=['get'], url_path='export', renderer_classes=EXPORT_RENDERERS)
+    def export(self, request):
+        """
+        Stream every lab test the user can see as CSV (?format=csv, the default) or NDJSON (?format=ndjson).
+
+        Honours the same filters as the list (?batch=, ?recorded=).
+        """
+        return stream_export(self.get_queryset(), LAB_TEST_EXPORT_FIELDS, export_format(request), 'lab-tests')
+
+    @action(detail=False, methods=['get'], url_path='analytics')
+    def analytics(self, request):
+        """
+        Quality analytics over every lab measurement: per-honey-type percentiles,
+        z-score outliers and quality-limit flags (batches.analytics).
+
+        Cached for LAB_ANALYTICS_CACHE_SECONDS, with an ETag for If-None-Match.
+        """
+        # NumPy is only loaded by the processes that serve this
+        from .analytics import get_lab_analytics
+
+        try:
+            payload, etag = get_lab_analytics()
+        except Exception as e:
+            logger.error(f"Error calculating lab analytics: {str(e)}")
+            return Response({
+                'error': str(e),
+                'message': 'Failed to calculate lab analytics'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(payload, status=status.HTTP_200_OK)
+        response['ETag'] = etag
+        response['Cache-Control'] = f"public, max-age={settings.LAB_ANALYTICS_CACHE_SECONDS}"
+        return response
 
     def create(self, request, *args, **kwargs):
         """Create lab test and record on blockchain."""
@@ -565,8 +698,10 @@ class LabTestViewSet(viewsets.ModelViewSet):
         # Set ownership - pass user field directly to save()
         user = request.user if request.user.is_authenticated else None
 
-        # Save to local database first with ownership
-        lab_test = serializer.save(created_by=user)
+        # Save the lab test and queue its chain write in one transaction
+        with transaction.atomic():
+            lab_test = serializer.save(created_by=user)
+            job = enqueue_lab_test(lab_test, user=user)
         
         # Log audit trail
         log_audit_action(
@@ -584,46 +719,14 @@ class LabTestViewSet(viewsets.ModelViewSet):
             request=request
         )
 
-        # Create result string from lab test data for blockchain
-        # Smart contract stores: testId, batchId, result
-        # Combine all test data into result string since contract only stores result as string
-        result_string = f"Type: {lab_test.test_type} | Result: {lab_test.result} | Tested by: {lab_test.tested_by} | Date: {lab_test.test_date}"
-
-        # Generate unique test ID (use database ID)
-        test_id = f"TEST-{lab_test.id}"
-
-        # Write to blockchain with transaction verification
-        try:
-            tx_hash = add_lab_test_to_chain(
-                test_id=test_id,
-                batch_id=lab_test.batch.batch_id,
-                result=result_string
-            )
-            logger.info(f"Lab test {lab_test.id} recorded on-chain: {tx_hash}")
-
-            # Update lab test with blockchain transaction hash
-            lab_test.blockchain_tx_hash = tx_hash
-            lab_test.save()
-
-            # Include blockchain reference in response
-            data = serializer.data
-            data["blockchain_tx_hash"] = tx_hash
-
-            headers = self.get_success_headers(serializer.data)
-            return Response(data, status=status.HTTP_201_CREATED, headers=headers)
+        # The chain worker records the lab test on the blockchain and back-fills blockchain_tx_hash
+        data = serializer.data
+        data["blockchain_tx_hash"] = None
+        data["blockchain_status"] = job.status
+        data["blockchain_job_id"] = job.id
 
-        except Exception as e:
-            logger.error(f"Blockchain error: {str(e)}")
-            # Lab test is already saved to database, but blockchain write failed
-            # Return success with warning about blockchain
-            data = serializer.data
-            data["blockchain_tx_hash"] = None
-            data["blockchain_warning"] = f"Lab test saved to database but blockchain write failed: {str(e)}"
-            
-            return Response(
-                data,
-                status=status.HTTP_201_CREATED
-            )
+        headers = self.get_success_headers(serializer.data)
+        return Response(data, status=status.HTTP_201_CREATED, headers=headers)
 
     @action(detail=True, methods=['post'], url_path='record-on-chain')
     def record_on_chain(self, request, pk=None):
@@ -637,72 +740,35 @@ class LabTestViewSet(viewsets.ModelViewSet):
                 'blockchain_tx_hash': lab_test.blockchain_tx_hash
             }, status=status.HTTP_200_OK)
         
-        # Test connection first to provide better error messages
-        connection_test = test_connection()
-        if not connection_test.get('connected'):
+        # Check if a queued write is still waiting for the chain worker
+        open_job = get_open_job(lab_test=lab_test)
+        if open_job:
             return Response({
-                'error': 'Cannot connect to blockchain node',
-                'message': connection_test.get('error', 'Unknown connection error'),
-                'rpc_url': connection_test.get('rpc_url'),
-                'details': {
-                    'has_private_key': bool(os.getenv("PRIVATE_KEY")),
-                    'has_public_address': bool(os.getenv("PUBLIC_ADDRESS")),
-                    'has_contract_address': bool(os.getenv("CONTRACT_ADDRESS")),
-                }
-            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+                'message': 'Lab test is queued for recording on blockchain',
+                'blockchain_status': open_job.status,
+                'blockchain_job_id': open_job.id,
+            }, status=status.HTTP_202_ACCEPTED)
         
-        # Create result string from lab test data
-        result_string = f"Type: {lab_test.test_type} | Result: {lab_test.result} | Tested by: {lab_test.tested_by} | Date: {lab_test.test_date}"
-        test_id = f"TEST-{lab_test.id}"
-        
-        try:
-            # Record on blockchain
-            tx_hash = add_lab_test_to_chain(
-                test_id=test_id,
-                batch_id=lab_test.batch.batch_id,
-                result=result_string
-            )
-            logger.info(f"Lab test {lab_test.id} recorded on-chain: {tx_hash}")
-            
-            # Update lab test with blockchain transaction hash
-            lab_test.blockchain_tx_hash = tx_hash
-            lab_test.save()
-            
-            serializer = self.get_serializer(lab_test)
-            return Response({
-                'message': 'Lab test recorded on blockchain successfully',
-                'blockchain_tx_hash': tx_hash,
-                'lab_test': serializer.data
-            }, status=status.HTTP_200_OK)
-            
-        except Exception as e:
-            error_msg = str(e)
-            logger.error(f"Blockchain error recording lab test {lab_test.id}: {error_msg}")
-            
-            # Provide more specific error messages
-            if "PRIVATE_KEY" in error_msg or "PUBLIC_ADDRESS" in error_msg or "CONTRACT_ADDRESS" in error_msg:
-                help_msg = "Please check your .env file and ensure all blockchain environment variables are set."
-            elif "Cannot connect" in error_msg or "Cannot communicate" in error_msg:
-                help_msg = "Please verify: 1) Hardhat node is running (npx hardhat node), 2) RPC URL is correct, 3) No firewall blocking connection."
-            else:
-                help_msg = "Make sure the Hardhat node is running: npx hardhat node"
-            
-            return Response({
-                'error': error_msg,
-                'message': help_msg,
-                'details': {
-                    'rpc_url': os.getenv("BLOCKCHAIN_RPC_URL", "http://127.0.0.1:8545"),
-                    'has_private_key': bool(os.getenv("PRIVATE_KEY")),
-                    'has_public_address': bool(os.getenv("PUBLIC_ADDRESS")),
-                    'has_contract_address': bool(os.getenv("CONTRACT_ADDRESS")),
-                }
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        # Queued like create(); the chain worker back-fills blockchain_tx_hash
+        job = enqueue_lab_test(lab_test, user=request.user if request.user.is_authenticated else None)
+        return Response({
+            'message': 'Lab test queued for recording on blockchain',
+            'blockchain_status': job.status,
+            'blockchain_job_id': job.id,
+        }, status=status.HTTP_202_ACCEPTED)
 
     @action(detail=False, methods=['get'], url_path='verify-test/(?P<test_id>[^/.]+)')
     def verify_test_from_blockchain(self, request, test_id=None):
         """Read lab test data from blockchain via backend (no wallet needed)."""
         try:
-            blockchain_data = get_lab_test_from_chain(test_id)
+            # On-chain test IDs are "TEST-<database id>"
+            db_id = test_id[len('TEST-'):] if test_id.startswith('TEST-') else None
+            db_test = LabTest.objects.filter(pk=db_id).first() if db_id and db_id.isdigit() else None
+            anchor_result = verify_anchored_record('lab_test', db_test) if db_test else None
+            if anchor_result:
+                return anchored_verification_response(anchor_result, 'Lab test')
+
+            blockchain_data = find_lab_test_on_chain(test_id)
             
             if blockchain_data:
                 return Response({
@@ -749,6 +815,7 @@ class CertificateViewSet(viewsets.ModelViewSet):
     queryset = Certificate.objects.all()
     serializer_class = CertificateSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
         """Filter certificates based on user permissions."""
@@ -757,22 +824,33 @@ class CertificateViewSet(viewsets.ModelViewSet):
         if not user.is_authenticated:
             return Certificate.objects.none()
         
-        queryset = Certificate.objects.all()
+        queryset = Certificate.objects.select_related('created_by')
         
         # Filter by batch if batch parameter is provided
         batch_id = self.request.query_params.get('batch', None)
         if batch_id is not None:
             queryset = queryset.filter(batch_id=batch_id)
+        queryset = filter_recorded(queryset, self.request.query_params.get('recorded'))
         
         # Admins see all certificates
         if user.is_staff or user.is_superuser:
             return queryset
         
-        # Regular users see only certificates for their batches
+        # Regular users see only certificates for their batches. Both sides
+        # of the OR are indexed columns of this table, so no join is needed.
         return queryset.filter(
-            models.Q(batch__created_by=user) | models.Q(batch__owner=user) | models.Q(created_by=user)
+            models.Q(batch_id__in=accessible_batch_ids(user)) | models.Q(created_by=user)
         )
 
+    @action(detail=False, methods=['get'], url_path='export', renderer_classes=EXPORT_RENDERERS)
+    def export(self, request):
+        """
+        Stream every certificate the user can see as CSV (?format=csv, the default) or NDJSON (?format=ndjson).
+
+        Honours the same filters as the list (?batch=, ?recorded=).
+        """
+        return stream_export(self.get_queryset(), CERTIFICATE_EXPORT_FIELDS, export_format(request), 'certificates')
+
     def create(self, request, *args, **kwargs):
         """Create certificate and record on blockchain."""
         serializer = self.get_serializer(data=request.data)
@@ -781,8 +859,10 @@ class CertificateViewSet(viewsets.ModelViewSet):
         # Set ownership - pass user field directly to save()
         user = request.user if request.user.is_authenticated else None
 
-        # Save to local database first with ownership
-        certificate = serializer.save(created_by=user)
+        # Save the certificate and queue its chain write in one transaction
+        with transaction.atomic():
+            certificate = serializer.save(created_by=user)
+            job = enqueue_certificate(certificate, user=user)
         
         # Log audit trail
         log_audit_action(
@@ -800,45 +880,14 @@ class CertificateViewSet(viewsets.ModelViewSet):
             request=request
         )
 
-        # Create issuer string from certificate data for blockchain
-        # Smart contract stores: certId, batchId, issuer
-        issuer_string = f"{certificate.issued_by} - Issued: {certificate.issue_date} - Expires: {certificate.expiry_date}"
-
-        # Generate unique cert ID (use certificate_id from database)
-        cert_id = certificate.certificate_id
-
-        # Write to blockchain with transaction verification
-        try:
-            tx_hash = issue_certificate_on_chain(
-                cert_id=cert_id,
-                batch_id=certificate.batch.batch_id,
-                issuer=issuer_string
-            )
-            logger.info(f"Certificate {certificate.id} recorded on-chain: {tx_hash}")
-
-            # Update certificate with blockchain transaction hash
-            certificate.blockchain_tx_hash = tx_hash
-            certificate.save()
-
-            # Include blockchain reference in response
-            data = serializer.data
-            data["blockchain_tx_hash"] = tx_hash
-
-            headers = self.get_success_headers(serializer.data)
-            return Response(data, status=status.HTTP_201_CREATED, headers=headers)
+        # The chain worker issues the certificate on the blockchain and back-fills blockchain_tx_hash
+        data = serializer.data
+        data["blockchain_tx_hash"] = None
+        data["blockchain_status"] = job.status
+        data["blockchain_job_id"] = job.id
 
-        except Exception as e:
-            logger.error(f"Blockchain error: {str(e)}")
-            # Certificate is already saved to database, but blockchain write failed
-            # Return success with warning about blockchain
-            data = serializer.data
-            data["blockchain_tx_hash"] = None
-            data["blockchain_warning"] = f"Certificate saved to database but blockchain write failed: {str(e)}"
-            
-            return Response(
-                data,
-                status=status.HTTP_201_CREATED
-            )
+        headers = self.get_success_headers(serializer.data)
+        return Response(data, status=status.HTTP_201_CREATED, headers=headers)
 
     @action(detail=True, methods=['post'], url_path='record-on-chain')
     def record_on_chain(self, request, pk=None):
@@ -852,86 +901,33 @@ class CertificateViewSet(viewsets.ModelViewSet):
                 'blockchain_tx_hash': certificate.blockchain_tx_hash
             }, status=status.HTTP_200_OK)
         
-        # Test connection first to provide better error messages
-        connection_test = test_connection()
-        if not connection_test.get('connected'):
+        # Check if a queued write is still waiting for the chain worker
+        open_job = get_open_job(certificate=certificate)
+        if open_job:
             return Response({
-                'error': 'Cannot connect to blockchain node',
-                'message': connection_test.get('error', 'Unknown connection error'),
-                'rpc_url': connection_test.get('rpc_url'),
-                'details': {
-                    'has_private_key': bool(os.getenv("PRIVATE_KEY")),
-                    'has_public_address': bool(os.getenv("PUBLIC_ADDRESS")),
-                    'has_contract_address': bool(os.getenv("CONTRACT_ADDRESS")),
-                }
-            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-        
-        # Create issuer string from certificate data
-        issuer_string = f"{certificate.issued_by} - Issued: {certificate.issue_date} - Expires: {certificate.expiry_date}"
-        cert_id = certificate.certificate_id
+                'message': 'Certificate is queued for recording on blockchain',
+                'blockchain_status': open_job.status,
+                'blockchain_job_id': open_job.id,
+            }, status=status.HTTP_202_ACCEPTED)
         
-        try:
-            # Record on blockchain
-            tx_hash = issue_certificate_on_chain(
-                cert_id=cert_id,
-                batch_id=certificate.batch.batch_id,
-                issuer=issuer_string
-            )
-            logger.info(f"Certificate {certificate.id} recorded on-chain: {tx_hash}")
-            
-            # Update certificate with blockchain transaction hash
-            old_tx_hash = certificate.blockchain_tx_hash
-            certificate.blockchain_tx_hash = tx_hash
-            certificate.save()
-            
-            # Log audit trail
-            log_audit_action(
-                action='record_blockchain',
-                user=request.user if request.user.is_authenticated else None,
-                certificate=certificate,
-                batch=certificate.batch,
-                action_description=f"Recorded certificate {certificate.certificate_id} on blockchain",
-                blockchain_tx_hash=tx_hash,
-                old_values={'blockchain_tx_hash': old_tx_hash} if old_tx_hash else None,
-                new_values={'blockchain_tx_hash': tx_hash},
-                request=request
-            )
-            
-            serializer = self.get_serializer(certificate)
-            return Response({
-                'message': 'Certificate recorded on blockchain successfully',
-                'blockchain_tx_hash': tx_hash,
-                'certificate': serializer.data
-            }, status=status.HTTP_200_OK)
-            
-        except Exception as e:
-            error_msg = str(e)
-            logger.error(f"Blockchain error recording certificate {certificate.id}: {error_msg}")
-            
-            # Provide more specific error messages
-            if "PRIVATE_KEY" in error_msg or "PUBLIC_ADDRESS" in error_msg or "CONTRACT_ADDRESS" in error_msg:
-                help_msg = "Please check your .env file and ensure all blockchain environment variables are set."
-            elif "Cannot connect" in error_msg or "Cannot communicate" in error_msg:
-                help_msg = "Please verify: 1) Hardhat node is running (npx hardhat node), 2) RPC URL is correct, 3) No firewall blocking connection."
-            else:
-                help_msg = "Make sure the Hardhat node is running: npx hardhat node"
-            
-            return Response({
-                'error': error_msg,
-                'message': help_msg,
-                'details': {
-                    'rpc_url': os.getenv("BLOCKCHAIN_RPC_URL", "http://127.0.0.1:8545"),
-                    'has_private_key': bool(os.getenv("PRIVATE_KEY")),
-                    'has_public_address': bool(os.getenv("PUBLIC_ADDRESS")),
-                    'has_contract_address': bool(os.getenv("CONTRACT_ADDRESS")),
-                }
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        # Queued like create(); the chain worker back-fills blockchain_tx_hash
+        job = enqueue_certificate(certificate, user=request.user if request.user.is_authenticated else None)
+        return Response({
+            'message': 'Certificate queued for recording on blockchain',
+            'blockchain_status': job.status,
+            'blockchain_job_id': job.id,
+        }, status=status.HTTP_202_ACCEPTED)
 
     @action(detail=False, methods=['get'], url_path='verify-certificate/(?P<cert_id>[^/.]+)')
     def verify_certificate_from_blockchain(self, request, cert_id=None):
         """Read certificate data from blockchain via backend (no wallet needed)."""
         try:
-            blockchain_data = get_certificate_from_chain(cert_id)
+            db_certificate = Certificate.objects.filter(certificate_id=cert_id).first()
+            anchor_result = verify_anchored_record('certificate', db_certificate) if db_certificate else None
+            if anchor_result:
+                return anchored_verification_response(anchor_result, 'Certificate')
+
+            blockchain_data = find_certificate_on_chain(cert_id)
             
             if blockchain_data:
                 return Response({
@@ -972,3 +968,32 @@ class CertificateViewSet(viewsets.ModelViewSet):
                 'rpc_url': result.get('rpc_url'),
                 'message': 'Cannot connect to blockchain node'
             }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class AuditLogViewSet(viewsets.GenericViewSet):
+    """Audit log exports for administrators (entries archived by archive_audit_logs are in the archive files)."""
+    queryset = AuditLog.objects.all()
+    permission_classes = [IsAdminUser]
+
+    def get_queryset(self):
+        queryset = AuditLog.objects.all()
+        batch_id = self.request.query_params.get('batch')
+        if batch_id is not None:
+            queryset = queryset.filter(batch__batch_id=batch_id)
+        for param, lookup in (('since', 'timestamp__gte'), ('until', 'timestamp__lt')):
+            value = self.request.query_params.get(param)
+            if value:
+                moment = parse_moment(value)
+                if moment is None:
+                    raise ValidationError({param: 'Use an ISO 8601 date or datetime.'})
+                queryset = queryset.filter(**{lookup: moment})
+        return queryset
+
+    @action(detail=False, methods=['get'], url_path='export', renderer_classes=EXPORT_RENDERERS)
+    def export(self, request):
+        """
+        Stream audit log entries as CSV (?format=csv, the default) or NDJSON (?format=ndjson).
+
+        Filters: ?batch=<batch_id>, ?since= and ?until= (ISO dates or datetimes).
+        """
+        return stream_export(self.get_queryset(), AUDIT_LOG_EXPORT_FIELDS, export_format(request), 'audit-logs')
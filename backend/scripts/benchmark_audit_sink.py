@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""
+Benchmark audit log throughput in each AUDIT_LOG_MODE (sync, buffered, async).
+
+Each entry is logged in its own transaction, as a request would. "caller" is
+the time spent inside log_audit_action() calls; "total" also waits for the
+buffer or queue to be written out.
+
+Runs against a throwaway test database (the real one is never touched):
+    python scripts/benchmark_audit_sink.py
+    python scripts/benchmark_audit_sink.py --entries 20000 --buffer-size 500
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def run(mode, entries, buffer_size, user, batch):
+    from django.db import transaction
+    from batches import audit
+    from batches.models import AuditLog
+    from batches.utils import log_audit_action
+
+    AuditLog.objects.all().delete()
+    sink = audit.build_audit_sink(mode, buffer_size)
+    audit._sink = sink
+    try:
+        caller = 0.0
+        started = time.perf_counter()
+        for i in range(entries):
+            with transaction.atomic():
+                call_started = time.perf_counter()
+                log_audit_action(
+                    action='update',
+                    user=user,
+                    batch=batch,
+                    action_description=f"Benchmark update {i}",
+                    old_values={'quantity': i},
+                    new_values={'quantity': i + 1},
+                )
+                caller += time.perf_counter() - call_started
+        sink.flush()
+        total = time.perf_counter() - started
+    finally:
+        sink.close()
+        audit._sink = None
+
+    written = AuditLog.objects.count()
+    return caller, total, written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entries', type=int, default=5000, help="Audit entries to write per mode")
+    parser.add_argument('--buffer-size', type=int, default=100, help="AUDIT_LOG_BUFFER_SIZE for the buffered and async modes")
+    options = parser.parse_args()
+
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'asalitrace.settings')
+    django.setup()
+
+    from django.contrib.auth import get_user_model
+    from django.test.runner import DiscoverRunner
+    from django.test.utils import setup_test_environment
+    from batches.audit import AUDIT_LOG_MODES
+    from batches.models import Batch
+
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    failures = 0
+    try:
+        user = get_user_model().objects.create_user(username='auditbench', email='auditbench@example.com', password='unused')
+        batch = Batch.objects.create(
+            batch_id='AUDIT-BENCH',
+            producer_name='Benchmark Producer',
+            production_date=datetime.date(2024, 1, 1),
+            honey_type='Acacia',
+            quantity=10,
+            created_by=user,
+            owner=user,
+        )
+
+        print(f"{options.entries} entries per mode, buffer size {options.buffer_size}\n")
+        print(f"{'mode':<10} {'caller s':>9} {'total s':>9} {'entries/s':>10}  written")
+        for mode in AUDIT_LOG_MODES:
+            caller, total, written = run(mode, options.entries, options.buffer_size, user, batch)
+            ok = written == options.entries
+            failures += not ok
+            print(f"{mode:<10} {caller:>9.3f} {total:>9.3f} {options.entries / total:>10.0f}  "
+                  f"{'✅' if ok else '❌'} {written}")
+    finally:
+        runner.teardown_databases(old_config)
+
+    if failures:
+        print(f"\n❌ {failures} mode(s) lost audit entries")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+Benchmark serialize + render time for the batch list: BatchSerializer
+(ModelSerializer) against the values() fast path (BatchReadSerializer), with
+the standard JSON renderer and with orjson.
+
+Also checks that both paths produce the same JSON.
+
+Runs against a throwaway test database (the real one is never touched):
+    python scripts/benchmark_serializers.py
+    python scripts/benchmark_serializers.py --rows 10000 --repeat 5
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def seed(rows, users):
+    from batches.models import Batch
+
+    Batch.objects.bulk_create([
+        Batch(
+            batch_id=f"SER-{i}",
+            producer_name=f"Producer {i % 50}",
+            production_date=datetime.date(2024, 1, 1) + datetime.timedelta(days=i % 365),
+            honey_type='Acacia',
+            quantity=10 + i % 7,
+            created_by=users[i % len(users)],
+            owner=users[(i + 1) % len(users)] if i % 5 else None,
+        )
+        for i in range(rows)
+    ], batch_size=1000)
+
+
+def timed(fn, repeat):
+    """(best seconds, result) over `repeat` runs."""
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000, help="Batches to serialize")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per path (the best is reported)")
+    options = parser.parse_args()
+
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'asalitrace.settings')
+    django.setup()
+
+    from django.contrib.auth import get_user_model
+    from django.test.runner import DiscoverRunner
+    from django.test.utils import setup_test_environment
+    from rest_framework.renderers import JSONRenderer
+    from batches import renderers
+    from batches.models import Batch
+    from batches.serializers import BatchSerializer, batch_read_serializer
+
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    try:
+        User = get_user_model()
+        users = [User.objects.create_user(username=f'ser{i}', email=f'ser{i}@example.com', password='unused') for i in range(5)]
+        seed(options.rows, users)
+        queryset = Batch.objects.select_related('created_by', 'owner').order_by('-created_at', '-id')
+        json_renderer, orjson_renderer = JSONRenderer(), renderers.ORJSONRenderer()
+
+        def model_serializer():
+            return BatchSerializer(list(queryset), many=True).data
+
+        def fast_serializer():
+            return batch_read_serializer.many(queryset.values(*batch_read_serializer.lookups()))
+
+        serialize_model, model_data = timed(model_serializer, options.repeat)
+        serialize_fast, fast_data = timed(fast_serializer, options.repeat)
+        render_json, model_json = timed(lambda: json_renderer.render(model_data), options.repeat)
+        render_fast_json, fast_json = timed(lambda: json_renderer.render(fast_data), options.repeat)
+        if model_json != fast_json:
+            print("❌ BatchReadSerializer output differs from BatchSerializer")
+            sys.exit(1)
+
+        per_10k = 10000 / options.rows * 1000  # ms per 10k rows
+        results = [
+            ("ModelSerializer + JSONRenderer", serialize_model, render_json),
+            ("values() fast path + JSONRenderer", serialize_fast, render_fast_json),
+        ]
+        if renderers.orjson is not None:
+            render_orjson, orjson_output = timed(lambda: orjson_renderer.render(fast_data), options.repeat)
+            if orjson_output != fast_json:
+                print("❌ ORJSONRenderer output differs from JSONRenderer")
+                sys.exit(1)
+            results.append(("values() fast path + ORJSONRenderer", serialize_fast, render_orjson))
+        else:
+            print("(orjson not installed: skipping ORJSONRenderer)")
+
+        print(f"{options.rows} batches, best of {options.repeat}; milliseconds per 10k rows\n")
+        print(f"{'path':<38} {'serialize':>10} {'render':>8} {'total':>8}")
+        baseline = (serialize_model + render_json) * per_10k
+        for label, serialize, render in results:
+            total = (serialize + render) * per_10k
+            print(f"{label:<38} {serialize * per_10k:>10.1f} {render * per_10k:>8.1f} {total:>8.1f}  ({baseline / total:.1f}x)")
+        print("\n✅ Fast path output matches BatchSerializer")
+    finally:
+        runner.teardown_databases(old_config)
+
+
+if __name__ == "__main__":
+    main()
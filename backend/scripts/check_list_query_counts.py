@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+Check that the batch, lab test and certificate lists run a fixed number of
+queries per page, however many rows the tables hold.
+
+Runs against a throwaway test database (the real one is never touched):
+    python scripts/check_list_query_counts.py
+    python scripts/check_list_query_counts.py --rows 2000
+"""
+import argparse
+import datetime
+import os
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Authentication is forced, so a list page is the page query plus any lazy
+# lookups the serializer makes. One spare query keeps the check from being brittle.
+MAX_QUERIES_PER_PAGE = 2
+
+LIST_URLS = ('/api/batches/', '/api/labtests/', '/api/certificates/')
+
+
+def seed(rows, user):
+    from batches.access import sync_batch_access
+    from batches.models import Batch, LabTest, Certificate
+
+    batches = Batch.objects.bulk_create([
+        Batch(
+            batch_id=f"QC-{i}",
+            producer_name=f"Producer {i % 50}",
+            production_date=datetime.date(2024, 1, 1),
+            honey_type='Acacia',
+            quantity=10,
+            created_by=user,
+            owner=user,
+        )
+        for i in range(rows)
+    ])
+    # bulk_create skips the post_save receiver that grants access, and the
+    # lists only show a non-staff user the batches they have access to
+    sync_batch_access(batches)
+    LabTest.objects.bulk_create([
+        LabTest(batch=batch, test_type='Moisture', result='17%', tested_by='Lab', test_date=datetime.date(2024, 1, 2), created_by=user)
+        for batch in batches
+    ])
+    Certificate.objects.bulk_create([
+        Certificate(
+            batch=batch,
+            certificate_id=f"QC-CERT-{batch.pk}",
+            issued_by='KEBS',
+            issue_date=datetime.date(2024, 1, 3),
+            expiry_date=datetime.date(2025, 1, 3),
+            created_by=user,
+        )
+        for batch in batches
+    ])
+
+
+def walk(client, url, page_size, max_pages=3):
+    """Query counts for the first `max_pages` pages of a list, following `next` links."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    counts = []
+    next_url = f"{url}?page_size={page_size}"
+    while next_url and len(counts) < max_pages:
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(next_url)
+        if response.status_code != 200:
+            raise AssertionError(f"{next_url} returned {response.status_code}: {response.content[:200]}")
+        body = response.json()
+        counts.append((len(body['results']), len(queries.captured_queries)))
+        next_url = body['next']
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500, help="Batches to create (each with a lab test and a certificate)")
+    options = parser.parse_args()
+
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'asalitrace.settings')
+    django.setup()
+
+    from django.contrib.auth import get_user_model
+    from django.test.runner import DiscoverRunner
+    from django.test.utils import setup_test_environment
+    from rest_framework.test import APIClient
+
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    failures = 0
+    try:
+        user = get_user_model().objects.create_user(username='querycheck', email='querycheck@example.com', password='unused')
+        seed(options.rows, user)
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user)
+
+        for url in LIST_URLS:
+            for page_size in (10, 100):
+                counts = walk(client, url, page_size)
+                worst = max(queries for _, queries in counts)
+                # An empty list would pass on query counts alone
+                first_page_rows = counts[0][0]
+                ok = worst <= MAX_QUERIES_PER_PAGE and first_page_rows == min(page_size, options.rows)
+                failures += not ok
+                print(f"{'✅' if ok else '❌'} {url} page_size={page_size}: "
+                      f"{[queries for _, queries in counts]} queries per page (limit {MAX_QUERIES_PER_PAGE}), "
+                      f"{first_page_rows} row(s) on the first page")
+    finally:
+        runner.teardown_databases(old_config)
+
+    if failures:
+        print(f"\n❌ {failures} list(s) exceeded {MAX_QUERIES_PER_PAGE} queries per page or returned a short first page")
+        sys.exit(1)
+    print("\n✅ Every list page ran in a fixed number of queries")
+
+
+if __name__ == "__main__":
+    main()
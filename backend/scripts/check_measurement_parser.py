@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""
+Check that lab result strings parse into the expected measurements.
+
+Needs no database:
+    python scripts/check_measurement_parser.py
+"""
+import os
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# (result, test_type) => [(analyte, value, unit)]
+CASES = [
+    (('17.2%', 'Moisture'), [('moisture', 17.2, '%')]),
+    (('Moisture: 17.2%, HMF: 12 mg/kg, Diastase 9.1 DN', ''), [
+        ('moisture', 17.2, '%'), ('hmf', 12.0, 'mg/kg'), ('diastase', 9.1, 'DN'),
+    ]),
+    (('Diastase 9.1DN', ''), [('diastase', 9.1, 'DN')]),
+    (('Conductivity 450 µS/cm', ''), [('conductivity', 0.45, 'mS/cm')]),
+    (('HMF: 3.2 mg/100g', ''), [('hmf', 32.0, 'mg/kg')]),
+    (('pH 4.2', ''), [('ph', 4.2, '')]),
+    # A detection limit or spec, not a measured value
+    (('<20%', 'Moisture'), []),
+    # Numbers that are part of the analyte name or a label
+    (('5-HMF: 12 mg/kg', 'Moisture'), [('hmf', 12.0, 'mg/kg')]),
+    (('5 HMF 12 mg/kg', ''), [('hmf', 12.0, 'mg/kg')]),
+    (('Moisture content 2024 sample: 17.5%', ''), [('moisture', 17.5, '%')]),
+]
+
+
+def main():
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'asalitrace.settings')
+    django.setup()
+
+    from batches.measurements import parse_measurements
+
+    failures = 0
+    for (result, test_type), expected in CASES:
+        parsed = parse_measurements(result, test_type)
+        ok = parsed == expected
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {result!r} ({test_type or 'no test type'}): {parsed}"
+              + ('' if ok else f", expected {expected}"))
+
+    if failures:
+        print(f"\n❌ {failures} result(s) parsed differently than expected")
+        sys.exit(1)
+    print("\n✅ Every lab result parsed as expected")
+
+
+if __name__ == "__main__":
+    main()
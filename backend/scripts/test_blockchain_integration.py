@@ -7,6 +7,9 @@ Or: python manage.py runscript test_blockchain_integration
 
 import os
 import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
 
 # Add project to path
@@ -17,8 +20,11 @@ from asalitrace.blockchain.eth_adapter import (
     get_contract, 
     test_connection,
     add_batch_to_chain,
-    get_batch_from_chain
+    get_batch_from_chain,
+    submit_batch_to_chain,
+    get_transaction_receipts
 )
+from asalitrace.blockchain.provider import count_rpc_calls
 from batches.models import Batch
 
 def print_section(title):
@@ -174,6 +180,107 @@ def test_event_logs():
         print(f"   Error: {str(e)}")
         return False
 
+def test_pipelined_submission(count=50):
+    """Test 7: Send many transactions back to back and confirm them with batched receipt lookups"""
+    print_section("TEST 7: Pipelined Submission")
+    
+    try:
+        run_id = uuid.uuid4().hex[:8]
+        start = time.time()
+        
+        # Send every transaction without waiting for receipts
+        tx_hashes = [
+            submit_batch_to_chain(f"PIPE-{run_id}-{i}", f"Pipelined test batch {i}")
+            for i in range(count)
+        ]
+        sent_in = time.time() - start
+        print(f"   Sent {count} transactions in {sent_in:.2f}s")
+        
+        # Poll all pending hashes at once until they are mined
+        pending = set(tx_hashes)
+        blocks = set()
+        deadline = time.time() + 120
+        while pending and time.time() < deadline:
+            receipts = get_transaction_receipts(pending)
+            for tx_hash, receipt in receipts.items():
+                if receipt is None:
+                    continue
+                if receipt['status'] != 1:
+                    print(f"❌ Transaction {tx_hash[:20]}... failed")
+                    return False
+                blocks.add(receipt['blockNumber'])
+                pending.discard(tx_hash)
+            if pending:
+                time.sleep(1)
+        
+        if pending:
+            print(f"❌ {len(pending)} transactions were not mined within 120s")
+            return False
+        
+        elapsed = time.time() - start
+        print("✅ All pipelined transactions confirmed!")
+        print(f"   Confirmed {count} records in {elapsed:.2f}s across {len(blocks)} block(s)")
+        print(f"   Throughput: {count / elapsed:.1f} records/s")
+        return True
+    except Exception as e:
+        print("❌ Pipelined submission failed!")
+        print(f"   Error: {str(e)}")
+        return False
+
+def test_connection_pool(calls=200, threads=8):
+    """Test 8: Share one keep-alive connection pool across threads"""
+    print_section("TEST 8: Connection Pool")
+    
+    try:
+        web3 = get_web3()
+        provider = web3.provider
+        
+        start = time.time()
+        with ThreadPoolExecutor(threads) as executor:
+            list(executor.map(lambda _: web3.eth.block_number, range(calls)))
+        elapsed = time.time() - start
+        
+        connections = sum(
+            pool.num_connections
+            for pool in provider.session.get_adapter(provider.endpoint_uri).poolmanager.pools._container.values()
+        )
+        print(f"   {calls} calls from {threads} threads in {elapsed:.2f}s ({elapsed / calls * 1000:.1f}ms per call)")
+        print(f"   Connections opened: {connections} (pool size {provider.pool_size})")
+        
+        if connections > provider.pool_size:
+            print("❌ More connections opened than the pool allows")
+            return False
+        print("✅ Connections reused across threads!")
+        return True
+    except Exception as e:
+        print("❌ Connection pool test failed!")
+        print(f"   Error: {str(e)}")
+        return False
+
+def test_write_rpc_budget():
+    """Test 9: A warmed-up write sends the transaction and polls its receipt, nothing else"""
+    print_section("TEST 9: Write RPC Budget")
+    
+    try:
+        run_id = uuid.uuid4().hex[:8]
+        # The first write per function size pays for gas estimation and nonce sync
+        add_batch_to_chain(f"RPC-{run_id}-0", "RPC budget warm-up")
+        
+        with count_rpc_calls() as calls:
+            add_batch_to_chain(f"RPC-{run_id}-1", "RPC budget check")
+        print(f"   RPC calls: {calls.as_dict()['methods']}")
+        
+        extra = set(calls.methods) - {'eth_sendRawTransaction', 'eth_getTransactionReceipt'}
+        if calls.methods['eth_sendRawTransaction'] != 1 or extra:
+            print(f"❌ Unexpected RPC calls in the write path: {sorted(extra) or dict(calls.methods)}")
+            return False
+        print(f"✅ Write made {calls.total} RPC call(s): 1 send + {calls.methods['eth_getTransactionReceipt']} receipt poll(s)")
+        return True
+    except Exception as e:
+        print("❌ Write RPC budget test failed!")
+        print(f"   Error: {str(e)}")
+        return False
+
 def main():
     """Run all tests"""
     print("\n" + "="*60)
@@ -207,6 +314,15 @@ def main():
     # Test 6: Event logs
     results['events'] = test_event_logs()
     
+    # Test 7: Pipelined submission
+    results['pipelined'] = test_pipelined_submission()
+    
+    # Test 8: Connection pool
+    results['connection_pool'] = test_connection_pool()
+    
+    # Test 9: RPC calls per write
+    results['write_rpc_budget'] = test_write_rpc_budget()
+    
     # Summary
     print_section("TEST SUMMARY")
     
@@ -27,11 +27,29 @@ contract AsaliTrace {
     mapping(string => LabTest) private labTests;
     mapping(string => Certificate) private certificates;
 
+    // Merkle roots of off-chain record sets => anchoring account => block
+    // timestamp it anchored them at. Keyed by sender so that nobody can
+    // anchor a root in another account's name or block it by anchoring first.
+    mapping(bytes32 => mapping(address => uint256)) private anchoredRoots;
+
     event BatchCreated(string batchId, string description, address indexed creator);
     event LabTestAdded(string testId, string batchId, string result);
     event CertificateIssued(string certId, string batchId, string issuer);
+    event RootAnchored(bytes32 indexed root, uint256 leafCount, address indexed anchoredBy);
 
     function createBatch(string memory _batchId, string memory _description) public {
+        _createBatch(_batchId, _description);
+    }
+
+    // Records many batches in one transaction. Emits BatchCreated for each item.
+    function createBatches(string[] calldata _batchIds, string[] calldata _descriptions) external {
+        require(_batchIds.length == _descriptions.length, "Array length mismatch");
+        for (uint256 i = 0; i < _batchIds.length; i++) {
+            _createBatch(_batchIds[i], _descriptions[i]);
+        }
+    }
+
+    function _createBatch(string memory _batchId, string memory _description) internal {
         require(batches[_batchId].timestamp == 0, "Batch already exists");
         batches[_batchId] = Batch({
             batchId: _batchId,
@@ -48,6 +66,21 @@ contract AsaliTrace {
     }
 
     function addLabTest(string memory _testId, string memory _batchId, string memory _result) public {
+        _addLabTest(_testId, _batchId, _result);
+    }
+
+    // Records many lab tests in one transaction. Emits LabTestAdded for each item.
+    function addLabTests(string[] calldata _testIds, string[] calldata _batchIds, string[] calldata _results) external {
+        require(
+            _testIds.length == _batchIds.length && _testIds.length == _results.length,
+            "Array length mismatch"
+        );
+        for (uint256 i = 0; i < _testIds.length; i++) {
+            _addLabTest(_testIds[i], _batchIds[i], _results[i]);
+        }
+    }
+
+    function _addLabTest(string memory _testId, string memory _batchId, string memory _result) internal {
         require(batches[_batchId].timestamp != 0, "Batch does not exist");
         require(labTests[_testId].timestamp == 0, "Test already exists");
         labTests[_testId] = LabTest({
@@ -65,6 +98,21 @@ contract AsaliTrace {
     }
 
     function issueCertificate(string memory _certId, string memory _batchId, string memory _issuer) public {
+        _issueCertificate(_certId, _batchId, _issuer);
+    }
+
+    // Issues many certificates in one transaction. Emits CertificateIssued for each item.
+    function issueCertificates(string[] calldata _certIds, string[] calldata _batchIds, string[] calldata _issuers) external {
+        require(
+            _certIds.length == _batchIds.length && _certIds.length == _issuers.length,
+            "Array length mismatch"
+        );
+        for (uint256 i = 0; i < _certIds.length; i++) {
+            _issueCertificate(_certIds[i], _batchIds[i], _issuers[i]);
+        }
+    }
+
+    function _issueCertificate(string memory _certId, string memory _batchId, string memory _issuer) internal {
         require(batches[_batchId].timestamp != 0, "Batch does not exist");
         require(certificates[_certId].timestamp == 0, "Certificate already exists");
         certificates[_certId] = Certificate({
@@ -80,4 +128,18 @@ contract AsaliTrace {
         require(certificates[_certId].timestamp != 0, "Certificate not found");
         return certificates[_certId];
     }
-}
\ No newline at end of file
+
+    // Commits the Merkle root of a set of batch, lab test and certificate
+    // records. Inclusion proofs are kept off-chain and checked against the root.
+    function anchorRoot(bytes32 _root, uint256 _leafCount) external {
+        require(_root != bytes32(0), "Invalid root");
+        require(anchoredRoots[_root][msg.sender] == 0, "Root already anchored");
+        anchoredRoots[_root][msg.sender] = block.timestamp;
+        emit RootAnchored(_root, _leafCount, msg.sender);
+    }
+
+    // Returns when _anchoredBy anchored the root, or 0 if it never did.
+    function getRootTimestamp(bytes32 _root, address _anchoredBy) public view returns (uint256) {
+        return anchoredRoots[_root][_anchoredBy];
+    }
+}
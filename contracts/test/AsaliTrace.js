@@ -15,4 +15,76 @@ describe("AsaliTrace", function () {
     expect(b.description).to.equal("Acacia Honey");
     expect(b.createdBy).to.equal(await signer.getAddress());
   });
-});
\ No newline at end of file
+
+  it("creates many batches in one transaction", async function () {
+    const Factory = await ethers.getContractFactory("AsaliTrace");
+    const c = await Factory.deploy();
+    await c.waitForDeployment();
+
+    const [signer] = await ethers.getSigners();
+    const tx = c.createBatches(["B1", "B2", "B3"], ["Acacia", "Wildflower", "Manuka"]);
+    await expect(tx)
+      .to.emit(c, "BatchCreated")
+      .withArgs("B2", "Wildflower", await signer.getAddress());
+
+    const receipt = await (await tx).wait();
+    expect(receipt.logs.length).to.equal(3);
+    expect((await c.getBatch("B3")).description).to.equal("Manuka");
+  });
+
+  it("rejects the whole batch call if one item is invalid", async function () {
+    const Factory = await ethers.getContractFactory("AsaliTrace");
+    const c = await Factory.deploy();
+    await c.waitForDeployment();
+
+    await c.createBatch("B1", "Acacia");
+    await expect(c.createBatches(["B2", "B1"], ["Wildflower", "Acacia"])).to.be.revertedWith(
+      "Batch already exists"
+    );
+    await expect(c.getBatch("B2")).to.be.revertedWith("Batch not found");
+    await expect(c.createBatches(["B2"], [])).to.be.revertedWith("Array length mismatch");
+  });
+
+  it("adds lab tests and issues certificates in bulk", async function () {
+    const Factory = await ethers.getContractFactory("AsaliTrace");
+    const c = await Factory.deploy();
+    await c.waitForDeployment();
+
+    await c.createBatches(["B1", "B2"], ["Acacia", "Wildflower"]);
+
+    await expect(c.addLabTests(["TEST-1", "TEST-2"], ["B1", "B2"], ["Moisture 17%", "HMF 12"]))
+      .to.emit(c, "LabTestAdded")
+      .withArgs("TEST-2", "B2", "HMF 12");
+    expect((await c.getLabTest("TEST-1")).result).to.equal("Moisture 17%");
+
+    await expect(c.issueCertificates(["C1", "C2"], ["B1", "B2"], ["KEBS", "KEBS"]))
+      .to.emit(c, "CertificateIssued")
+      .withArgs("C1", "B1", "KEBS");
+    expect((await c.getCertificate("C2")).batchId).to.equal("B2");
+
+    await expect(c.addLabTests(["TEST-3"], ["B9"], ["n/a"])).to.be.revertedWith("Batch does not exist");
+  });
+
+  it("anchors a Merkle root once", async function () {
+    const Factory = await ethers.getContractFactory("AsaliTrace");
+    const c = await Factory.deploy();
+    await c.waitForDeployment();
+    const [signer, other] = await ethers.getSigners();
+
+    const root = ethers.keccak256(ethers.toUtf8Bytes("records"));
+    expect(await c.getRootTimestamp(root, signer.address)).to.equal(0n);
+
+    await expect(c.connect(other).anchorRoot(root, 42))
+      .to.emit(c, "RootAnchored")
+      .withArgs(root, 42, other.address);
+    expect(await c.getRootTimestamp(root, signer.address)).to.equal(0n);
+
+    await expect(c.anchorRoot(root, 42))
+      .to.emit(c, "RootAnchored")
+      .withArgs(root, 42, signer.address);
+    expect(await c.getRootTimestamp(root, signer.address)).to.be.greaterThan(0n);
+
+    await expect(c.anchorRoot(root, 42)).to.be.revertedWith("Root already anchored");
+    await expect(c.anchorRoot(ethers.ZeroHash, 1)).to.be.revertedWith("Invalid root");
+  });
+});
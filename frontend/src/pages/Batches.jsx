@@ -81,6 +81,11 @@ const Batches = () => {
           description: `Batch ${newBatch.batch_id} has been saved and recorded on the blockchain. Transaction: ${newBatch.blockchain_tx_hash.substring(0, 20)}...`,
           duration: 5000,
         });
+      } else if (newBatch.blockchain_status === "pending") {
+        toast.success("Batch created successfully!", {
+          description: `Batch ${newBatch.batch_id} has been saved and is queued for recording on the blockchain.`,
+          duration: 5000,
+        });
       } else if (newBatch.blockchain_warning) {
         toast.warning("Batch created but blockchain write failed", {
           description: `Batch ${newBatch.batch_id} was saved to the database, but could not be recorded on the blockchain. ${newBatch.blockchain_warning}`,
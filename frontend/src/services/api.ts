@@ -42,6 +42,24 @@ export default api;
 /*                        AsaliTrace API Service Layer                     */
 /* -------------------------------------------------------------------------- */
 
+// List endpoints are cursor-paginated: { next, previous, results }
+export const getPage = async (url: string) => {
+  const res = await api.get(url);
+  return res.data;
+};
+
+// Follows `next` links and returns every row of a list
+const getAllPages = async (url: string) => {
+  const rows: any[] = [];
+  let next: string | null = url;
+  while (next) {
+    const page = await getPage(next);
+    rows.push(...page.results);
+    next = page.next;
+  }
+  return rows;
+};
+
 // ---------- BATCHES ----------
 export const createBatch = async (batchData: {
   batch_id: string;
@@ -65,8 +83,7 @@ export const createBatch = async (batchData: {
 };
 
 export const getBatches = async () => {
-  const res = await api.get('/batches/');
-  return res.data;
+  return getAllPages('/batches/?page_size=500');
 };
 
 export const getBatchById = async (id: string) => {
@@ -74,6 +91,12 @@ export const getBatchById = async (id: string) => {
   return res.data;
 };
 
+// Compares many batches with their on-chain records in one request
+export const verifyBatchesBulk = async (batchIds: string[]) => {
+  const res = await api.post('/batches/verify-bulk/', { batch_ids: batchIds });
+  return res.data;
+};
+
 // ---------- LAB TESTS ----------
 export const createLabTest = async (labData: {
   batch: number; // Batch ID (foreign key)
@@ -87,9 +110,8 @@ export const createLabTest = async (labData: {
 };
 
 export const getLabTests = async (batchId?: number) => {
-  const url = batchId ? `/labtests/?batch=${batchId}` : '/labtests/';
-  const res = await api.get(url);
-  return res.data;
+  const url = batchId ? `/labtests/?batch=${batchId}&page_size=500` : '/labtests/?page_size=500';
+  return getAllPages(url);
 };
 
 export const getLabTestById = async (id: string | number) => {
@@ -110,9 +132,8 @@ export const issueCertificate = async (certData: {
 };
 
 export const getCertificates = async (batchId?: number) => {
-  const url = batchId ? `/certificates/?batch=${batchId}` : '/certificates/';
-  const res = await api.get(url);
-  return res.data;
+  const url = batchId ? `/certificates/?batch=${batchId}&page_size=500` : '/certificates/?page_size=500';
+  return getAllPages(url);
 };
 
 export const getCertificateById = async (id: string | number) => {